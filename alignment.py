@@ -0,0 +1,191 @@
+import re
+import heapq
+import itertools
+import numpy as np
+from minhash import WORD_PATTERN
+from metrics import timed
+
+# Multiplier of the rolling seed hash (arithmetic wraps modulo 2^64)
+SEED_BASE = np.uint64(0x100000001B3)
+# WORD_PATTERN as a capturing group, so re.split keeps the words
+TOKEN_SPLIT = re.compile(f'({WORD_PATTERN.pattern})')
+
+
+def tokenize(text):
+    """Lowercased words of a text and their start and end character offsets"""
+    # Splitting on a capturing pattern alternates separators and words, so the
+    # offsets are a cumulative sum of part lengths instead of a Match per word
+    parts = TOKEN_SPLIT.split(text)
+    offsets = np.cumsum(np.fromiter(map(len, parts), dtype=np.int64, count=len(parts)))
+    return list(map(str.lower, parts[1::2])), offsets[0:-1:2], offsets[1::2]
+
+
+def token_ids(*word_lists):
+    """Map the words of several texts to shared integer ids (unique per word, not consecutive)"""
+    vocabulary = {}
+    counter = itertools.count()
+    return [
+        np.fromiter(map(vocabulary.setdefault, words, counter), dtype=np.uint64, count=len(words))
+        for words in word_lists
+    ]
+
+
+def seed_hashes(ids, k):
+    """Rolling hash of every run of k consecutive token ids"""
+    count = len(ids) - k + 1
+    if count <= 0:
+        return np.zeros(0, dtype=np.uint64)
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(k):
+        hashes = hashes * SEED_BASE + ids[offset:offset + count]
+    return hashes
+
+
+class Aligner:
+    """Exact token alignment of two texts by hashed seed-and-extend and greedy tiling
+
+    Every run of min_length tokens is a seed. Seeds of the first text are
+    looked up in the sorted seeds of the second (copies of seeds repeated
+    more than max_seed_occurrences times are only paired in order), hits on
+    the same diagonal are chained into maximal matches, and the longest
+    matches are kept first so no token is aligned twice (greedy string
+    tiling). Unlike difflib, moved passages are found as well, and the cost
+    is close to linear in the text length.
+    """
+
+    def __init__(self, min_length=8, max_seed_occurrences=16):
+        self.min_length = min_length
+        self.max_seed_occurrences = max_seed_occurrences
+
+    def seed_hits(self, first, second):
+        """(first position, second position) of every pair of identical seeds"""
+        k = self.min_length
+        first_hashes, second_hashes = seed_hashes(first, k), seed_hashes(second, k)
+        order = np.argsort(second_hashes, kind='stable')
+        sorted_hashes = second_hashes[order]
+        starts = np.searchsorted(sorted_hashes, first_hashes, side='left')
+        counts = np.searchsorted(sorted_hashes, first_hashes, side='right') - starts
+        # A seed repeated in both texts pairs every copy with every copy, so frequent seeds only
+        # pair their n-th copy in the first text with their n-th copy in the second
+        _, inverse, repeats = np.unique(first_hashes, return_inverse=True, return_counts=True)
+        frequent = (counts > self.max_seed_occurrences) | (repeats[inverse] > self.max_seed_occurrences)
+        first_order = np.argsort(first_hashes, kind='stable')
+        ranks = np.empty(len(first_hashes), dtype=np.int64)
+        ranks[first_order] = np.arange(len(first_hashes)) - np.searchsorted(first_hashes[first_order], first_hashes[first_order])
+        ranked = np.flatnonzero(frequent & (ranks < counts))
+        counts[frequent] = 0
+        first_positions = np.concatenate([np.repeat(np.arange(len(first_hashes)), counts), ranked])
+        second_positions = np.concatenate([
+            order[np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(int(counts.sum()))],
+            order[starts[ranked] + ranks[ranked]]
+        ])
+        # Confirm the tokens themselves so a hash collision never aligns different text
+        if len(first_positions):
+            windows = np.lib.stride_tricks.sliding_window_view
+            same = (windows(first, k)[first_positions] == windows(second, k)[second_positions]).all(axis=1)
+            first_positions, second_positions = first_positions[same], second_positions[same]
+        return first_positions, second_positions
+
+    def matches(self, first, second):
+        """Maximal exact matches as (first_start, second_start, length), one per diagonal run of seeds"""
+        k = self.min_length
+        first_positions, second_positions = self.seed_hits(first, second)
+        if not len(first_positions):
+            return []
+        diagonals = first_positions - second_positions
+        order = np.lexsort((first_positions, diagonals))
+        first_positions, diagonals = first_positions[order], diagonals[order]
+        breaks = np.flatnonzero((np.diff(diagonals) != 0) | (np.diff(first_positions) != 1)) + 1
+        starts = first_positions[np.concatenate([[0], breaks])]
+        ends = first_positions[np.concatenate([breaks, [len(first_positions)]]) - 1] + k
+        diagonals = diagonals[np.concatenate([[0], breaks])]
+
+        # Past the ends of a run the texts differ within k tokens, unless seeds were skipped as too
+        # frequent; compare the next k tokens on both sides at once and only walk the rest one by one
+        padded_first = np.concatenate([np.full(k, -1, dtype=np.int64), first.astype(np.int64), np.full(k, -1, dtype=np.int64)])
+        padded_second = np.concatenate([np.full(k, -2, dtype=np.int64), second.astype(np.int64), np.full(k, -2, dtype=np.int64)])
+        steps = np.arange(k)
+        after = ends[:, None] + steps + k
+        same = padded_first[after] == padded_second[after - diagonals[:, None]]
+        open_after = same.all(axis=1)
+        ends = ends + same.argmin(axis=1)
+        before = starts[:, None] - steps + k - 1
+        same = padded_first[before] == padded_second[before - diagonals[:, None]]
+        open_before = same.all(axis=1)
+        starts = starts - same.argmin(axis=1)
+        walk = open_after | open_before
+        matches = set(zip(starts[~walk].tolist(), (starts - diagonals)[~walk].tolist(), (ends - starts)[~walk].tolist()))
+
+        # Plain lists compare single tokens much faster than numpy scalars
+        first, second = first.tolist(), second.tolist()
+        first_length, second_length = len(first), len(second)
+        previous_diagonal, previous_end = None, 0
+        for start, end, diagonal in zip(starts[walk].tolist(), ends[walk].tolist(), diagonals[walk].tolist()):
+            # Runs split only by skipped seeds extend into the match of the previous run on their diagonal
+            if diagonal == previous_diagonal and start < previous_end:
+                continue
+            while start > 0 and start - diagonal > 0 and first[start - 1] == second[start - diagonal - 1]:
+                start -= 1
+            while end < first_length and end - diagonal < second_length and first[end] == second[end - diagonal]:
+                end += 1
+            matches.add((start, start - diagonal, end - start))
+            previous_diagonal, previous_end = diagonal, end
+        return list(matches)
+
+    def align(self, first, second):
+        """Non-overlapping aligned runs as (first_start, second_start, length), sorted by first_start"""
+        # bytearray.find scans in C, which keeps the per-match cost of the greedy loop small
+        covered_first = bytearray(len(first))
+        covered_second = bytearray(len(second))
+        matches = sorted(self.matches(first, second), key=lambda match: match[2], reverse=True)
+        # Uncovered remainders of partly covered matches, as (-length, first_start, second_start)
+        remainders = []
+        tiles = []
+        index = 0
+        while index < len(matches) or remainders:
+            if remainders and (index == len(matches) or -remainders[0][0] >= matches[index][2]):
+                length, a, b = heapq.heappop(remainders)
+                length = -length
+            else:
+                a, b, length = matches[index]
+                index += 1
+            if covered_first.find(0, a, a + length) < 0 or covered_second.find(0, b, b + length) < 0:
+                continue
+            if covered_first.find(1, a, a + length) < 0 and covered_second.find(1, b, b + length) < 0:
+                covered_first[a:a + length] = b'\x01' * length
+                covered_second[b:b + length] = b'\x01' * length
+                tiles.append((a, b, length))
+                continue
+            # Keep the parts of a partly covered match that are still long enough
+            free = ~(np.frombuffer(covered_first, dtype=bool, count=length, offset=a)
+                     | np.frombuffer(covered_second, dtype=bool, count=length, offset=b))
+            edges = np.flatnonzero(np.diff(np.concatenate([[False], free, [False]]).astype(np.int8)))
+            for start, end in zip(edges[::2].tolist(), edges[1::2].tolist()):
+                if end - start >= self.min_length:
+                    heapq.heappush(remainders, (start - end, a + start, b + start))
+        tiles.sort()
+        return tiles
+
+    @timed('alignment')
+    def align_texts(self, first_text, second_text):
+        """Aligned passages of two texts with character offsets into both, and the share of each text they cover"""
+        first_words, first_starts, first_ends = tokenize(first_text)
+        second_words, second_starts, second_ends = tokenize(second_text)
+        first, second = token_ids(first_words, second_words)
+        tiles = self.align(first, second)
+        aligned = sum(length for _, _, length in tiles)
+        return {
+            'passages': [
+                {
+                    'first_start': int(first_starts[a]),
+                    'first_end': int(first_ends[a + length - 1]),
+                    'second_start': int(second_starts[b]),
+                    'second_end': int(second_ends[b + length - 1]),
+                    'tokens': length
+                }
+                for a, b, length in tiles
+            ],
+            'first_coverage': round(aligned / len(first) * 100, 1) if len(first) else 0.0,
+            'second_coverage': round(aligned / len(second) * 100, 1) if len(second) else 0.0,
+            'aligned_tokens': aligned
+        }
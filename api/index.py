@@ -3,77 +3,11 @@ import os
 import sys
 
 # Vercel-specific imports
-app = Flask(__name__)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from engine import PlagiarismDetector
 
-# Lightweight plagiarism detection for Vercel
-class LightweightDetector:
-    def __init__(self):
-        self.suspicious_patterns = [
-            r'\b(?:copy|copied|paste|pasted|copypaste)\b',
-            r'\b(?:wikipedia|wiki)\b',
-            r'\b(?:source|sources)\s*:',
-            r'(?:retrieved|accessed)\s+(?:from|on)',
-            r'\b(?:doi|isbn|url|http|https|www)\b',
-            r'©|\bcopyright\b|\ball rights reserved\b',
-            r'\[\d+\]|\(\d{4}\)',
-            r'\bet al\b|\betal\b',
-        ]
-        
-    def analyze_text(self, text):
-        import re
-        words = text.split()
-        sentences = text.split('.')
-        unique_words = len(set(words))
-        
-        # Simple plagiarism scoring
-        score = 0
-        issues = []
-        
-        # Check patterns
-        suspicious_count = 0
-        for pattern in self.suspicious_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                suspicious_count += 1
-        
-        score += suspicious_count * 15
-        
-        # Check word diversity
-        if len(words) > 0:
-            unique_ratio = unique_words / len(words)
-            if unique_ratio < 0.4:
-                score += 25
-                issues.append("Low vocabulary diversity detected")
-        
-        # Check sentence structure
-        if len(sentences) > 1:
-            avg_length = sum(len(s.split()) for s in sentences) / len(sentences)
-            if avg_length > 35:
-                score += 20
-                issues.append("Very long sentences detected")
-        
-        # Determine risk level
-        if score >= 50:
-            level = "High"
-            color = "danger"
-        elif score >= 25:
-            level = "Medium" 
-            color = "warning"
-        else:
-            level = "Low"
-            color = "success"
-            
-        return {
-            'plagiarism_score': min(score, 100),
-            'plagiarism_level': level,
-            'risk_color': color,
-            'text_analysis': {
-                'total_words': len(words),
-                'unique_words': unique_words,
-                'total_sentences': len(sentences)
-            },
-            'issues': issues,
-            'suspicious_patterns': suspicious_count
-        }
+app = Flask(__name__, template_folder=os.path.join(ROOT, 'templates'), static_folder=os.path.join(ROOT, 'static'))
 
 class LightweightRephraser:
     def __init__(self):
@@ -128,8 +62,8 @@ class LightweightRephraser:
         
         return ' '.join(rephrased_words), changes
 
-# Initialize lightweight versions
-detector = LightweightDetector()
+# Same detector engine as app.py; the fast tier needs neither NLTK nor scikit-learn
+detector = PlagiarismDetector(tier='fast')
 rephraser = LightweightRephraser()
 
 @app.route('/')
@@ -148,7 +82,7 @@ def analyze():
         if len(text.strip()) < 50:
             return jsonify({'error': 'Please provide at least 50 characters'}), 400
         
-        result = detector.analyze_text(text)
+        result = detector.detect_plagiarism(text)
         return jsonify(result)
     
     except Exception as e:
@@ -1,352 +1,45 @@
-from flask import Flask, render_template, request, jsonify
-import nltk
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
-import re
-import string
-from collections import Counter
-import difflib
-import requests
-from urllib.parse import quote
 import time
-import random
+
+# Measured from the first line so /health can report cold-start cost per release
+_import_started = time.perf_counter()
+
+from flask import Flask, render_template, request, jsonify, Response, url_for, g
+from werkzeug.exceptions import RequestEntityTooLarge
+import json
+import os
+import shutil
+import logging
+import tempfile
+import numpy as np
+from functools import cached_property, partial
+import nlp_resources
+from engine import PlagiarismDetector, TextSummary, DEFAULT_TIER
+from parallel import AnalysisPool
+from cache import ResultCache, make_key, normalize_text
+from streaming import StreamingAnalyzer, iter_decoded, normalize_newlines
+from jobs import JobQueue
+from ingest import CorpusIngestor
+from collusion import CollusionDetector
+from alignment import Aligner
+from synonyms import SynonymIndex
+from serving import WorkExecutor, Overloaded
+from extraction import ExtractionError, document_kind, file_digest, iter_document_text
+from metrics import (
+    MetricsRegistry, LogSampler, collect_stages, stage, timed, LATENCY_BUCKETS, SIZE_BUCKETS
+)
 
 app = Flask(__name__)
 
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
-
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize, sent_tokenize
-
-class PlagiarismDetector:
-    def __init__(self):
-        self.stop_words = set(stopwords.words('english'))
-        self.vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 3))
-        # Common phrases that might indicate plagiarism
-        self.common_academic_phrases = [
-            "in conclusion", "furthermore", "however", "moreover", "therefore",
-            "according to", "as a result", "in addition", "on the other hand",
-            "for example", "in other words", "it is important to note",
-            "studies have shown", "research indicates", "it can be concluded",
-            "first of all", "second of all", "last but not least", "to sum up",
-            "in summary", "as mentioned above", "as stated previously"
-        ]
-        self.suspicious_patterns = [
-            r'\b(?:copy|copied|paste|pasted|copypaste)\b',
-            r'\b(?:wikipedia|wiki)\b',
-            r'\b(?:source|sources)\s*:',
-            r'(?:retrieved|accessed)\s+(?:from|on)',
-            r'\b(?:doi|isbn|url|http|https|www)\b',
-            r'©|\bcopyright\b|\ball rights reserved\b',
-            r'\b(?:reference|references|bibliography)\b',
-            r'\[\d+\]|\(\d{4}\)',  # Citations like [1] or (2020)
-            r'\bet al\b|\betal\b',
-            r'\bpp\?\s*\d+',  # Page numbers
-            r'\bvol\.\s*\d+|\bvolume\s*\d+',
-        ]
-    
-    def preprocess_text(self, text):
-        """Clean and preprocess the text"""
-        text = text.lower()
-        text = text.translate(str.maketrans('', '', string.punctuation))
-        text = ' '.join(text.split())
-        return text
-    
-    def analyze_text_statistics(self, text):
-        """Analyze basic text statistics"""
-        sentences = sent_tokenize(text)
-        words = word_tokenize(text)
-        words_clean = [word.lower() for word in words if word.isalpha()]
-        
-        return {
-            'total_words': len(words_clean),
-            'total_sentences': len(sentences),
-            'unique_words': len(set(words_clean)),
-            'avg_words_per_sentence': round(len(words_clean) / len(sentences), 1) if sentences else 0
-        }
-    
-    def detect_suspicious_patterns(self, text):
-        """Detect patterns that might indicate copied content"""
-        import re
-        suspicious_found = []
-        
-        for pattern in self.suspicious_patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                suspicious_found.append(match.group())
-        
-        return suspicious_found
-    
-    def analyze_sentence_structure(self, text):
-        """Analyze sentence structure for potential copying indicators"""
-        sentences = sent_tokenize(text)
-        issues = []
-        
-        # Check for very long sentences (possible copy-paste)
-        long_sentences = [s for s in sentences if len(s.split()) > 40]
-        if long_sentences:
-            issues.append(f"Found {len(long_sentences)} unusually long sentences that may indicate copying")
-        
-        # Check for very short sentences
-        short_sentences = [s for s in sentences if len(s.split()) < 3]
-        if len(short_sentences) > len(sentences) * 0.3:
-            issues.append("High proportion of very short sentences detected")
-        
-        return issues
-    
-    def detect_common_phrases(self, text):
-        """Detect overuse of common academic phrases"""
-        text_lower = text.lower()
-        found_phrases = []
-        
-        for phrase in self.common_academic_phrases:
-            if phrase in text_lower:
-                count = text_lower.count(phrase)
-                if count > 1:
-                    found_phrases.append(f"{phrase} (used {count} times)")
-                else:
-                    found_phrases.append(phrase)
-        
-        return found_phrases[:10]  # Return top 10
-    
-    def detect_wikipedia_like_content(self, text):
-        """Detect content that resembles Wikipedia or encyclopedia entries"""
-        wikipedia_indicators = [
-            r'\bis a\b.*\bthat\b',  # "X is a Y that..."
-            r'\bwas born\b.*\bin\b',
-            r'\bis known for\b',
-            r'\bis located in\b',
-            r'\bis the capital of\b',
-            r'\baccording to.*sources?\b',
-            r'\bas of \d{4}\b',  # "as of 2020"
-            r'\bcitation needed\b',
-            r'\b\d{4}\b.*\b\d{4}\b',  # Multiple years like "1805... 1806"
-            r'\bBattle of\b',  # Historical battles
-            r'\bWar of\b',  # Historical wars
-            r'\bin \d{4}\b',  # "in 1805", "in 1806"
-            r'\bdefeated\b.*\bat\b',  # "defeated X at Y"
-            r'\bled to\b.*\bof\b',  # "led to the X of Y"
-            r'\bis considered\b.*\bin history\b',
-            r'\bhis legacy\b',
-            r'\bare still studied\b',
-            r'\bembodied in\b',
-            r'\bforcing\b.*\bto\b',  # "forcing X to Y"
-            r'\bexiled\b.*\bto\b',  # "exiled to X"
-            r'\bdied of\b.*\bin \d{4}\b',  # "died of X in YEAR"
-        ]
-        
-        matches = 0
-        matched_patterns = []
-        for pattern in wikipedia_indicators:
-            if re.search(pattern, text, re.IGNORECASE):
-                matches += 1
-                # Extract the actual match for debugging
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    matched_patterns.append(match.group()[:30])  # First 30 chars
-        
-        return matches
-    
-    def detect_historical_content(self, text):
-        """Detect historical/biographical content patterns"""
-        historical_patterns = [
-            r'\b\d{4}s?\b',  # Years like 1805, 1800s
-            r'\b(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},?\s+\d{4}\b',
-            r'\b(?:Emperor|King|Queen|Prince|Princess|Duke|General|Admiral)\b',
-            r'\b(?:Empire|Kingdom|Republic|Coalition|Peninsula|Treaty)\b',
-            r'\b(?:invaded|conquered|defeated|victory|battle|war|peace)\b',
-            r'\b(?:throne|crown|reign|rule|power|abdicate)\b',
-            r'\b(?:army|military|naval|forces|troops|soldiers)\b',
-        ]
-        
-        matches = 0
-        for pattern in historical_patterns:
-            matches += len(re.findall(pattern, text, re.IGNORECASE))
-        
-        return matches
-    
-    def calculate_plagiarism_score(self, text):
-        """Calculate an overall plagiarism risk score"""
-        score = 0
-        
-        # Base score from text analysis
-        stats = self.analyze_text_statistics(text)
-        
-        # Very high unique word ratio might indicate academic writing (lower risk)
-        unique_ratio = stats['unique_words'] / stats['total_words'] if stats['total_words'] > 0 else 0
-        if unique_ratio < 0.3:
-            score += 25
-        elif unique_ratio < 0.5:
-            score += 15
-        elif unique_ratio < 0.7:
-            score += 5
-        
-        # Suspicious patterns (heavily weighted)
-        suspicious = self.detect_suspicious_patterns(text)
-        score += len(suspicious) * 20
-        
-        # Sentence structure issues
-        structure_issues = self.analyze_sentence_structure(text)
-        score += len(structure_issues) * 15
-        
-        # Common phrases overuse
-        common_phrases = self.detect_common_phrases(text)
-        if len(common_phrases) > 8:
-            score += 25
-        elif len(common_phrases) > 5:
-            score += 15
-        elif len(common_phrases) > 3:
-            score += 10
-        
-        # Check for repetitive patterns
-        words = word_tokenize(text.lower())
-        word_freq = Counter(words)
-        most_common = word_freq.most_common(5)
-        
-        # If top words appear too frequently, it might indicate copying
-        if most_common and most_common[0][1] > len(words) * 0.1:
-            score += 15
-        
-        # Very short text might be suspicious
-        if len(words) < 20:
-            score += 10
-        
-        # Check for inconsistent writing style (simple heuristic)
-        sentences = sent_tokenize(text)
-        if len(sentences) > 1:
-            sentence_lengths = [len(sent.split()) for sent in sentences]
-            avg_length = sum(sentence_lengths) / len(sentence_lengths)
-            variance = sum((x - avg_length) ** 2 for x in sentence_lengths) / len(sentence_lengths)
-            
-            # High variance in sentence length might indicate copying
-            if variance > 100:
-                score += 10
-        
-        # Check for Wikipedia-like content
-        wiki_score = self.detect_wikipedia_like_content(text)
-        score += wiki_score * 8
-        
-        # Check for historical/biographical content (often copied from references)
-        historical_score = self.detect_historical_content(text)
-        if historical_score > 15:  # Many historical terms/dates
-            score += 25
-        elif historical_score > 10:
-            score += 15
-        elif historical_score > 5:
-            score += 10
-        
-        # Check for very formal/encyclopedic writing style
-        formal_indicators = len(re.findall(r'\b(?:however|furthermore|moreover|nevertheless|consequently|subsequently|thereby|wherein|whereby)\b', text, re.IGNORECASE))
-        if formal_indicators > 3:
-            score += 15
-        elif formal_indicators > 1:
-            score += 8
-        
-        # Cap at 100
-        return min(score, 100)
-    
-    def detect_plagiarism(self, text):
-        """Main single-text plagiarism detection function"""
-        if not text.strip():
-            return {"error": "Text must be provided"}
-        
-        # Analyze text statistics
-        text_analysis = self.analyze_text_statistics(text)
-        
-        # Calculate plagiarism score
-        plagiarism_score = self.calculate_plagiarism_score(text)
-        
-        # Detect issues
-        suspicious_patterns = self.detect_suspicious_patterns(text)
-        structure_issues = self.analyze_sentence_structure(text)
-        common_phrases = self.detect_common_phrases(text)
-        wiki_indicators = self.detect_wikipedia_like_content(text)
-        historical_indicators = self.detect_historical_content(text)
-        
-        # Combine all issues
-        all_issues = []
-        if suspicious_patterns:
-            pattern_list = list(set(suspicious_patterns))[:3]  # Remove duplicates, take first 3
-            all_issues.append(f"Suspicious patterns detected: {', '.join(pattern_list)}")
-        
-        all_issues.extend(structure_issues)
-        
-        if len(common_phrases) > 3:
-            all_issues.append(f"Overuse of common academic phrases detected ({len(common_phrases)} phrases)")
-            
-        if wiki_indicators > 3:
-            all_issues.append(f"Content resembles encyclopedia/Wikipedia style ({wiki_indicators} indicators)")
-        elif wiki_indicators > 1:
-            all_issues.append(f"Some encyclopedia-style patterns detected ({wiki_indicators} indicators)")
-            
-        if historical_indicators > 15:
-            all_issues.append(f"High concentration of historical/factual content ({historical_indicators} indicators)")
-        elif historical_indicators > 10:
-            all_issues.append(f"Significant historical/factual content detected ({historical_indicators} indicators)")
-        elif historical_indicators > 5:
-            all_issues.append(f"Historical/biographical content patterns found ({historical_indicators} indicators)")
-        
-        # Add more specific feedback
-        stats = text_analysis
-        unique_ratio = stats['unique_words'] / stats['total_words'] if stats['total_words'] > 0 else 0
-        
-        if unique_ratio < 0.3:
-            all_issues.append("Very low vocabulary diversity - possible copied content")
-        elif unique_ratio < 0.5:
-            all_issues.append("Moderate vocabulary diversity - review for originality")
-            
-        # Check sentence length variance
-        sentences = sent_tokenize(text)
-        if len(sentences) > 1:
-            sentence_lengths = [len(sent.split()) for sent in sentences]
-            avg_length = sum(sentence_lengths) / len(sentence_lengths)
-            variance = sum((x - avg_length) ** 2 for x in sentence_lengths) / len(sentence_lengths)
-            
-            if variance > 100:
-                all_issues.append("Inconsistent sentence structure detected")
-                
-        # Check for overly factual/formal tone
-        formal_indicators = len(re.findall(r'\b(?:however|furthermore|moreover|nevertheless|consequently|subsequently|thereby|wherein|whereby)\b', text, re.IGNORECASE))
-        if formal_indicators > 3:
-            all_issues.append("Highly formal/academic writing style detected")
-        
-        # Determine risk level - made more sensitive
-        if plagiarism_score >= 60:
-            plagiarism_level = "High"
-            risk_color = "danger"
-        elif plagiarism_score >= 35:
-            plagiarism_level = "Medium"
-            risk_color = "warning"
-        elif plagiarism_score >= 15:
-            plagiarism_level = "Low"
-            risk_color = "info"
-        else:
-            plagiarism_level = "Very Low"
-            risk_color = "success"
-        
-        return {
-            'plagiarism_score': round(plagiarism_score, 1),
-            'plagiarism_level': plagiarism_level,
-            'risk_color': risk_color,
-            'text_analysis': text_analysis,
-            'suspicious_patterns': len(suspicious_patterns),
-            'issues': all_issues,
-            'common_phrases': common_phrases
-        }
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'WARNING').upper(), format='%(asctime)s %(name)s %(levelname)s %(message)s')
+logger = logging.getLogger('plagiarism')
+
+# NLTK data is never downloaded at runtime: download_nltk.py builds
+# nltk_artifact.pickle at deploy time, and nlp_resources loads it on first use.
+# scikit-learn is likewise imported only when it is first needed.
 
 class TextRephraser:
-    def __init__(self):
-        self.stop_words = set(stopwords.words('english'))
+    def __init__(self, tokenizer=None):
+        self.tokenizer = tokenizer or nlp_resources.get_tokenizer()
         self.synonyms = {
             # Common words and their synonyms
             'important': ['significant', 'crucial', 'vital', 'essential', 'critical'],
@@ -514,78 +207,9 @@ class TextRephraser:
                 'We discovered that'
             ]
         }
-    
-    def rephrase_text(self, text, style='academic', creativity='medium'):
-        """Rephrase text to reduce plagiarism while maintaining meaning"""
-        sentences = sent_tokenize(text)
-        rephrased_sentences = []
-        changes_made = []
-        
-        for sentence in sentences:
-            rephrased, sentence_changes = self.rephrase_sentence(sentence, style, creativity)
-            rephrased_sentences.append(rephrased)
-            changes_made.extend(sentence_changes)
-        
-        return ' '.join(rephrased_sentences), changes_made
-    
-    def rephrase_sentence(self, sentence, style, creativity):
-        """Rephrase a single sentence and track changes"""
-        words = word_tokenize(sentence)
-        rephrased_words = []
-        changes = []
         
-        # Determine replacement probability based on creativity level
-        replacement_prob = {
-            'low': 0.4,
-            'medium': 0.6,
-            'high': 0.8
-        }.get(creativity, 0.6)
-        
-        for i, word in enumerate(words):
-            word_lower = word.lower()
-            # Check if word is alphabetic and not a stop word
-            if word.isalpha() and word_lower not in self.stop_words:
-                if random.random() < replacement_prob and word_lower in self.synonyms:
-                    # Replace with synonym
-                    synonym = random.choice(self.synonyms[word_lower])
-                    # Preserve original capitalization
-                    if word[0].isupper():
-                        synonym = synonym.capitalize()
-                    rephrased_words.append(synonym)
-                    changes.append({
-                        'original': word,
-                        'replacement': synonym,
-                        'position': i
-                    })
-                else:
-                    rephrased_words.append(word)
-            else:
-                rephrased_words.append(word)
-        
-        # Reconstruct sentence
-        rephrased = ' '.join(rephrased_words)
-        
-        # Sometimes add a different sentence starter based on style
-        if random.random() < 0.3 and style in self.sentence_starters:
-            starter = random.choice(self.sentence_starters[style])
-            rephrased = f"{starter} {rephrased.lower()}"
-            changes.append({
-                'original': 'sentence_start',
-                'replacement': starter,
-                'position': -1
-            })
-        
-        return rephrased, changes
-    
-    def improve_structure(self, text, style):
-        """Improve sentence structure and flow"""
-        sentences = sent_tokenize(text)
-        
-        if len(sentences) <= 1:
-            return text
-        
-        # Add transitional phrases between sentences
-        transitions = {
+        # Transitional phrases added between sentences
+        self.transitions = {
             'academic': [
                 'Furthermore,', 'Moreover,', 'Additionally,', 'In addition,',
                 'Consequently,', 'Therefore,', 'Thus,', 'Hence,',
@@ -602,24 +226,377 @@ class TextRephraser:
                 'Also,', 'Then,', 'Next,', 'But,', 'So,', 'And,'
             ]
         }
+    
+    @cached_property
+    def stop_words(self):
+        return set(nlp_resources.stopwords())
+    
+    @cached_property
+    def synonym_index(self):
+        """The synonyms of every word that is not a stop word, compiled for vectorized lookups"""
+        return SynonymIndex({
+            word: candidates for word, candidates in self.synonyms.items() if word not in self.stop_words
+        })
+    
+    def config_key(self):
+        """Hash of everything besides the text, style, creativity and seed that changes rephrasings"""
+        return make_key(self.synonyms, self.sentence_starters, self.transitions, self.tokenizer.name)
+    
+    @timed('rephrase')
+    def rephrase_text(self, text, style='academic', creativity='medium', rng=None):
+        """Rephrase text to reduce plagiarism while maintaining meaning"""
+        # Every random decision for the document is drawn at once from the NumPy
+        # generator rng, so a seeded generator always gives the same output
+        rng = rng if rng is not None else np.random.default_rng()
+        with stage('tokenize'):
+            sentences = self.tokenizer.sentence_spans(text)
+            spans = [self.tokenizer.word_spans(text, start, end) for start, end in sentences]
+        starts = np.array([start for sentence in spans for start, _ in sentence], dtype=np.int64)
+        ends = np.array([end for sentence in spans for _, end in sentence], dtype=np.int64)
+        # Index of each sentence's first token, plus one past the last token
+        bounds = np.concatenate([[0], np.cumsum([len(sentence) for sentence in spans])]).astype(np.int64)
         
-        improved_sentences = [sentences[0]]  # Keep first sentence as is
+        # Determine replacement probability based on creativity level
+        replacement_prob = {
+            'low': 0.4,
+            'medium': 0.6,
+            'high': 0.8
+        }.get(creativity, 0.6)
         
-        for i in range(1, len(sentences)):
-            if random.random() < 0.4:  # 40% chance to add transition
-                transition = random.choice(transitions.get(style, transitions['formal']))
-                improved_sentences.append(f"{transition} {sentences[i]}")
-            else:
-                improved_sentences.append(sentences[i])
+        word_draws = rng.random((2, len(starts)))
+        sentence_draws = rng.random((4, len(sentences)))
+        
+        with stage('synonyms'):
+            words = [text[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
+            rows = self.synonym_index.lookup([word.lower() for word in words])
+            alphabetic = np.fromiter(map(str.isalpha, words), dtype=bool, count=len(words))
+            replaced = np.flatnonzero((rows >= 0) & alphabetic & (word_draws[0] < replacement_prob))
+            # Preserve original capitalization
+            capitalize = np.fromiter((words[i][0].isupper() for i in replaced.tolist()), dtype=bool, count=len(replaced))
+            replacements = self.synonym_index.choose(rows[replaced], word_draws[1, replaced], capitalize)
+        
+        # Sometimes add a different sentence starter based on style, and a transition between sentences
+        starters = self.sentence_starters.get(style)
+        transitions = self.transitions.get(style, self.transitions['formal'])
+        with_starter = sentence_draws[0] < 0.3 if starters else np.zeros(len(sentences), dtype=bool)
+        with_transition = sentence_draws[2] < 0.4
+        with_transition[:1] = False  # Keep first sentence as is
         
-        return ' '.join(improved_sentences)
+        # Original text between the changes, collected for a single join
+        pieces = []
+        changes = []
+        position = 0
+        replaced_starts, replaced_ends = starts[replaced].tolist(), ends[replaced].tolist()
+        sentence_of = np.searchsorted(bounds, replaced, side='right') - 1
+        first_change = np.searchsorted(sentence_of, np.arange(len(sentences) + 1))
+        for k, (sentence_start, sentence_end) in enumerate(sentences):
+            pieces.append(text[position:sentence_start])
+            if with_transition[k]:
+                pieces.append(transitions[int(sentence_draws[3, k] * len(transitions))] + ' ')
+            sentence_pieces = []
+            position = sentence_start
+            for i in range(first_change[k], first_change[k + 1]):
+                sentence_pieces.append(text[position:replaced_starts[i]])
+                sentence_pieces.append(replacements[i])
+                position = replaced_ends[i]
+                changes.append({
+                    'original': words[replaced[i]],
+                    'replacement': replacements[i],
+                    'position': int(replaced[i] - bounds[k])
+                })
+            sentence_pieces.append(text[position:sentence_end])
+            position = sentence_end
+            if with_starter[k]:
+                starter = starters[int(sentence_draws[1, k] * len(starters))]
+                pieces.append(starter + ' ')
+                sentence_pieces = [piece.lower() for piece in sentence_pieces]
+                changes.append({
+                    'original': 'sentence_start',
+                    'replacement': starter,
+                    'position': -1
+                })
+            pieces.extend(sentence_pieces)
+        pieces.append(text[position:])
+        
+        return ''.join(pieces), changes
+
+# Initialize the detector ('full' by default; DETECTOR_TIER=fast skips NLTK and scikit-learn)
+detector = PlagiarismDetector(tier=DEFAULT_TIER)
+
+# Load the reference corpus if one has been built (the fast tier never compares against one)
+CORPUS_PATH = os.environ.get('CORPUS_PATH', 'corpus_index')
 
-# Initialize the detector
-detector = PlagiarismDetector()
+# With INGEST_SUBMISSIONS=1 every analyzed text joins the corpus in the background
+# (an empty store is created at CORPUS_PATH if none exists yet)
+ingestor = CorpusIngestor.from_environ(CORPUS_PATH) if detector.tier == 'full' else None
+
+if os.path.isdir(CORPUS_PATH) and detector.tier == 'full':
+    detector.load_corpus(CORPUS_PATH)
+
+# Load the sentence paraphrase index if one has been built (python sentences.py ...)
+SENTENCE_INDEX_PATH = os.environ.get('SENTENCE_INDEX_PATH', 'sentence_index')
+if os.path.isdir(SENTENCE_INDEX_PATH) and detector.tier == 'full':
+    detector.load_sentence_index(SENTENCE_INDEX_PATH)
 
 # Initialize rephraser
 rephraser = TextRephraser()
 
+# Spread long documents and batches over a process pool when configured
+ANALYSIS_WORKERS = int(os.environ.get('ANALYSIS_WORKERS', 0))
+if ANALYSIS_WORKERS > 0:
+    detector.pool = AnalysisPool(
+        partial(PlagiarismDetector, tier=detector.tier),
+        workers=ANALYSIS_WORKERS,
+        chunk_chars=int(os.environ.get('ANALYSIS_CHUNK_CHARS', 100000))
+    )
+
+# Cache of /analyze and seeded /rephrase results, keyed by content hash
+result_cache = ResultCache.from_environ()
+
+# Per-paragraph summaries of drafts re-checked through /analyze/incremental, keyed by paragraph hash
+paragraph_cache = ResultCache.from_environ('PARAGRAPH_CACHE', max_entries=20000)
+
+# Text extracted from /analyze/upload documents, keyed by file hash alone, so a re-upload
+# skips extraction whatever the corpus holds (its analysis is cached like /analyze's)
+extraction_cache = ResultCache.from_environ('EXTRACTION_CACHE', max_entries=64, max_bytes=128 * 1024 * 1024)
+MAX_PARAGRAPHS = int(os.environ.get('MAX_PARAGRAPHS', 2000))
+
+# Upper bound on submissions accepted by /analyze/batch
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 500))
+
+# Clusters of near-identical submissions for a whole class (/analyze/collusion)
+collusion_detector = CollusionDetector()
+MAX_COLLUSION_SIZE = int(os.environ.get('MAX_COLLUSION_SIZE', 5000))
+
+# Matching passages of two texts for the side-by-side comparison (/align)
+aligner = Aligner()
+
+# Process pool for the CPU-bound work of request threads (SERVING_MODE=threaded or
+# EXECUTOR_WORKERS > 0); without one, that work runs in the request thread
+work_executor = WorkExecutor.from_environ()
+
+# Read size for /analyze/stream request bodies
+STREAM_CHUNK_BYTES = int(os.environ.get('STREAM_CHUNK_BYTES', 65536))
+
+# Limits of /analyze/upload documents (.txt, .docx, .pdf): file size and extracted text
+MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', 20 * 1024 * 1024))
+MAX_UPLOAD_CHARS = int(os.environ.get('MAX_UPLOAD_CHARS', 5000000))
+# Room for the multipart headers and form fields around an uploaded file
+UPLOAD_FORM_BYTES = 64 * 1024
+
+# Largest request body of every other route (/analyze/stream reads its body in bounded memory and has none);
+# Flask answers bodies over the limit with 413 before they are read
+MAX_REQUEST_BYTES = int(os.environ.get('MAX_REQUEST_BYTES', 64 * 1024 * 1024))
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES
+
+# Background queue for long /jobs submissions (SQLite file, no broker)
+job_queue = JobQueue.from_environ()
+# Characters analyzed between job progress updates
+JOB_CHUNK_CHARS = 65536
+# Seconds a /jobs/<job_id>/events stream stays open before the client is told to reconnect,
+# so an idle client never holds a worker for long; EventSource reconnects after JOB_EVENTS_RETRY_MS
+JOB_EVENTS_TIMEOUT = float(os.environ.get('JOB_EVENTS_TIMEOUT', 30))
+JOB_EVENTS_RETRY_MS = 2000
+
+# Per-process request, stage, cache and job metrics served by /metrics
+metrics = MetricsRegistry()
+metrics.describe('requests_total', 'counter', 'Requests handled, by route, method and status')
+metrics.describe('request_duration_seconds', 'histogram', 'Request latency by route', LATENCY_BUCKETS)
+metrics.describe('stage_duration_seconds', 'histogram', 'Time spent in each detector/rephraser stage, by route', LATENCY_BUCKETS)
+metrics.describe('request_size_bytes', 'histogram', 'Request body size by route', SIZE_BUCKETS)
+metrics.describe('result_cache_hits_total', 'counter', 'Result cache lookups that hit')
+metrics.describe('result_cache_misses_total', 'counter', 'Result cache lookups that missed')
+metrics.describe('result_cache_entries', 'gauge', 'Results held in the cache')
+metrics.describe('result_cache_bytes', 'gauge', 'Size of the cached results')
+metrics.describe('jobs', 'gauge', 'Background jobs by status')
+metrics.describe('paragraph_cache_hits_total', 'counter', 'Draft paragraphs whose summary was reused')
+metrics.describe('paragraph_cache_misses_total', 'counter', 'Draft paragraphs that had to be analyzed')
+metrics.describe('extraction_cache_hits_total', 'counter', 'Uploaded documents whose extracted text was reused')
+metrics.describe('extraction_cache_misses_total', 'counter', 'Uploaded documents that had to be extracted')
+
+metrics.describe('corpus_documents', 'gauge', 'Documents in the reference corpus')
+metrics.describe('ingest_pending', 'gauge', 'Analyzed submissions waiting to be written to the corpus')
+metrics.describe('ingest_written_total', 'counter', 'Analyzed submissions written to the corpus by this worker')
+metrics.describe('executor_in_flight', 'gauge', 'Tasks running or queued in the work executor')
+metrics.describe('executor_rejected_total', 'counter', 'Requests answered 503 because the work executor was full')
+metrics.describe('executor_timeouts_total', 'counter', 'Requests answered 504 because their task ran too long')
+
+# Share of /rephrase requests whose changes are logged (at INFO, see LOG_LEVEL)
+sample_rephrase_log = LogSampler(float(os.environ.get('REPHRASE_LOG_SAMPLE_RATE', 0.01)))
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.stage_collector = collect_stages()
+    g.stage_timings = g.stage_collector.__enter__()
+
+@app.after_request
+def record_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    labels = {'route': route, 'method': request.method}
+    metrics.inc('requests_total', {**labels, 'status': response.status_code})
+    metrics.observe('request_duration_seconds', time.perf_counter() - g.request_started, labels)
+    for name, seconds in g.stage_timings.seconds.items():
+        metrics.observe('stage_duration_seconds', seconds, {'route': route, 'stage': name})
+    if request.content_length is not None:
+        metrics.observe('request_size_bytes', request.content_length, labels)
+    return response
+
+@app.before_request
+def start_job_workers():
+    # Jobs left queued by an exited process wait for a process that runs workers;
+    # gunicorn starts them at boot (post_worker_init), other servers on the first request
+    job_queue.start()
+
+@app.teardown_request
+def stop_request_metrics(exc):
+    collector = g.pop('stage_collector', None)
+    if collector is not None:
+        collector.__exit__(None, None, None)
+
+# Registered after the metrics hooks, so refused requests are still counted
+@app.before_request
+def limit_request_size():
+    """Apply the body limit of the requested route, refusing declared lengths over it before reading"""
+    if request.endpoint == 'analyze_upload':
+        request.max_content_length = MAX_UPLOAD_BYTES + UPLOAD_FORM_BYTES
+    elif request.endpoint == 'analyze_stream':
+        request.max_content_length = None
+    limit = request.max_content_length
+    if limit is not None and request.content_length is not None and request.content_length > limit:
+        raise RequestEntityTooLarge()
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    if request.endpoint == 'analyze_upload':
+        return jsonify({'error': f'Uploaded files may be at most {MAX_UPLOAD_BYTES} bytes'}), 413
+    return jsonify({'error': f'Request bodies may be at most {request.max_content_length} bytes'}), 413
+
+def with_debug(result, data=None):
+    """Add per-stage timings to a response when asked with ?debug=1 or "debug": true"""
+    requested = request.args.get('debug', '').lower() in ('1', 'true', 'yes')
+    if not requested and not (isinstance(data, dict) and data.get('debug')):
+        return result
+    return {**result, 'debug': {
+        'stages_ms': g.stage_timings.as_milliseconds(),
+        'elapsed_ms': round((time.perf_counter() - g.request_started) * 1000, 3)
+    }}
+
+def run_inline(function, *args, **kwargs):
+    return function(*args, **kwargs)
+
+def run_cpu_bound(function, *args, **kwargs):
+    """Run function in the work executor when there is one, else in this thread"""
+    if work_executor is None:
+        return function(*args, **kwargs)
+    return work_executor.run(function, *args, **kwargs)
+
+def overloaded_response(e):
+    """503 or 504 response for work the executor rejected or gave up waiting for"""
+    response = jsonify({'error': str(e)})
+    response.status_code = e.status
+    if e.retry_after is not None:
+        response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+# Executor tasks are pickled by reference, so they call the module's objects through these
+def detect_plagiarism(text, top_k, submitter=None):
+    return detector.detect_plagiarism(text, top_k=top_k, submitter=submitter)
+
+def detect_plagiarism_batch(texts, top_k, submitters=None):
+    return detector.detect_plagiarism_batch(texts, top_k=top_k, submitters=submitters)
+
+def detect_collusion(texts):
+    return collusion_detector.detect(texts)
+
+def align_texts(first, second):
+    return aligner.align_texts(first, second)
+
+def analyze_document(path, kind, top_k, submitter=None):
+    """Analyze an uploaded document as its text is extracted; returns the result and the text"""
+    analyzer = StreamingAnalyzer(detector)
+    # The text is also kept for the extraction cache, corpus lookups and ingestion
+    pieces = []
+    with open(path, 'rb') as f:
+        for chunk in iter_document_text(f, kind, STREAM_CHUNK_BYTES, MAX_UPLOAD_CHARS):
+            analyzer.feed(chunk)
+            pieces.append(chunk)
+    summary = analyzer.close()
+    
+    if summary.token_count == 0:
+        raise ExtractionError('The document contains no text')
+    
+    if analyzer.characters < 50:
+        raise ExtractionError('Please provide at least 50 characters for meaningful analysis')
+    
+    text = normalize_text(''.join(pieces))
+    pieces.clear()
+    summary.text = text
+    summary.submitter = submitter
+    return detector.detect_from_summary(summary, top_k), text
+
+def detect_incremental(paragraphs, summaries, top_k, submitter=None):
+    """Score a draft from per-paragraph summaries, summarizing the paragraphs that have none
+    
+    Returns the result and the summaries that were computed, for the paragraph cache.
+    """
+    summary = TextSummary()
+    computed = {}
+    for i, (paragraph, cached) in enumerate(zip(paragraphs, summaries)):
+        if cached is None:
+            cached = computed[i] = detector.summarize(paragraph).to_dict()
+        summary.merge(TextSummary.from_dict(cached))
+    # Corpus sources compare the whole text, so they are the one part recomputed on every check;
+    # it is normalized as /analyze normalizes it (surrounding whitespace does not change the counts)
+    summary.text = normalize_text('\n\n'.join(paragraphs))
+    summary.submitter = submitter
+    return detector.detect_from_summary(summary, top_k), computed
+
+def ingest_submission(text, submitter=None):
+    """Queue an analyzed text for the reference corpus when ingestion is enabled"""
+    if ingestor is not None:
+        ingestor.submit(text, submitter=submitter)
+
+def read_submitter(value):
+    """The optional submitter id of a request: a non-empty string, or None"""
+    if value is None or value == '':
+        return None
+    if not isinstance(value, str) or len(value) > 256:
+        raise ValueError('Submitter must be a string of at most 256 characters')
+    return value
+
+def read_top_k(value):
+    """The number of sources a request asks for: 1 to 50, the detector's default when not given"""
+    if value is None or value == '':
+        return detector.top_k_sources
+    try:
+        top_k = int(value)
+    except (TypeError, ValueError):
+        top_k = 0
+    if isinstance(value, bool) or top_k < 1:
+        raise ValueError('top_k must be an integer of at least 1')
+    return min(top_k, 50)
+
+def cached_analysis(key, text, submitter, compute):
+    """result_cache.get_or_compute for results that compare text against the corpus
+    
+    Keys hold the corpus's fit rather than its size, so ingesting a submission
+    does not discard every cached result. Each entry records how many documents
+    the corpus held; a hit is only served once the documents added since are
+    known not to be sources of the text, and recomputed otherwise.
+    """
+    documents = detector.corpus_documents()
+    entry = result_cache.get(key)
+    if entry is not None:
+        if entry['documents'] == documents:
+            return entry['result']
+        if not detector.has_new_sources(text, entry['documents'], submitter):
+            result_cache.set(key, {**entry, 'documents': documents})
+            return entry['result']
+    result = compute()
+    result_cache.set(key, {'result': result, 'documents': documents})
+    return result
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -628,20 +605,298 @@ def index():
 def analyze():
     try:
         data = request.json
-        text = data.get('text', '')
+        text = normalize_text(data.get('text', ''))
         
-        if not text.strip():
+        if not text:
             return jsonify({'error': 'Text must be provided and cannot be empty'}), 400
         
-        if len(text.strip()) < 50:
+        if len(text) < 50:
             return jsonify({'error': 'Please provide at least 50 characters for meaningful analysis'}), 400
         
-        result = detector.detect_plagiarism(text)
-        return jsonify(result)
+        try:
+            submitter = read_submitter(data.get('submitter'))
+            top_k = read_top_k(data.get('top_k'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        key = make_key('analyze', text, top_k, submitter, detector.config_key())
+        result = cached_analysis(key, text, submitter, lambda: run_cpu_bound(detect_plagiarism, text, top_k, submitter))
+        ingest_submission(text, submitter)
+        return jsonify(with_debug(result, data))
     
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         return jsonify({'error': f'An error occurred during analysis: {str(e)}'}), 500
 
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    try:
+        data = request.json
+        texts = data.get('texts', [])
+        
+        if not isinstance(texts, list) or not texts:
+            return jsonify({'error': 'A non-empty list of texts must be provided'}), 400
+        
+        if len(texts) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'At most {MAX_BATCH_SIZE} texts can be analyzed per batch'}), 400
+        
+        if not all(isinstance(text, str) for text in texts):
+            return jsonify({'error': 'Every text must be a string'}), 400
+        
+        # Optional submitter id per text, in the same order
+        submitters = data.get('submitters')
+        try:
+            if submitters is not None:
+                if not isinstance(submitters, list) or len(submitters) != len(texts):
+                    raise ValueError('Submitters must be a list with one entry per text')
+                submitters = [read_submitter(submitter) for submitter in submitters]
+            top_k = read_top_k(data.get('top_k'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        result = run_cpu_bound(detect_plagiarism_batch, texts, top_k, submitters)
+        for i, text in enumerate(map(normalize_text, texts)):
+            if len(text) >= 50:
+                ingest_submission(text, submitters[i] if submitters is not None else None)
+        return jsonify(with_debug(result, data))
+    
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return jsonify({'error': f'An error occurred during batch analysis: {str(e)}'}), 500
+
+@app.route('/analyze/collusion', methods=['POST'])
+def analyze_collusion():
+    try:
+        data = request.json
+        texts = data.get('texts', [])
+        
+        if not isinstance(texts, list) or len(texts) < 2:
+            return jsonify({'error': 'A list of at least two texts must be provided'}), 400
+        
+        if len(texts) > MAX_COLLUSION_SIZE:
+            return jsonify({'error': f'At most {MAX_COLLUSION_SIZE} texts can be compared at once'}), 400
+        
+        if not all(isinstance(text, str) for text in texts):
+            return jsonify({'error': 'Every text must be a string'}), 400
+        
+        result = run_cpu_bound(detect_collusion, texts)
+        return jsonify(with_debug(result, data))
+    
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return jsonify({'error': f'An error occurred during collusion detection: {str(e)}'}), 500
+
+@app.route('/align', methods=['POST'])
+def align():
+    try:
+        data = request.json
+        first = data.get('first', '')
+        second = data.get('second', '')
+        
+        if not isinstance(first, str) or not isinstance(second, str) or not first.strip() or not second.strip():
+            return jsonify({'error': 'Two texts must be provided'}), 400
+        
+        result = run_cpu_bound(align_texts, first, second)
+        return jsonify(with_debug(result, data))
+    
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return jsonify({'error': f'An error occurred during alignment: {str(e)}'}), 500
+
+@app.route('/analyze/incremental', methods=['POST'])
+def analyze_incremental():
+    """Re-check a draft sent as paragraphs, each either {"text": ...} or the {"hash": ...} of an earlier check"""
+    try:
+        data = request.json
+        items = data.get('paragraphs', [])
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'A non-empty list of paragraphs must be provided'}), 400
+        
+        if len(items) > MAX_PARAGRAPHS:
+            return jsonify({'error': f'At most {MAX_PARAGRAPHS} paragraphs can be analyzed at once'}), 400
+        
+        paragraphs, hashes = [], []
+        for item in items:
+            if isinstance(item, dict) and isinstance(item.get('text'), str):
+                paragraph = item['text'].replace('\r\n', '\n').replace('\r', '\n')
+                paragraphs.append(paragraph)
+                hashes.append(make_key(paragraph))
+            elif isinstance(item, dict) and isinstance(item.get('hash'), str):
+                paragraphs.append(None)
+                hashes.append(item['hash'])
+            else:
+                return jsonify({'error': 'Every paragraph must be {"text": ...} or {"hash": ...}'}), 400
+        
+        # Summaries depend on the patterns and tokenizer, so a detector change invalidates them
+        summary_key = detector.summary_key()
+        entries = [paragraph_cache.get(make_key('paragraph', digest, summary_key)) for digest in hashes]
+        missing = [i for i, (paragraph, entry) in enumerate(zip(paragraphs, entries)) if paragraph is None and entry is None]
+        if missing:
+            return jsonify({'error': 'Some paragraphs are no longer cached; send their text', 'missing': missing}), 409
+        paragraphs = [entry['text'] if paragraph is None else paragraph for paragraph, entry in zip(paragraphs, entries)]
+        
+        text = normalize_text('\n\n'.join(paragraphs))
+        if not text:
+            return jsonify({'error': 'Text must be provided and cannot be empty'}), 400
+        
+        if len(text) < 50:
+            return jsonify({'error': 'Please provide at least 50 characters for meaningful analysis'}), 400
+        
+        try:
+            submitter = read_submitter(data.get('submitter'))
+            top_k = read_top_k(data.get('top_k'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        summaries = [entry['summary'] if entry is not None else None for entry in entries]
+        
+        def compute():
+            result, computed = run_cpu_bound(detect_incremental, paragraphs, summaries, top_k, submitter)
+            for i, summary in computed.items():
+                paragraph_cache.set(make_key('paragraph', hashes[i], summary_key), {'text': paragraphs[i], 'summary': summary})
+            return result
+        
+        # Drafts are not ingested into the corpus, or each would match its own earlier versions;
+        # the final text is submitted through /analyze (the web UI's Analyze button), which ingests it
+        key = make_key('incremental', hashes, top_k, submitter, detector.config_key())
+        result = cached_analysis(key, text, submitter, compute)
+        reused = sum(entry is not None for entry in entries)
+        return jsonify(with_debug({**result, 'incremental': {
+            'paragraph_hashes': hashes,
+            'reused': reused,
+            'analyzed': len(hashes) - reused
+        }}, data))
+    
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return jsonify({'error': f'An error occurred during incremental analysis: {str(e)}'}), 500
+
+@app.route('/analyze/stream', methods=['POST'])
+def analyze_stream():
+    try:
+        # Either a multipart upload or the raw text/plain request body
+        upload = request.files.get('file') if request.mimetype == 'multipart/form-data' else None
+        stream = upload.stream if upload is not None else request.stream
+        
+        analyzer = StreamingAnalyzer(detector)
+        summary = analyzer.analyze(normalize_newlines(iter_decoded(stream, STREAM_CHUNK_BYTES)))
+        
+        if summary.token_count == 0:
+            return jsonify({'error': 'Text must be provided and cannot be empty'}), 400
+        
+        if analyzer.characters < 50:
+            return jsonify({'error': 'Please provide at least 50 characters for meaningful analysis'}), 400
+        
+        return jsonify(with_debug(detector.detect_from_summary(summary)))
+    
+    except Exception as e:
+        return jsonify({'error': f'An error occurred during streaming analysis: {str(e)}'}), 500
+
+@app.route('/analyze/upload', methods=['POST'])
+def analyze_upload():
+    try:
+        upload = request.files.get('file')
+        
+        if upload is None or not upload.filename:
+            return jsonify({'error': 'A .txt, .docx or .pdf file must be uploaded as "file"'}), 400
+        
+        kind = document_kind(upload.filename, upload.stream.read(8))
+        upload.stream.seek(0)
+        digest, size = file_digest(upload.stream)
+        
+        if size > MAX_UPLOAD_BYTES:
+            return jsonify({'error': f'Uploaded files may be at most {MAX_UPLOAD_BYTES} bytes'}), 413
+        
+        try:
+            submitter = read_submitter(request.form.get('submitter'))
+            top_k = read_top_k(request.form.get('top_k'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        extraction_key = make_key('extract', digest, kind)
+        # Re-uploads of the same file skip extraction; the text's analysis is then cached like /analyze's
+        text = extraction_cache.get(extraction_key)
+        
+        if text is None:
+            # Pool processes cannot share the upload stream, so a miss copies it to a file they can open
+            upload.stream.seek(0)
+            with tempfile.NamedTemporaryFile(suffix=kind, delete=False) as f:
+                shutil.copyfileobj(upload.stream, f)
+            documents = detector.corpus_documents()
+            try:
+                result, text = run_cpu_bound(analyze_document, f.name, kind, top_k, submitter)
+            finally:
+                os.unlink(f.name)
+            extraction_cache.set(extraction_key, text)
+            key = make_key('analyze', text, top_k, submitter, detector.config_key())
+            result_cache.set(key, {'result': result, 'documents': documents})
+        else:
+            key = make_key('analyze', text, top_k, submitter, detector.config_key())
+            result = cached_analysis(key, text, submitter, partial(run_cpu_bound, detect_plagiarism, text, top_k, submitter))
+        
+        ingest_submission(text, submitter)
+        return jsonify(with_debug(result))
+    
+    except RequestEntityTooLarge:
+        raise
+    except ExtractionError as e:
+        return jsonify({'error': str(e)}), 400
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return jsonify({'error': f'An error occurred during document analysis: {str(e)}'}), 500
+
+def rephrase_result(text, style, creativity, rng):
+    """Rephrase text and build the /rephrase response body"""
+    # Rephrase the text, adding transitions between sentences in the same pass
+    improved_text, changes_made = rephraser.rephrase_text(text, style, creativity, rng)
+    
+    # Count the number of words changed
+    words_changed = len([c for c in changes_made if c['original'] != 'sentence_start'])
+    
+    # A sample of requests is logged as one JSON line, with the first few changes for verification
+    if logger.isEnabledFor(logging.INFO) and sample_rephrase_log():
+        logger.info(json.dumps({
+            'event': 'rephrase',
+            'style': style,
+            'creativity': creativity,
+            'original_length': len(text.split()),
+            'words_changed': words_changed,
+            'changes': [f"{change['original']} -> {change['replacement']}" for change in changes_made[:5]]
+        }))
+    
+    return {
+        'rephrased_text': improved_text,
+        'original_text': text,
+        'original_length': len(text.split()),
+        'rephrased_length': len(improved_text.split()),
+        'words_changed': words_changed,
+        'changes_made': changes_made,
+        'style': style,
+        'creativity': creativity
+    }
+
+def seeded_rng(seed):
+    """NumPy generator for a /rephrase seed, which may be any integer or string"""
+    return np.random.default_rng(int(make_key(seed), 16))
+
+def cached_rephrase_result(text, style, creativity, seed=None, run=run_cpu_bound):
+    """rephrase_result, served from the result cache when a seed makes it reproducible"""
+    if seed is None:
+        # Unseeded requests are meant to vary, so they are never cached
+        return run(rephrase_result, text, style, creativity, np.random.default_rng())
+    
+    key = make_key('rephrase', text, style, creativity, seed, rephraser.config_key())
+    return result_cache.get_or_compute(
+        key, lambda: run(rephrase_result, text, style, creativity, seeded_rng(seed))
+    )
+
 @app.route('/rephrase', methods=['POST'])
 def rephrase():
     try:
@@ -656,40 +911,187 @@ def rephrase():
         if len(text.strip()) < 10:
             return jsonify({'error': 'Please provide at least 10 characters for rephrasing'}), 400
         
-        # Rephrase the text
-        rephrased_text, changes_made = rephraser.rephrase_text(text, style, creativity)
+        seed = data.get('seed')
+        if seed is not None and not isinstance(seed, (int, str)):
+            return jsonify({'error': 'Seed must be an integer or a string'}), 400
         
-        # Improve structure
-        improved_text = rephraser.improve_structure(rephrased_text, style)
+        return jsonify(with_debug(cached_rephrase_result(text, style, creativity, seed), data))
+    
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return jsonify({'error': f'An error occurred during rephrasing: {str(e)}'}), 500
+
+def run_analyze_job(payload, progress):
+    """Job handler for 'analyze': same result as /analyze, reporting progress as text is read"""
+    text, top_k, submitter = payload['text'], payload['top_k'], payload.get('submitter')
+    
+    def compute():
+        analyzer = StreamingAnalyzer(detector)
+        for start in range(0, len(text), JOB_CHUNK_CHARS):
+            analyzer.feed(text[start:start + JOB_CHUNK_CHARS])
+            progress(0.9 * min(start + JOB_CHUNK_CHARS, len(text)) / len(text))
+        summary = analyzer.close()
+        # With the full text attached, corpus sources are reported as well
+        summary.text = text
+        summary.submitter = submitter
+        return detector.detect_from_summary(summary, top_k)
+    
+    key = make_key('analyze', text, top_k, submitter, detector.config_key())
+    result = cached_analysis(key, text, submitter, compute)
+    ingest_submission(text, submitter)
+    return result
+
+def run_rephrase_job(payload, progress):
+    """Job handler for 'rephrase': same result as /rephrase"""
+    progress(0.1)
+    # Jobs already run in their own thread and may take as long as they need, so no executor timeout
+    return cached_rephrase_result(payload['text'], payload['style'], payload['creativity'], payload['seed'], run=run_inline)
+
+job_queue.register('analyze', run_analyze_job)
+job_queue.register('rephrase', run_rephrase_job)
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    try:
+        data = request.json
+        kind = data.get('type', 'analyze')
         
-        # Count the number of words changed
-        words_changed = len([c for c in changes_made if c['original'] != 'sentence_start'])
+        if kind not in ('analyze', 'rephrase'):
+            return jsonify({'error': "Job type must be 'analyze' or 'rephrase'"}), 400
         
-        # Debug: print changes for verification
-        print(f"Debug: {words_changed} words changed")
-        for change in changes_made[:5]:  # Print first 5 changes
-            print(f"  {change['original']} -> {change['replacement']}")
+        if kind == 'analyze':
+            text = normalize_text(data.get('text', ''))
+            if not text:
+                return jsonify({'error': 'Text must be provided and cannot be empty'}), 400
+            if len(text) < 50:
+                return jsonify({'error': 'Please provide at least 50 characters for meaningful analysis'}), 400
+            try:
+                submitter = read_submitter(data.get('submitter'))
+                top_k = read_top_k(data.get('top_k'))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            payload = {
+                'text': text,
+                'top_k': top_k,
+                'submitter': submitter
+            }
+        else:
+            text = data.get('text', '')
+            if not text.strip():
+                return jsonify({'error': 'Text must be provided and cannot be empty'}), 400
+            if len(text.strip()) < 10:
+                return jsonify({'error': 'Please provide at least 10 characters for rephrasing'}), 400
+            seed = data.get('seed')
+            if seed is not None and not isinstance(seed, (int, str)):
+                return jsonify({'error': 'Seed must be an integer or a string'}), 400
+            payload = {
+                'text': text,
+                'style': data.get('style', 'academic'),
+                'creativity': data.get('creativity', 'medium'),
+                'seed': seed
+            }
         
+        job_id = job_queue.submit(kind, payload)
         return jsonify({
-            'rephrased_text': improved_text,
-            'original_text': text,
-            'original_length': len(text.split()),
-            'rephrased_length': len(improved_text.split()),
-            'words_changed': words_changed,
-            'changes_made': changes_made,
-            'style': style,
-            'creativity': creativity
-        })
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': url_for('job_status', job_id=job_id),
+            'events_url': url_for('job_events', job_id=job_id)
+        }), 202
     
     except Exception as e:
-        return jsonify({'error': f'An error occurred during rephrasing: {str(e)}'}), 500
+        return jsonify({'error': f'An error occurred while submitting the job: {str(e)}'}), 500
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-sent events with the job's progress until it finishes or JOB_EVENTS_TIMEOUT passes
+    
+    A stream that times out simply ends; the client's EventSource reconnects after
+    the `retry` delay and receives the current status first.
+    """
+    if job_queue.get(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    def events():
+        yield f"retry: {JOB_EVENTS_RETRY_MS}\n\n"
+        deadline = time.monotonic() + JOB_EVENTS_TIMEOUT
+        last = None
+        while True:
+            job = job_queue.get(job_id)
+            if job is None:
+                # Finished jobs are deleted after a day
+                break
+            state = (job['status'], job['progress'])
+            if state != last:
+                last = state
+                yield f"data: {json.dumps(job)}\n\n"
+            if job['status'] in ('done', 'failed') or time.monotonic() >= deadline:
+                break
+            time.sleep(job_queue.poll_interval)
+    
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/jobs/stats')
+def job_stats():
+    return jsonify(job_queue.stats())
+
+@app.route('/metrics')
+def prometheus_metrics():
+    cache = result_cache.stats()
+    metrics.set('result_cache_hits_total', cache['hits'])
+    metrics.set('result_cache_misses_total', cache['misses'])
+    metrics.set('result_cache_entries', cache['entries'])
+    metrics.set('result_cache_bytes', cache['bytes'])
+    paragraphs = paragraph_cache.stats()
+    metrics.set('paragraph_cache_hits_total', paragraphs['hits'])
+    metrics.set('paragraph_cache_misses_total', paragraphs['misses'])
+    extractions = extraction_cache.stats()
+    metrics.set('extraction_cache_hits_total', extractions['hits'])
+    metrics.set('extraction_cache_misses_total', extractions['misses'])
+    for status, count in job_queue.stats().items():
+        metrics.set('jobs', count, {'status': status})
+    if detector.corpus is not None:
+        metrics.set('corpus_documents', len(detector.corpus))
+    if ingestor is not None:
+        ingest = ingestor.stats()
+        metrics.set('ingest_pending', ingest['pending'])
+        metrics.set('ingest_written_total', ingest['written'])
+    if work_executor is not None:
+        executor = work_executor.stats()
+        metrics.set('executor_in_flight', executor['in_flight'])
+        metrics.set('executor_rejected_total', executor['rejected'])
+        metrics.set('executor_timeouts_total', executor['timed_out'])
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify(result_cache.stats())
 
 @app.route('/about')
 def about():
     return render_template('about.html')
 
+@app.route('/health')
+def health():
+    return jsonify({
+        'status': 'ok',
+        'pid': os.getpid(),
+        'startup_seconds': round(STARTUP_SECONDS, 4),
+        'nlp_resources_loaded': nlp_resources.is_loaded()
+    })
+
+# Time from the first import to a ready app, excluding lazily loaded resources
+STARTUP_SECONDS = time.perf_counter() - _import_started
+
 if __name__ == '__main__':
-    import os
     # Use PORT environment variable for deployment platforms
     port = int(os.environ.get('PORT', 5000))
     # Use host 0.0.0.0 for external access
@@ -0,0 +1,248 @@
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from measure_startup import git_revision
+
+DEFAULT_SIZES = '1KB,10KB,100KB,1MB,10MB'
+UNITS = {'KB': 1024, 'MB': 1024 * 1024, 'B': 1}
+
+# Building blocks of the generated essays: plain student prose mixed with the
+# citations, dates, transitions and encyclopedic phrasing the detectors look for
+TOPICS = [
+    ('the French Revolution', 'the monarchy', 'political reform'),
+    ('Napoleon Bonaparte', 'the Coalition', 'military strategy'),
+    ('climate change', 'coastal cities', 'renewable energy'),
+    ('the printing press', 'European universities', 'literacy'),
+    ('social media', 'young people', 'public debate'),
+    ('the Industrial Revolution', 'factory workers', 'urban growth'),
+]
+OPENERS = [
+    'In addition,', 'However,', 'Furthermore,', 'For example,', 'As a result,', 'On the other hand,',
+    'According to historians,', 'Moreover,', 'In other words,', 'Therefore,', '', '', '', ''
+]
+CLAUSES = [
+    '{subject} changed the way {group} thought about {theme}',
+    'many people believe that {subject} had a big impact on {group}',
+    'it is important to note that {theme} was not a new idea',
+    "{group} didn't always agree with the new rules on {theme}",
+    'studies have shown that {subject} made {theme} much more important',
+    'the debate about {theme} is still studied in schools today',
+    '{subject} is known for its influence on {group} and on {theme}',
+    'in {year} the leaders of {group} defeated their rivals at the Battle of {place}',
+    'the Emperor and his army invaded {place} in {year}, which led to the collapse of the old order',
+    'this shows that {theme} was very different for {group} than it is now',
+    'historians use many sources to explain why {subject} happened when it did',
+    "we can't understand {theme} without looking at {group} first",
+]
+ASIDES = [
+    ' (Smith, {year})', ' [{ref}]', ', as Dr. Brown et al. argue,', ' - a good example of the problem -',
+    ' (see vol. {ref}, pp. {ref}-{page})', ', i.e. a simple change,', '', '', '', '', '', ''
+]
+PLACES = ['Austerlitz', 'Waterloo', 'Leipzig', 'Vienna', 'Paris', 'Madrid', 'Moscow', 'London']
+
+
+def parse_size(value):
+    value = value.strip().upper()
+    for unit, factor in UNITS.items():
+        if value.endswith(unit):
+            return int(float(value[:-len(unit)]) * factor)
+    return int(value)
+
+
+def format_size(size):
+    for unit in ('MB', 'KB'):
+        if size >= UNITS[unit] and size % UNITS[unit] == 0:
+            return f'{size // UNITS[unit]}{unit}'
+    return f'{size}B'
+
+
+def generate_sentence(rng, topic):
+    subject, group, theme = topic
+    clause = rng.choice(CLAUSES).format(
+        subject=subject, group=group, theme=theme, year=rng.randint(1450, 2020), place=rng.choice(PLACES)
+    )
+    aside = rng.choice(ASIDES).format(year=rng.randint(1950, 2023), ref=rng.randint(1, 40), page=rng.randint(41, 99))
+    opener = rng.choice(OPENERS)
+    sentence = f'{opener} {clause}' if opener else clause[0].upper() + clause[1:]
+    if aside.startswith(','):
+        words = sentence.split(' ')
+        cut = rng.randint(1, max(1, len(words) - 1))
+        sentence = ' '.join(words[:cut]) + aside + ' ' + ' '.join(words[cut:])
+    else:
+        sentence += aside
+    return sentence + rng.choice('..........?!')
+
+
+def generate_essay(rng):
+    """One essay: a few paragraphs of 3-8 sentences on a single topic"""
+    topic = rng.choice(TOPICS)
+    paragraphs = [
+        ' '.join(generate_sentence(rng, topic) for _ in range(rng.randint(3, 8)))
+        for _ in range(rng.randint(3, 6))
+    ]
+    return '\n\n'.join(paragraphs)
+
+
+def generate_text(size, seed=0):
+    """Essays joined at paragraph breaks until the text is about size characters long"""
+    rng = random.Random(seed)
+    essays, length = [], 0
+    while length < size:
+        essay = generate_essay(rng)
+        essays.append(essay)
+        length += len(essay) + 2
+    return '\n\n'.join(essays)[:size].rsplit(' ', 1)[0]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_case(function, size, budget, min_runs, max_runs):
+    """Time function() repeatedly; the first call is untimed and measures peak traced memory"""
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < max_runs and (len(samples) < min_runs or time.perf_counter() - started < budget):
+        run_started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - run_started)
+    p50 = percentile(samples, 0.5)
+    return {
+        'runs': len(samples),
+        'p50_ms': round(p50 * 1000, 3),
+        'p99_ms': round(percentile(samples, 0.99) * 1000, 3),
+        'throughput_mb_s': round(size / UNITS['MB'] / p50, 3) if p50 else None,
+        'peak_memory_mb': round(peak / UNITS['MB'], 3)
+    }
+
+
+def build_cases(app):
+    """Benchmarked callables, as {name: factory(text) -> function()}"""
+    import numpy as np
+    from engine import AnalysisDocument
+    detector, rephraser = app.detector, app.rephraser
+    client = app.app.test_client()
+
+    def post(route, body):
+        # Cached results would hide the work, so every request starts cold
+        app.result_cache.clear()
+        response = client.post(route, json=body)
+        if response.status_code != 200:
+            raise RuntimeError(f'{route} returned {response.status_code}: {response.get_data(as_text=True)[:200]}')
+
+    def method(name):
+        return lambda text: lambda: getattr(detector, name)(text)
+
+    cases = {
+        'tokenize': lambda text: lambda: AnalysisDocument(text, detector.scanner, detector.tokenizer).words,
+        'detect_plagiarism': method('detect_plagiarism'),
+    }
+    names = [
+        'analyze_text_statistics', 'detect_suspicious_patterns', 'analyze_sentence_structure',
+        'detect_common_phrases', 'detect_wikipedia_like_content', 'detect_historical_content',
+        'count_formal_indicators'
+    ]
+    if detector.corpus is not None:
+        names += ['find_similar_sources', 'find_matching_passages']
+    for name in names:
+        cases[name] = method(name)
+    cases.update({
+        'rephrase_text': lambda text: lambda: rephraser.rephrase_text(text, 'academic', 'medium', np.random.default_rng(0)),
+        'POST /analyze': lambda text: lambda: post('/analyze', {'text': text}),
+        'POST /rephrase': lambda text: lambda: post('/rephrase', {'text': text, 'seed': 0}),
+    })
+    return cases
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Cases whose p50 latency or peak memory grew beyond the tolerance"""
+    regressions = []
+    previous = {(case['case'], case['size']): case for case in baseline['cases']}
+    for case in results['cases']:
+        before = previous.get((case['case'], case['size']))
+        if before is None:
+            continue
+        delta_ms = case['p50_ms'] - before['p50_ms']
+        if delta_ms > min_delta_ms and case['p50_ms'] > before['p50_ms'] * (1 + tolerance):
+            regressions.append(f"{case['case']} @ {case['size']}: p50 {before['p50_ms']}ms -> {case['p50_ms']}ms")
+        delta_mb = case['peak_memory_mb'] - before['peak_memory_mb']
+        if delta_mb > 1 and case['peak_memory_mb'] > before['peak_memory_mb'] * (1 + tolerance):
+            regressions.append(
+                f"{case['case']} @ {case['size']}: peak memory {before['peak_memory_mb']}MB -> {case['peak_memory_mb']}MB"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the detector, the rephraser and the Flask routes')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help=f'comma-separated text sizes (default {DEFAULT_SIZES})')
+    parser.add_argument('--cases', help='comma-separated case names to run (default all)')
+    parser.add_argument('--budget', type=float, default=2.0, help='seconds of timed runs per case and size')
+    parser.add_argument('--min-runs', type=int, default=3)
+    parser.add_argument('--max-runs', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0, help='seed of the generated corpus')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='fail if results regress against this saved --output file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown or memory growth')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0, help='ignore slowdowns smaller than this')
+    args = parser.parse_args()
+
+    import app
+    cases = build_cases(app)
+    if args.cases:
+        selected = [name.strip() for name in args.cases.split(',')]
+        unknown = set(selected) - set(cases)
+        if unknown:
+            parser.error(f"unknown cases: {', '.join(sorted(unknown))}; choose from {', '.join(cases)}")
+        cases = {name: cases[name] for name in selected}
+
+    results = {
+        'revision': git_revision(), 'python': sys.version.split()[0],
+        'tier': app.detector.tier, 'tokenizer': app.detector.tokenizer.name, 'cases': []
+    }
+    # Lazily loaded resources (stopwords, compiled patterns) would count against the first size
+    warmup = generate_text(1024, args.seed)
+    for factory in cases.values():
+        factory(warmup)()
+
+    print(f"{'case':<30} {'size':>6} {'runs':>5} {'p50 ms':>10} {'p99 ms':>10} {'MB/s':>8} {'peak MB':>9}")
+    for size in map(parse_size, args.sizes.split(',')):
+        text = generate_text(size, args.seed)
+        for name, factory in cases.items():
+            case = {'case': name, 'size': format_size(size), **run_case(
+                factory(text), len(text), args.budget, args.min_runs, args.max_runs
+            )}
+            results['cases'].append(case)
+            print(
+                f"{name:<30} {case['size']:>6} {case['runs']:>5} {case['p50_ms']:>10.2f} "
+                f"{case['p99_ms']:>10.2f} {case['throughput_mb_s'] or 0:>8.2f} {case['peak_memory_mb']:>9.2f}",
+                flush=True
+            )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\nREGRESSIONS against {args.baseline} ({baseline.get('revision')}):")
+            for regression in regressions:
+                print(f'  {regression}')
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline} ({baseline.get('revision')})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """Canonical form of submitted text: unified line endings, no surrounding whitespace"""
+    return text.replace('\r\n', '\n').replace('\r', '\n').strip()
+
+
+def make_key(*parts):
+    """Stable content hash of any JSON-serializable values"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class MemoryBackend:
+    """In-process LRU store bounded by entry count and total size"""
+
+    name = 'memory'
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.entries[key] = value
+            self.size += len(value)
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        return {'entries': len(self.entries), 'bytes': self.size}
+
+
+class SQLiteBackend:
+    """LRU store in a SQLite file, shared by every worker process on the host"""
+
+    name = 'sqlite'
+
+    def __init__(self, path, max_entries=10000, max_bytes=512 * 1024 * 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+
+    @property
+    def connection(self):
+        # SQLite connections must not cross a fork, so each process opens its own
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+            connection.commit()
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def get(self, key):
+        with self.lock:
+            row = self.connection.execute('SELECT value FROM cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute('UPDATE cache SET accessed = ? WHERE key = ?', (time.time(), key))
+            self.connection.commit()
+            return row[0]
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self.lock:
+            db = self.connection
+            db.execute(
+                'INSERT OR REPLACE INTO cache (key, value, size, accessed) VALUES (?, ?, ?, ?)',
+                (key, value, len(value), time.time())
+            )
+            entries, size = db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache').fetchone()
+            # Evict least recently used rows until both bounds hold
+            while entries > self.max_entries or size > self.max_bytes:
+                batch = max(1, entries - self.max_entries, entries // 10)
+                db.execute(
+                    'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                    (batch,)
+                )
+                entries, size = db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache').fetchone()
+            db.commit()
+
+    def clear(self):
+        with self.lock:
+            self.connection.execute('DELETE FROM cache')
+            self.connection.commit()
+
+    def stats(self):
+        with self.lock:
+            entries, size = self.connection.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache').fetchone()
+        return {'entries': entries, 'bytes': size}
+
+
+class ResultCache:
+    """Content-addressed cache of JSON-serializable results with hit/miss counters"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryBackend()
+        self.hits = 0
+        self.misses = 0
+        # Request threads share the counters, and += on an attribute is not atomic
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        value = self.backend.get(key)
+        with self.lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return None if value is None else json.loads(value)
+
+    def set(self, key, result):
+        self.backend.set(key, json.dumps(result))
+
+    def get_or_compute(self, key, compute):
+        """Return the cached result for key, computing and storing it on a miss"""
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.set(key, result)
+        return result
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self.lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'backend': self.backend.name,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / lookups, 3) if lookups else 0,
+            **self.backend.stats()
+        }
+
+    @classmethod
+    def from_environ(cls, prefix='RESULT_CACHE', max_entries=256, max_bytes=64 * 1024 * 1024):
+        """Build a cache from <prefix>_SIZE, <prefix>_MAX_BYTES and <prefix>_PATH, with the given defaults"""
+        max_entries = int(os.environ.get(f'{prefix}_SIZE', max_entries))
+        max_bytes = int(os.environ.get(f'{prefix}_MAX_BYTES', max_bytes))
+        path = os.environ.get(f'{prefix}_PATH')
+        if path:
+            return cls(SQLiteBackend(path, max_entries, max_bytes))
+        return cls(MemoryBackend(max_entries, max_bytes))
@@ -0,0 +1,249 @@
+import sys
+import json
+import time
+import zlib
+import argparse
+import numpy as np
+from minhash import MinHashIndex, SHINGLE_BASE, MAX_HASH
+from alignment import Aligner, tokenize
+from corpus_store import band_keys
+from metrics import timed
+
+
+def word_fingerprints(word_hashes, k, w):
+    """Winnowing over words: the distinct minimum hashes of every window of w consecutive word k-grams
+
+    Two texts sharing a run of at least k + w - 1 words are guaranteed to
+    share a fingerprint. Vectorized, unlike the character-level winnow().
+    """
+    count = len(word_hashes) - k + 1
+    if count <= 0:
+        return np.zeros(0, dtype=np.uint64)
+    grams = np.zeros(count, dtype=np.uint64)
+    for offset in range(k):
+        grams = (grams * SHINGLE_BASE + word_hashes[offset:offset + count]) & MAX_HASH
+    if count <= w:
+        return grams.min(keepdims=True)
+    return np.unique(np.lib.stride_tricks.sliding_window_view(grams, w).min(axis=1))
+
+
+class Submission:
+    """Lowercased words of a text with their character offsets and ids, plus its candidate-search sketches"""
+
+    __slots__ = ('words', 'starts', 'ends', 'ids', 'signature', 'fingerprints')
+
+    def __init__(self, text, minhash, k, w, vocabulary):
+        self.words, self.starts, self.ends = tokenize(text)
+        # Word ids shared by every submission of the class, for alignment
+        self.ids = np.fromiter((vocabulary.setdefault(word, len(vocabulary)) for word in self.words),
+                               dtype=np.uint64, count=len(self.words))
+        self.signature = minhash.signature(text)
+        hashes = np.fromiter((zlib.crc32(word.encode('utf-8')) for word in self.words), dtype=np.uint64)
+        self.fingerprints = word_fingerprints(hashes, k, w)
+
+
+def bucket_pairs(keys, max_bucket):
+    """Pairs of rows sharing a key, as two index arrays
+
+    Every pair of a bucket is returned, except in buckets larger than
+    max_bucket, which are only chained row to row: that still puts all
+    of their rows in one cluster without a quadratic number of pairs.
+    """
+    order = np.argsort(keys, kind='stable')
+    boundaries = np.flatnonzero(np.diff(keys[order])) + 1
+    firsts, seconds = [], []
+    for bucket in np.split(order, boundaries):
+        if len(bucket) < 2:
+            continue
+        bucket = np.sort(bucket)
+        if len(bucket) > max_bucket:
+            firsts.append(bucket[:-1])
+            seconds.append(bucket[1:])
+        else:
+            first, second = np.triu_indices(len(bucket), k=1)
+            firsts.append(bucket[first])
+            seconds.append(bucket[second])
+    if not firsts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(firsts), np.concatenate(seconds)
+
+
+class CollusionDetector:
+    """Clusters of suspiciously similar submissions within one set of texts
+
+    Comparing every pair is quadratic, so candidate pairs come from two
+    sub-quadratic sources: MinHash LSH buckets over word 3-shingles (whole
+    texts that are near-duplicates) and a thresholded sparse product of
+    word winnowing fingerprints (texts sharing copied passages, ignoring
+    passages that much of the class shares, like a quoted prompt). Only
+    candidate pairs are aligned word by word (alignment.Aligner, which also
+    finds reordered passages), and pairs whose aligned passages cover enough
+    of the shorter text (or are long enough on their own, like one copied
+    paragraph) are linked into clusters.
+    """
+
+    def __init__(self, min_coverage=0.25, min_matched_words=100, min_match_words=8, min_shared_fingerprints=3,
+                 max_fingerprint_share=0.05, max_bucket=50, k=5, w=4):
+        self.min_coverage = min_coverage
+        self.min_matched_words = min_matched_words
+        self.min_match_words = min_match_words
+        self.min_shared_fingerprints = min_shared_fingerprints
+        self.max_fingerprint_share = max_fingerprint_share
+        self.max_bucket = max_bucket
+        # Any run of k + w - 1 words shares a fingerprint; keep it at most min_match_words
+        self.k = k
+        self.w = w
+        self.minhash = MinHashIndex()
+        self.aligner = Aligner(min_length=min_match_words)
+
+    def lsh_pairs(self, submissions):
+        """Candidate pairs whose MinHash signatures agree on at least one band"""
+        signatures = np.array([submission.signature for submission in submissions], dtype=np.uint64)
+        # Texts without a single shingle all share the empty signature
+        empty = (signatures == self.minhash.signature('')).all(axis=1)
+        rows = np.flatnonzero(~empty)
+        keys = band_keys(signatures[rows], self.minhash.bands)
+        pairs = [bucket_pairs(keys[:, band], self.max_bucket) for band in range(self.minhash.bands)]
+        return rows[np.concatenate([first for first, _ in pairs])], rows[np.concatenate([second for _, second in pairs])]
+
+    def fingerprint_pairs(self, submissions):
+        """Candidate pairs sharing at least min_shared_fingerprints uncommon fingerprints"""
+        from scipy import sparse
+        n = len(submissions)
+        hashes = np.concatenate([submission.fingerprints for submission in submissions])
+        rows = np.repeat(np.arange(n), [len(submission.fingerprints) for submission in submissions])
+        unique, columns, counts = np.unique(hashes, return_inverse=True, return_counts=True)
+        # Fingerprints in one text pair nothing; ones in much of the class are shared material
+        keep = ((counts >= 2) & (counts <= max(2, self.max_fingerprint_share * n)))[columns]
+        matrix = sparse.csr_matrix(
+            (np.ones(np.count_nonzero(keep), dtype=np.int32), (rows[keep], columns[keep])), shape=(n, len(unique))
+        )
+        shared = sparse.triu(matrix @ matrix.T, k=1).tocoo()
+        selected = shared.data >= self.min_shared_fingerprints
+        return shared.row[selected].astype(np.int64), shared.col[selected].astype(np.int64)
+
+    def candidate_pairs(self, submissions):
+        """Unique (first, second) pairs with first < second from every candidate source"""
+        firsts, seconds = zip(self.lsh_pairs(submissions), self.fingerprint_pairs(submissions))
+        first, second = np.concatenate(firsts), np.concatenate(seconds)
+        first, second = np.minimum(first, second), np.maximum(first, second)
+        pairs = np.unique(np.stack([first, second], axis=1), axis=0)
+        return pairs[pairs[:, 0] != pairs[:, 1]]
+
+    def align(self, first, second):
+        """Runs of at least min_match_words identical words, as (first_index, second_index, size)"""
+        return self.aligner.align(first.ids, second.ids)
+
+    def compare(self, first, second, i, j):
+        """Aligned passages of two submissions, or None unless they cover enough of the shorter one or enough words"""
+        shorter = min(len(first.words), len(second.words))
+        if shorter < self.min_match_words:
+            return None
+        blocks = self.align(first, second)
+        matched = sum(size for _, _, size in blocks)
+        coverage = matched / shorter
+        if coverage < self.min_coverage and matched < self.min_matched_words:
+            return None
+        return {
+            'first': int(i),
+            'second': int(j),
+            'coverage': round(coverage * 100, 1),
+            'matched_words': matched,
+            'passages': [
+                {
+                    'first_start': int(first.starts[a]),
+                    'first_end': int(first.ends[a + size - 1]),
+                    'second_start': int(second.starts[b]),
+                    'second_end': int(second.ends[b + size - 1]),
+                    'words': size
+                }
+                for a, b, size in blocks
+            ]
+        }
+
+    @timed('collusion')
+    def detect(self, texts):
+        """Clusters of submissions linked by pairs with enough aligned text, largest and strongest first"""
+        from scipy import sparse
+        from scipy.sparse.csgraph import connected_components
+        started = time.perf_counter()
+        vocabulary = {}
+        submissions = [Submission(text, self.minhash, self.k, self.w, vocabulary) for text in texts]
+        sketched = time.perf_counter()
+        candidates = self.candidate_pairs(submissions) if len(submissions) > 1 else np.zeros((0, 2), dtype=np.int64)
+        searched = time.perf_counter()
+
+        pairs = []
+        for i, j in candidates:
+            pair = self.compare(submissions[i], submissions[j], i, j)
+            if pair is not None:
+                pairs.append(pair)
+        aligned = time.perf_counter()
+
+        clusters = []
+        if pairs:
+            edges = np.array([(pair['first'], pair['second']) for pair in pairs])
+            graph = sparse.coo_matrix((np.ones(len(edges)), (edges[:, 0], edges[:, 1])), shape=(len(texts),) * 2)
+            _, labels = connected_components(graph, directed=False)
+            grouped = {}
+            for pair in pairs:
+                grouped.setdefault(int(labels[pair['first']]), []).append(pair)
+            for cluster_pairs in grouped.values():
+                members = sorted({pair[side] for pair in cluster_pairs for side in ('first', 'second')})
+                cluster_pairs.sort(key=lambda pair: pair['coverage'], reverse=True)
+                clusters.append({
+                    'members': members,
+                    'max_coverage': cluster_pairs[0]['coverage'],
+                    'pairs': cluster_pairs
+                })
+            clusters.sort(key=lambda cluster: (len(cluster['members']), cluster['max_coverage']), reverse=True)
+
+        return {
+            'clusters': clusters,
+            'stats': {
+                'texts': len(texts),
+                'candidate_pairs': int(len(candidates)),
+                'flagged_pairs': len(pairs),
+                'all_pairs': len(texts) * (len(texts) - 1) // 2,
+                'seconds': {
+                    'sketch': round(sketched - started, 3),
+                    'candidates': round(searched - sketched, 3),
+                    'alignment': round(aligned - searched, 3)
+                }
+            }
+        }
+
+
+def main():
+    from corpus import read_documents
+    parser = argparse.ArgumentParser(description='Find clusters of suspiciously similar submissions')
+    parser.add_argument('source', help='directory of .txt/.md submissions')
+    parser.add_argument('--min-coverage', type=float, default=0.25,
+                        help='share of the shorter text that aligned passages must cover')
+    parser.add_argument('--min-matched-words', type=int, default=100,
+                        help='aligned words that flag a pair whatever its coverage')
+    parser.add_argument('--min-match-words', type=int, default=8, help='shortest aligned passage, in words')
+    parser.add_argument('--output', help='write the full result as JSON to this file')
+    args = parser.parse_args()
+
+    texts, documents = read_documents(args.source)
+    detector = CollusionDetector(
+        min_coverage=args.min_coverage, min_matched_words=args.min_matched_words, min_match_words=args.min_match_words
+    )
+    result = detector.detect(texts)
+    for cluster in result['clusters']:
+        names = ', '.join(documents[member]['path'] for member in cluster['members'])
+        print(f"{len(cluster['members'])} submissions, up to {cluster['max_coverage']}% aligned: {names}")
+    stats = result['stats']
+    print(
+        f"{stats['texts']} submissions, {stats['candidate_pairs']} of {stats['all_pairs']} pairs aligned, "
+        f"{stats['flagged_pairs']} flagged in {sum(stats['seconds'].values()):.1f}s",
+        file=sys.stderr
+    )
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({**result, 'documents': documents}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import os
+import sys
+import json
+import time
+import argparse
+from collections import Counter
+import nlp_resources
+from tokenizer import NativeTokenizer
+
+SAMPLE_TEXTS = [
+    "Napoleon Bonaparte (born August 15, 1769) was a French military commander. He rose to prominence "
+    "during the French Revolution and led several successful campaigns. According to historians, his "
+    "legacy remains controversial. Dr. Smith, however, didn't agree; he wrote \"it's complicated\" in 1805.",
+    "The U.S. economy grew 3.5% in Q2, i.e. faster than expected... Analysts can't explain it. "
+    "Retrieved from https://example.org/report on Jan. 5, 2020. See also: pp. 12-14 [1].",
+    "Furthermore, the students' results were impressive -- much better than last year's. What happened? "
+    "Nobody knows! The committee's report (see Fig. 3) says 'gonna improve' isn't a plan.",
+    "Dr. Brown et al. argue that the U.K. and the U.N. differ, e.g. in Vol. 2 of the survey. The survey "
+    "ran from 9 a.m. to 5 p.m. on Mon. and Tue. in Sept. of 2019. It cost approx. $40,000 in total.",
+    "Prof. Jones, Ph.D., joined Acme Inc. in 1998. She left for Globex Corp. two years later. Her "
+    "paper (Eq. 4, cf. Ch. 7) is cited as J. R. Smith, pp. 101-109. The results were mixed.",
+]
+
+# Minimum agreement with NLTK before the native tokenizer can stand in for it (see --check)
+SENTENCE_AGREEMENT_MIN = 0.95
+TOKEN_AGREEMENT_MIN = 0.98
+
+# The trained English Punkt model knows well over 100 abbreviations; a handful means a stub
+TRAINED_ABBREVIATIONS_MIN = 100
+
+# word_tokenize rewrites double quotes as `` and ''; the native tokenizer keeps them as written
+QUOTE_FORMS = {'``': '"', "''": '"'}
+
+
+def normalize_quotes(tokens):
+    return [QUOTE_FORMS.get(token, token) for token in tokens]
+
+
+def load_texts(paths):
+    texts = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith('.txt'):
+                    with open(os.path.join(path, name), encoding='utf-8', errors='replace') as f:
+                        texts.append(f.read())
+        elif path.endswith('.json'):
+            with open(path, encoding='utf-8') as f:
+                texts.extend(item if isinstance(item, str) else item['text'] for item in json.load(f))
+        else:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                texts.append(f.read())
+    return texts or SAMPLE_TEXTS
+
+
+def multiset_agreement(expected, actual):
+    """Share of expected items also produced, counting repeats"""
+    if not expected:
+        return 1.0
+    return sum((Counter(expected) & Counter(actual)).values()) / len(expected)
+
+
+def parity(texts, reference, native):
+    """Sentence and token agreement of the native tokenizer with NLTK"""
+    sentence_scores, token_scores, exact_tokens = [], [], 0
+    for text in texts:
+        sentence_scores.append(multiset_agreement(reference.sent_tokenize(text), native.sent_tokenize(text)))
+        # Tokens are compared sentence by sentence over NLTK's segmentation
+        for sentence in reference.sent_tokenize(text):
+            expected = normalize_quotes(reference.word_tokenize(sentence, preserve_line=True))
+            actual = normalize_quotes(native.word_tokenize(sentence, preserve_line=True))
+            token_scores.append(multiset_agreement(expected, actual))
+            exact_tokens += expected == actual
+    return {
+        'sentence_agreement': round(sum(sentence_scores) / len(sentence_scores), 4),
+        'token_agreement': round(sum(token_scores) / max(len(token_scores), 1), 4),
+        'identical_sentences': f'{exact_tokens}/{len(token_scores)}'
+    }
+
+
+class RecordedTokenizer:
+    """NLTK's splits of known texts, saved with --save-reference, for checks where its model is not installed"""
+
+    name = 'nltk'
+
+    def __init__(self, records):
+        self.sentences = {record['text']: record['sentences'] for record in records}
+        self.tokens = {
+            sentence: tokens
+            for record in records
+            for sentence, tokens in zip(record['sentences'], record['tokens'])
+        }
+
+    def sent_tokenize(self, text):
+        return self.sentences[text]
+
+    def word_tokenize(self, text, preserve_line=False):
+        return self.tokens[text]
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f)['texts'])
+
+
+def is_trained_punkt():
+    """Whether the installed Punkt model is the trained English one rather than a stub"""
+    sentence_tokenizer = nlp_resources.tokenizers()['sentence_tokenizer']
+    return len(sentence_tokenizer._params.abbrev_types) >= TRAINED_ABBREVIATIONS_MIN
+
+
+def save_reference(texts, reference, path):
+    """Write the reference tokenizer's sentences of each text and tokens of each sentence"""
+    records = []
+    for text in texts:
+        sentences = reference.sent_tokenize(text)
+        tokens = [reference.word_tokenize(sentence, preserve_line=True) for sentence in sentences]
+        records.append({'text': text, 'sentences': sentences, 'tokens': tokens})
+    with open(path, 'w', encoding='utf-8') as f:
+        import nltk
+        source = f'Punkt (trained English model) and word_tokenize from nltk {nltk.__version__}'
+        json.dump({'source': source, 'texts': records}, f, indent=1, ensure_ascii=False)
+        f.write('\n')
+
+
+def benchmark(texts, tokenizer, repeat):
+    """Best-of-repeat seconds to sentence- and word-tokenize every text"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            for sentence in tokenizer.sent_tokenize(text):
+                tokenizer.word_tokenize(sentence, preserve_line=True)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the native tokenizer with NLTK for parity and speed')
+    parser.add_argument('paths', nargs='*', help='.txt files, directories of them, or a JSON list of texts')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--check', action='store_true',
+                        help='exit with status 1 when agreement is below the minimums')
+    parser.add_argument('--save-reference', metavar='PATH',
+                        help="save NLTK's splits of the texts as JSON (tests/data/nltk_reference.json for the samples)")
+    args = parser.parse_args()
+
+    texts = load_texts(args.paths)
+    reference = nlp_resources.NLTKTokenizer()
+    if args.save_reference:
+        if not is_trained_punkt():
+            sys.exit('The installed Punkt model is not the trained English one; run download_nltk.py first')
+        save_reference(texts, reference, args.save_reference)
+        return
+    native = NativeTokenizer()
+    # Warm both up so model loading is not timed
+    reference.word_tokenize(texts[0])
+    native.word_tokenize(texts[0])
+
+    nltk_seconds = benchmark(texts, reference, args.repeat)
+    native_seconds = benchmark(texts, native, args.repeat)
+    result = {
+        'texts': len(texts),
+        'characters': sum(len(text) for text in texts),
+        **parity(texts, reference, native),
+        'nltk_seconds': round(nltk_seconds, 4),
+        'native_seconds': round(native_seconds, 4),
+        'speedup': round(nltk_seconds / native_seconds, 2) if native_seconds else None
+    }
+    json.dump(result, sys.stdout, indent=2)
+    print()
+    if args.check and (result['sentence_agreement'] < SENTENCE_AGREEMENT_MIN
+                       or result['token_agreement'] < TOKEN_AGREEMENT_MIN):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
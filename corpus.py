@@ -0,0 +1,202 @@
+import os
+import json
+import pickle
+import argparse
+import numpy as np
+from minhash import MinHashIndex
+from winnowing import FingerprintIndex
+
+
+def read_documents(path, extensions=('.txt', '.md')):
+    """Texts of every non-empty text file under a directory, with their document metadata"""
+    texts = []
+    documents = []
+    for root, _, files in os.walk(path):
+        for name in sorted(files):
+            if not name.lower().endswith(extensions):
+                continue
+            file_path = os.path.join(root, name)
+            with open(file_path, encoding='utf-8', errors='ignore') as f:
+                text = f.read()
+            if not text.strip():
+                continue
+            texts.append(text)
+            documents.append({
+                'id': len(documents),
+                'title': os.path.splitext(name)[0],
+                'path': os.path.relpath(file_path, path)
+            })
+
+    if not texts:
+        raise ValueError(f"No reference documents found in {path}")
+    return texts, documents
+
+
+class ReferenceCorpus:
+    """TF-IDF index over a collection of reference documents"""
+
+    MATRIX_FILE = 'matrix.npz'
+    VECTORIZER_FILE = 'vectorizer.pkl'
+    DOCUMENTS_FILE = 'documents.json'
+    MINHASH_FILE = 'minhash.pkl'
+    FINGERPRINT_FILE = 'fingerprints.pkl'
+
+    # Below this size an exact scan of the matrix is cheaper than LSH lookup
+    CANDIDATE_SEARCH_MIN_DOCS = 5000
+
+    def __init__(self, vectorizer=None):
+        if vectorizer is None:
+            # scipy and scikit-learn are imported on first use to keep app startup fast
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 3))
+        self.vectorizer = vectorizer
+        self.matrix = None
+        self.documents = []
+        self.minhash = None
+        self.fingerprints = None
+
+    def __len__(self):
+        return len(self.documents)
+
+    @property
+    def nnz(self):
+        return 0 if self.matrix is None else int(self.matrix.nnz)
+
+    def config_key(self):
+        return [len(self), self.nnz]
+
+    def has_sources_since(self, text, first_row, submitter=None):
+        """A fitted corpus never grows, so a result computed on it stays current"""
+        return False
+
+    def fit(self, texts, documents, minhash=True, fingerprints=True):
+        """Fit the vectorizer and build the document-term matrix"""
+        from scipy import sparse
+        # TfidfVectorizer L2-normalizes each row, so a dot product is the cosine similarity
+        self.matrix = sparse.csr_matrix(self.vectorizer.fit_transform(texts), dtype=np.float32)
+        self.documents = list(documents)
+        if minhash:
+            self.minhash = MinHashIndex()
+            for row, text in enumerate(texts):
+                self.minhash.insert(row, text)
+        if fingerprints:
+            self.fingerprints = FingerprintIndex()
+            for row, text in enumerate(texts):
+                self.fingerprints.add_document(row, text)
+        return self
+
+    def remove_document(self, row):
+        """Drop a document from search results without refitting"""
+        start, end = self.matrix.indptr[row], self.matrix.indptr[row + 1]
+        self.matrix.data[start:end] = 0
+        self.documents[row]['removed'] = True
+        if self.minhash is not None:
+            self.minhash.remove(row)
+        if self.fingerprints is not None:
+            self.fingerprints.remove_document(row)
+
+    def ingest_directory(self, path, extensions=('.txt', '.md')):
+        """Read every text file under a directory and fit the corpus on them"""
+        texts, documents = read_documents(path, extensions)
+        return self.fit(texts, documents)
+
+    def save(self, path):
+        """Persist the matrix, vectorizer and document metadata to a directory"""
+        from scipy import sparse
+        os.makedirs(path, exist_ok=True)
+        sparse.save_npz(os.path.join(path, self.MATRIX_FILE), self.matrix)
+        with open(os.path.join(path, self.VECTORIZER_FILE), 'wb') as f:
+            pickle.dump(self.vectorizer, f)
+        with open(os.path.join(path, self.DOCUMENTS_FILE), 'w', encoding='utf-8') as f:
+            json.dump(self.documents, f)
+        if self.minhash is not None:
+            self.minhash.save(os.path.join(path, self.MINHASH_FILE))
+        if self.fingerprints is not None:
+            self.fingerprints.save(os.path.join(path, self.FINGERPRINT_FILE))
+
+    @classmethod
+    def load(cls, path):
+        """Load a corpus previously written by save()"""
+        from scipy import sparse
+        with open(os.path.join(path, cls.VECTORIZER_FILE), 'rb') as f:
+            corpus = cls(pickle.load(f))
+        corpus.matrix = sparse.load_npz(os.path.join(path, cls.MATRIX_FILE)).tocsr()
+        with open(os.path.join(path, cls.DOCUMENTS_FILE), encoding='utf-8') as f:
+            corpus.documents = json.load(f)
+        minhash_path = os.path.join(path, cls.MINHASH_FILE)
+        if os.path.exists(minhash_path):
+            corpus.minhash = MinHashIndex.load(minhash_path)
+        fingerprint_path = os.path.join(path, cls.FINGERPRINT_FILE)
+        if os.path.exists(fingerprint_path):
+            corpus.fingerprints = FingerprintIndex.load(fingerprint_path)
+        return corpus
+
+    def similarity(self, text, rows=None):
+        """Cosine similarity of a text against every (or the given) reference document"""
+        query = self.vectorizer.transform([text])
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        # One sparse matrix-vector product scores the whole corpus
+        return (matrix @ query.T).toarray().ravel()
+
+    def candidate_rows(self, text):
+        """Rows worth scoring exactly, or None to scan the whole matrix"""
+        if self.minhash is None or len(self) < self.CANDIDATE_SEARCH_MIN_DOCS:
+            return None
+        return np.fromiter(sorted(self.minhash.candidates(text)), dtype=np.int64)
+
+    def query(self, text, top_k=5, min_score=0.05, submitter=None):
+        """Return the top-k most similar reference documents (a fitted corpus holds no submissions to exclude)"""
+        if top_k < 1 or self.matrix is None or not self.documents:
+            return []
+
+        rows = self.candidate_rows(text)
+        if rows is not None and len(rows) == 0:
+            return []
+
+        scores = self.similarity(text, rows)
+        top_k = min(top_k, len(scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for idx in top:
+            score = float(scores[idx])
+            if score < min_score:
+                break
+            row = idx if rows is None else rows[idx]
+            results.append({**self.documents[row], 'similarity': round(score * 100, 1)})
+        return results
+
+    def matching_passages(self, text, max_sources=5, submitter=None):
+        """Exact character spans of the text that match each reference document"""
+        if self.fingerprints is None or not text:
+            return []
+
+        results = []
+        for row, spans in self.fingerprints.match(text).items():
+            matched_chars = sum(end - start for start, end, _, _ in spans)
+            results.append({
+                **self.documents[row],
+                'coverage': round(matched_chars / len(text) * 100, 1),
+                'spans': [
+                    {'start': start, 'end': end, 'source_start': source_start, 'source_end': source_end}
+                    for start, end, source_start, source_end in spans
+                ]
+            })
+        results.sort(key=lambda result: result['coverage'], reverse=True)
+        return results[:max_sources]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a reference corpus index')
+    parser.add_argument('source', help='Directory of reference .txt/.md documents')
+    parser.add_argument('output', help='Directory to write the index to')
+    args = parser.parse_args()
+
+    corpus = ReferenceCorpus().ingest_directory(args.source)
+    corpus.save(args.output)
+    print(f"Indexed {len(corpus)} documents ({corpus.matrix.shape[1]} terms) into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,866 @@
+import os
+import re
+import json
+import time
+import fcntl
+import shutil
+import hashlib
+import argparse
+import threading
+import numpy as np
+from collections import Counter, defaultdict
+from functools import cached_property
+from minhash import MinHashIndex
+from winnowing import winnow, merge_spans
+from corpus import read_documents
+
+STORE_VERSION = 2
+META_FILE = 'meta.json'
+LOCK_FILE = '.lock'
+VOCABULARY_DIR = 'vocabulary'
+
+DEFAULT_VECTORIZER = {'stop_words': 'english', 'ngram_range': [1, 3]}
+DEFAULT_FINGERPRINTS = {'k': 40, 'w': 20}
+DEFAULT_MINHASH = {'num_perm': 128, 'bands': 32, 'shingle_size': 3, 'seed': 1}
+# Feature space of stores that grow one submission at a time (see StoreWriter.create)
+DEFAULT_N_FEATURES = 1 << 20
+
+# Arrays of one segment; every one is a .npy file opened with mmap_mode='r'
+SEGMENT_ARRAYS = (
+    'indptr', 'indices', 'data',                        # CSR rows of the TF-IDF matrix
+    'documents', 'document_offsets',                    # JSON lines of document metadata
+    'digests',                                          # text_digest() of ingested submissions, 0 otherwise
+    'fp_hashes', 'fp_rows', 'fp_starts', 'fp_ends',     # winnowing fingerprints, sorted by hash
+    'signatures', 'lsh_keys', 'lsh_rows',               # MinHash signatures and LSH band keys, sorted
+)
+# Segment arrays that older segments lack; a missing one reads as all zeros
+OPTIONAL_SEGMENT_ARRAYS = (
+    'submitters',                                       # text_digest() of who submitted each row, 0 if unknown
+)
+
+# Mixing constants for LSH band keys (arithmetic wraps modulo 2^64)
+BAND_SEED = np.uint64(0x9E3779B97F4A7C15)
+BAND_MULTIPLIER = np.uint64(0x100000001B3)
+
+# Segment directories and vocabulary weight files, as written by StoreWriter
+SEGMENT_NAME = re.compile(r'segment-\d+$')
+WEIGHTS_NAME = re.compile(r'(idf|df)-\d+\.npy$')
+
+
+def term_hash(term):
+    return int.from_bytes(hashlib.blake2b(term.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def text_digest(text):
+    """Non-zero 64-bit digest identifying a submitted text"""
+    return int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little') or 1
+
+
+def new_fit_id():
+    """Id of one fit of a store's IDF; appends keep it, a full merge or a rebuild replaces it"""
+    return os.urandom(8).hex()
+
+
+def band_keys(signatures, bands):
+    """One uint64 key per (document, band) of a (documents, num_perm) signature array"""
+    count, num_perm = signatures.shape
+    grouped = signatures.reshape(count, bands, num_perm // bands)
+    keys = np.repeat((np.arange(1, bands + 1, dtype=np.uint64) * BAND_SEED)[None, :], count, axis=0)
+    for row in range(grouped.shape[2]):
+        keys = keys * BAND_MULTIPLIER + grouped[:, :, row]
+    return keys
+
+
+def encode_strings(strings):
+    """Concatenated UTF-8 bytes and the (n + 1) offsets delimiting each string"""
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def index_dtype(maximum):
+    # int32 whenever possible so scipy uses the mapped arrays without converting them
+    return np.int32 if maximum < np.iinfo(np.int32).max else np.int64
+
+
+def load_array(path):
+    return np.load(path, mmap_mode='r')
+
+
+def save_array(directory, name, array):
+    np.save(os.path.join(directory, f'{name}.npy'), np.ascontiguousarray(array))
+
+
+def is_hashed(vectorizer_params):
+    return 'n_features' in vectorizer_params
+
+
+def make_vectorizer(vectorizer_params):
+    """Vectorizer with a store's settings: HashingVectorizer counts for hashed stores, TF-IDF otherwise"""
+    params = {**vectorizer_params, 'ngram_range': tuple(vectorizer_params['ngram_range'])}
+    if is_hashed(params):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        return HashingVectorizer(alternate_sign=False, norm=None, **params)
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    return TfidfVectorizer(**params)
+
+
+def idf_from_df(document_frequency, documents):
+    # The smoothed IDF of TfidfVectorizer
+    return np.log((1 + documents) / (1 + np.asarray(document_frequency, dtype=np.float64))) + 1
+
+
+def normalize_rows(matrix):
+    """Scale the rows of a float CSR matrix to unit l2 norm, in place"""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    matrix.data /= np.repeat(norms, np.diff(matrix.indptr))
+    return matrix
+
+
+def tfidf_rows(counts, idf):
+    """l2-normalized tf * idf rows of a term count matrix, as TfidfVectorizer.transform gives them"""
+    from scipy import sparse
+    matrix = sparse.csr_matrix(counts, dtype=np.float64, copy=True)
+    matrix.data *= np.asarray(idf)[matrix.indices]
+    return normalize_rows(matrix)
+
+
+def merge_start(sizes, merge_factor, max_documents):
+    """Index from which the newest segments should be merged, or None
+
+    Size-tiered policy: the last merge_factor segments are merged when their
+    sizes fall in the same power of merge_factor, so every document is
+    rewritten O(log n) times and the segment count stays logarithmic.
+    """
+    if merge_factor < 2 or len(sizes) < merge_factor:
+        return None
+    tail = sizes[-merge_factor:]
+    tiers = {int(np.log(max(size, 1)) / np.log(merge_factor)) for size in tail}
+    if len(tiers) == 1 and sum(tail) <= max_documents:
+        return len(sizes) - merge_factor
+    return None
+
+
+class Vocabulary:
+    """Term strings, their hash lookup table and IDF weights, all memory-mapped"""
+
+    def __init__(self, path, meta):
+        self.terms = load_array(os.path.join(path, 'terms.npy'))
+        self.offsets = load_array(os.path.join(path, 'term_offsets.npy'))
+        self.hashes = load_array(os.path.join(path, 'hashes.npy'))
+        self.hash_ids = load_array(os.path.join(path, 'hash_ids.npy'))
+        self.idf = load_array(os.path.join(path, f"{meta['idf']}.npy"))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def term(self, term_id):
+        return self.terms[self.offsets[term_id]:self.offsets[term_id + 1]].tobytes().decode('utf-8')
+
+    def lookup(self, terms):
+        """Term id of every term, or -1 for terms outside the vocabulary"""
+        if not terms:
+            return np.zeros(0, dtype=np.int64)
+        hashes = np.fromiter((term_hash(term) for term in terms), dtype=np.uint64, count=len(terms))
+        positions = np.minimum(np.searchsorted(self.hashes, hashes), len(self.hashes) - 1)
+        ids = np.where(self.hashes[positions] == hashes, self.hash_ids[positions], -1).astype(np.int64)
+        # Confirm the string itself so a hash collision can never match the wrong term
+        for i in np.flatnonzero(ids >= 0):
+            if self.term(ids[i]) != terms[i]:
+                ids[i] = -1
+        return ids
+
+    def counts(self, texts, analyzer):
+        """Term counts of texts over the vocabulary; unknown terms are dropped"""
+        from scipy import sparse
+        rows, cols, values = [], [], []
+        for row, text in enumerate(texts):
+            counts = Counter(analyzer(text))
+            terms = list(counts)
+            ids = self.lookup(terms)
+            known = ids >= 0
+            rows.extend([row] * int(known.sum()))
+            cols.extend(ids[known])
+            values.extend(np.fromiter(counts.values(), dtype=np.float64, count=len(terms))[known])
+        return sparse.csr_matrix((values, (rows, cols)), shape=(len(texts), len(self)))
+
+    @staticmethod
+    def write(path, terms, idf_name, idf):
+        os.makedirs(path, exist_ok=True)
+        data, offsets = encode_strings(terms)
+        hashes = np.fromiter((term_hash(term) for term in terms), dtype=np.uint64, count=len(terms))
+        order = np.argsort(hashes, kind='stable')
+        save_array(path, 'terms', data)
+        save_array(path, 'term_offsets', offsets)
+        save_array(path, 'hashes', hashes[order])
+        save_array(path, 'hash_ids', order.astype(index_dtype(len(terms))))
+        save_array(path, idf_name, np.asarray(idf, dtype=np.float64))
+
+
+class HashedVocabulary:
+    """Feature space of a hashed store: no term list, document frequencies kept up to date on every append"""
+
+    def __init__(self, path, meta):
+        self.n_features = meta['vectorizer']['n_features']
+        self.idf = load_array(os.path.join(path, f"{meta['idf']}.npy"))
+        self.df = load_array(os.path.join(path, f"{meta['df']}.npy"))
+
+    def __len__(self):
+        return self.n_features
+
+
+class Segment:
+    """One immutable, memory-mapped slice of the corpus rows"""
+
+    def __init__(self, path, term_count):
+        from scipy import sparse
+        self.path = path
+        arrays = {name: load_array(os.path.join(path, f'{name}.npy')) for name in SEGMENT_ARRAYS}
+        for name in OPTIONAL_SEGMENT_ARRAYS:
+            array_path = os.path.join(path, f'{name}.npy')
+            arrays[name] = load_array(array_path) if os.path.exists(array_path) else np.zeros(
+                len(arrays['digests']), dtype=np.uint64
+            )
+        for name, array in arrays.items():
+            setattr(self, name, array)
+        self.matrix = sparse.csr_matrix(
+            (arrays['data'], arrays['indices'], arrays['indptr']),
+            shape=(len(arrays['indptr']) - 1, term_count), copy=False
+        )
+
+    def __len__(self):
+        return len(self.document_offsets) - 1
+
+    def document(self, row):
+        start, end = self.document_offsets[row], self.document_offsets[row + 1]
+        return json.loads(self.documents[start:end].tobytes().decode('utf-8'))
+
+    def candidates(self, keys):
+        starts = np.searchsorted(self.lsh_keys, keys, side='left')
+        ends = np.searchsorted(self.lsh_keys, keys, side='right')
+        return np.concatenate([self.lsh_rows[start:end] for start, end in zip(starts, ends)])
+
+    def fingerprint_hits(self, fingerprints, base, hits):
+        """Add (start, end, source_start, source_end) spans per global row for matching fingerprints"""
+        hashes = np.fromiter((h for h, _, _ in fingerprints), dtype=np.uint64, count=len(fingerprints))
+        starts = np.searchsorted(self.fp_hashes, hashes, side='left')
+        counts = np.searchsorted(self.fp_hashes, hashes, side='right') - starts
+        if not counts.any():
+            return
+        # Gather every matching table entry at once; indexing a memmap element by element is slow
+        which = np.repeat(np.arange(len(fingerprints)), counts)
+        positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(int(counts.sum()))
+        rows = (self.fp_rows[positions].astype(np.int64) + base).tolist()
+        source_starts = self.fp_starts[positions].tolist()
+        source_ends = self.fp_ends[positions].tolist()
+        for row, i, source_start, source_end in zip(rows, which.tolist(), source_starts, source_ends):
+            _, start, end = fingerprints[i]
+            hits[row].append((start, end, source_start, source_end))
+
+    @staticmethod
+    def write(path, matrix, documents, texts, fingerprint_params, minhash, digests=None, submitters=None):
+        """Write the arrays of a segment; matrix is a CSR matrix with one row per text"""
+        os.makedirs(path, exist_ok=True)
+        Segment.write_matrix(path, matrix)
+
+        encoded, offsets = encode_strings(json.dumps(document) for document in documents)
+        save_array(path, 'documents', encoded)
+        save_array(path, 'document_offsets', offsets)
+        save_array(path, 'digests', np.zeros(len(texts), dtype=np.uint64) if digests is None
+                   else np.asarray(digests, dtype=np.uint64))
+        save_array(path, 'submitters', np.zeros(len(texts), dtype=np.uint64) if submitters is None
+                   else np.asarray(submitters, dtype=np.uint64))
+
+        fp_hashes, fp_rows, fp_starts, fp_ends = [], [], [], []
+        for row, text in enumerate(texts):
+            for h, start, end in winnow(text, fingerprint_params['k'], fingerprint_params['w']):
+                fp_hashes.append(h)
+                fp_rows.append(row)
+                fp_starts.append(start)
+                fp_ends.append(end)
+        Segment.write_fingerprints(path, np.array(fp_hashes, dtype=np.uint64), np.array(fp_rows, dtype=np.int64),
+                                   np.array(fp_starts, dtype=np.int64), np.array(fp_ends, dtype=np.int64))
+
+        signatures = np.array([minhash.signature(text) for text in texts], dtype=np.uint64).reshape(len(texts), -1)
+        Segment.write_signatures(path, signatures, minhash.bands)
+
+    @staticmethod
+    def write_merged(path, segments, matrix, bands):
+        """Write consecutive segments as one; matrix holds their rows, re-weighted as needed"""
+        os.makedirs(path, exist_ok=True)
+        Segment.write_matrix(path, matrix)
+
+        blob_bases = np.cumsum([0] + [len(segment.documents) for segment in segments])
+        row_bases = np.cumsum([0] + [len(segment) for segment in segments])
+        save_array(path, 'documents', np.concatenate([segment.documents for segment in segments]))
+        save_array(path, 'document_offsets', np.concatenate([[0]] + [
+            segment.document_offsets[1:] + base for segment, base in zip(segments, blob_bases)
+        ]).astype(np.int64))
+        save_array(path, 'digests', np.concatenate([segment.digests for segment in segments]))
+        save_array(path, 'submitters', np.concatenate([segment.submitters for segment in segments]))
+
+        Segment.write_fingerprints(
+            path,
+            np.concatenate([segment.fp_hashes for segment in segments]),
+            np.concatenate([segment.fp_rows.astype(np.int64) + base for segment, base in zip(segments, row_bases)]),
+            np.concatenate([segment.fp_starts for segment in segments]),
+            np.concatenate([segment.fp_ends for segment in segments])
+        )
+        Segment.write_signatures(path, np.concatenate([segment.signatures for segment in segments]), bands)
+
+    @staticmethod
+    def write_matrix(path, matrix):
+        save_array(path, 'indptr', matrix.indptr.astype(index_dtype(matrix.nnz)))
+        save_array(path, 'indices', matrix.indices.astype(index_dtype(matrix.shape[1])))
+        save_array(path, 'data', matrix.data.astype(np.float32))
+
+    @staticmethod
+    def write_fingerprints(path, hashes, rows, starts, ends):
+        order = np.argsort(hashes, kind='stable')
+        save_array(path, 'fp_hashes', hashes[order])
+        save_array(path, 'fp_rows', rows[order].astype(index_dtype(rows.max(initial=0))))
+        save_array(path, 'fp_starts', starts[order])
+        save_array(path, 'fp_ends', ends[order])
+
+    @staticmethod
+    def write_signatures(path, signatures, bands):
+        keys = band_keys(signatures, bands).ravel()
+        rows = np.repeat(np.arange(len(signatures)), bands)
+        order = np.argsort(keys, kind='stable')
+        save_array(path, 'signatures', signatures)
+        save_array(path, 'lsh_keys', keys[order])
+        save_array(path, 'lsh_rows', rows[order].astype(index_dtype(len(signatures))))
+
+
+class StoreSnapshot:
+    """One version of a store, as listed by a single meta.json
+
+    Snapshots never change, so a query that started on one keeps reading
+    consistent segments while a writer publishes the next version.
+    """
+
+    # Below this size an exact scan of the matrix is cheaper than LSH lookup
+    CANDIDATE_SEARCH_MIN_DOCS = 5000
+
+    def __init__(self, path, meta, segment_cache=None):
+        self.path = path
+        self.meta = meta
+        self.hashed = is_hashed(meta['vectorizer'])
+        vocabulary_path = os.path.join(path, VOCABULARY_DIR)
+        self.vocabulary = (HashedVocabulary if self.hashed else Vocabulary)(vocabulary_path, meta)
+        # Segments are immutable, so ones already open in an earlier snapshot are reused
+        segment_cache = segment_cache or {}
+        self.segments = [
+            segment_cache.get(entry['name']) or Segment(os.path.join(path, entry['name']), len(self.vocabulary))
+            for entry in meta['segments']
+        ]
+        self.bases = np.cumsum([0] + [len(segment) for segment in self.segments])
+        self.minhash = MinHashIndex(**meta['minhash'])
+
+    def __len__(self):
+        return int(self.bases[-1])
+
+    @property
+    def nnz(self):
+        return sum(int(segment.matrix.nnz) for segment in self.segments)
+
+    @cached_property
+    def vectorizer(self):
+        """Unfitted vectorizer with the store's settings; only its analyzer (or hashing) is used"""
+        return make_vectorizer(self.meta['vectorizer'])
+
+    @cached_property
+    def analyzer(self):
+        return self.vectorizer.build_analyzer()
+
+    def _locate(self, row):
+        index = int(np.searchsorted(self.bases, row, side='right')) - 1
+        return self.segments[index], row - int(self.bases[index])
+
+    def document(self, row):
+        segment, local_row = self._locate(row)
+        return segment.document(local_row)
+
+    def counts(self, texts):
+        """Raw term counts of texts in the store's feature space"""
+        if self.hashed:
+            return self.vectorizer.transform(texts)
+        return self.vocabulary.counts(texts, self.analyzer)
+
+    def transform(self, texts):
+        """TF-IDF rows of texts with the current IDF, as TfidfVectorizer.transform would give"""
+        return tfidf_rows(self.counts(texts), self.vocabulary.idf)
+
+    def config_key(self):
+        """Id of the fitted feature space and IDF, which appending submissions does not change"""
+        # Stores written before fit ids existed fall back to their generation, which every append changes
+        return [self.meta['vectorizer'], self.meta.get('fit', self.meta['generation'])]
+
+    def submission_rows(self, text, submitter=None):
+        """Rows that are the text's own earlier submissions
+
+        With a submitter, those are the rows that submitter stored; without one,
+        the same text stored anonymously. The same text stored by someone else
+        is never excluded, so a verbatim copy of another submission is reported.
+        """
+        found = []
+        if submitter:
+            owner = np.uint64(text_digest(submitter))
+            for segment, base in zip(self.segments, self.bases):
+                found.append(np.flatnonzero(segment.submitters == owner) + base)
+        else:
+            digest = np.uint64(text_digest(text))
+            for segment, base in zip(self.segments, self.bases):
+                found.append(np.flatnonzero((segment.digests == digest) & (segment.submitters == 0)) + base)
+        return np.concatenate(found).astype(np.int64) if found else np.zeros(0, dtype=np.int64)
+
+    def similarity(self, text, rows=None):
+        """Cosine similarity of a text against every (or the given) reference document"""
+        query = self.transform([text]).T
+        if rows is None:
+            return np.concatenate([(segment.matrix @ query).toarray().ravel() for segment in self.segments])
+        scores = np.zeros(len(rows))
+        segment_of_row = np.searchsorted(self.bases, rows, side='right') - 1
+        for index, segment in enumerate(self.segments):
+            selected = np.flatnonzero(segment_of_row == index)
+            if len(selected):
+                local_rows = rows[selected] - self.bases[index]
+                scores[selected] = (segment.matrix[local_rows] @ query).toarray().ravel()
+        return scores
+
+    def candidate_rows(self, text):
+        """Rows worth scoring exactly, or None to scan every segment"""
+        if len(self) < self.CANDIDATE_SEARCH_MIN_DOCS:
+            return None
+        keys = band_keys(self.minhash.signature(text)[None, :], self.minhash.bands)[0]
+        found = [segment.candidates(keys) + base for segment, base in zip(self.segments, self.bases)]
+        return np.unique(np.concatenate(found).astype(np.int64)) if found else np.zeros(0, dtype=np.int64)
+
+    def query(self, text, top_k=5, min_score=0.05, submitter=None):
+        """Return the top-k most similar reference documents"""
+        if top_k < 1 or not len(self):
+            return []
+
+        rows = self.candidate_rows(text)
+        # A submitter's own earlier (or edited) texts, or an anonymous resubmission, are not sources
+        own_rows = self.submission_rows(text, submitter)
+        if rows is not None:
+            rows = np.setdiff1d(rows, own_rows)
+            if len(rows) == 0:
+                return []
+
+        scores = self.similarity(text, rows)
+        if rows is None:
+            scores[own_rows] = 0
+        top_k = min(top_k, len(scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for idx in top:
+            score = float(scores[idx])
+            if score < min_score:
+                break
+            row = idx if rows is None else rows[idx]
+            results.append({**self.document(int(row)), 'similarity': round(score * 100, 1)})
+        return results
+
+    def has_sources_since(self, text, first_row, submitter=None, min_score=0.05):
+        """Whether any row from first_row on is a source of the text (by similarity or a shared passage)
+
+        Rows are only ever appended within one fit, so this tells whether a
+        result computed when the store held first_row documents is still current.
+        """
+        rows = np.setdiff1d(np.arange(first_row, len(self)), self.submission_rows(text, submitter))
+        if not len(rows):
+            return False
+        if (self.similarity(text, rows) >= min_score).any():
+            return True
+        params = self.meta['fingerprints']
+        fingerprints = list(winnow(text, params['k'], params['w']))
+        hits = defaultdict(list)
+        for segment, base in zip(self.segments, self.bases):
+            if base + len(segment) > first_row:
+                segment.fingerprint_hits(fingerprints, int(base), hits)
+        return bool(np.isin(np.fromiter(hits, dtype=np.int64, count=len(hits)), rows).any())
+
+    def matching_passages(self, text, max_sources=5, submitter=None):
+        """Exact character spans of the text that match each reference document"""
+        if not text or not len(self):
+            return []
+
+        params = self.meta['fingerprints']
+        fingerprints = list(winnow(text, params['k'], params['w']))
+        hits = defaultdict(list)
+        for segment, base in zip(self.segments, self.bases):
+            segment.fingerprint_hits(fingerprints, int(base), hits)
+        for row in self.submission_rows(text, submitter):
+            hits.pop(int(row), None)
+
+        results = []
+        for row, spans in hits.items():
+            spans = merge_spans(spans, params['k'])
+            matched_chars = sum(end - start for start, end, _, _ in spans)
+            results.append({
+                **self.document(row),
+                'coverage': round(matched_chars / len(text) * 100, 1),
+                'spans': [
+                    {'start': start, 'end': end, 'source_start': source_start, 'source_end': source_end}
+                    for start, end, source_start, source_end in spans
+                ]
+            })
+        results.sort(key=lambda result: result['coverage'], reverse=True)
+        return results[:max_sources]
+
+
+class CorpusStore:
+    """Reference corpus served from memory-mapped files
+
+    Matrices, vocabulary, document metadata and fingerprint tables are opened
+    with mmap, so every worker process reads the same pages from the OS cache
+    and per-worker memory does not grow with the corpus. Built, appended to
+    and compacted with the CLI in this module (see main()), or grown one
+    submission at a time by ingest.CorpusIngestor. Queries pick up new
+    segments at most refresh_interval seconds after a writer publishes them.
+    """
+
+    # Seconds between checks of meta.json for changes made by a writer
+    REFRESH_INTERVAL = 1.0
+
+    def __init__(self, path, refresh_interval=REFRESH_INTERVAL):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self._meta_mtime = None
+        self._checked = 0.0
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self.refresh()
+
+    @staticmethod
+    def is_store(path):
+        return os.path.exists(os.path.join(path, META_FILE))
+
+    def refresh(self):
+        """Reopen the store if a writer has changed it since it was opened; True if it had"""
+        meta_path = os.path.join(self.path, META_FILE)
+        with self._lock:
+            self._checked = time.monotonic()
+            for attempt in range(3):
+                mtime = os.stat(meta_path).st_mtime_ns
+                if mtime == self._meta_mtime:
+                    return False
+                with open(meta_path, encoding='utf-8') as f:
+                    meta = json.load(f)
+                if meta.get('version') != STORE_VERSION:
+                    raise ValueError(
+                        f"Unsupported corpus store version {meta.get('version')} in {self.path}; rebuild it"
+                    )
+                cache = {}
+                if self._snapshot is not None:
+                    cache = {os.path.basename(segment.path): segment for segment in self._snapshot.segments}
+                try:
+                    self._snapshot = StoreSnapshot(self.path, meta, cache)
+                except FileNotFoundError:
+                    # A writer replaced this version while it was being opened; read the newer one
+                    if attempt == 2:
+                        raise
+                    continue
+                self._meta_mtime = mtime
+                return True
+
+    @property
+    def snapshot(self):
+        """The current version of the store, refreshed at most every refresh_interval seconds"""
+        if time.monotonic() - self._checked >= self.refresh_interval:
+            self.refresh()
+        return self._snapshot
+
+    @property
+    def meta(self):
+        return self.snapshot.meta
+
+    def __len__(self):
+        return len(self.snapshot)
+
+    @property
+    def nnz(self):
+        return self.snapshot.nnz
+
+    @property
+    def vectorizer(self):
+        return self.snapshot.vectorizer
+
+    def document(self, row):
+        return self.snapshot.document(row)
+
+    def transform(self, texts):
+        return self.snapshot.transform(texts)
+
+    def similarity(self, text, rows=None):
+        return self.snapshot.similarity(text, rows)
+
+    def config_key(self):
+        return self.snapshot.config_key()
+
+    def query(self, text, top_k=5, min_score=0.05, submitter=None):
+        return self.snapshot.query(text, top_k, min_score, submitter)
+
+    def matching_passages(self, text, max_sources=5, submitter=None):
+        return self.snapshot.matching_passages(text, max_sources, submitter)
+
+    def has_sources_since(self, text, first_row, submitter=None):
+        return self.snapshot.has_sources_since(text, first_row, submitter)
+
+
+class StoreWriter:
+    """Builds, appends to, merges and compacts a CorpusStore directory
+
+    Files a reader may have mapped are never modified: every change writes new
+    files and then atomically replaces meta.json, which readers pick up with
+    CorpusStore.refresh(). Only one writer may run at a time (enforced with a lock file).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._lock = open(os.path.join(path, LOCK_FILE), 'w')
+        fcntl.flock(self._lock, fcntl.LOCK_EX)
+
+    def close(self):
+        fcntl.flock(self._lock, fcntl.LOCK_UN)
+        self._lock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def read_meta(self):
+        with open(os.path.join(self.path, META_FILE), encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_meta(self, meta):
+        temporary = os.path.join(self.path, META_FILE + '.tmp')
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(temporary, os.path.join(self.path, META_FILE))
+        self._collect_garbage(meta)
+
+    def _collect_garbage(self, meta):
+        """Remove segments and weight files the current meta.json no longer refers to"""
+        # Readers that still map these files keep their pages until they refresh
+        used = {entry['name'] for entry in meta['segments']}
+        used.update(f"{entry['idf']}.npy" for entry in meta['segments'])
+        used.update(f'{meta[name]}.npy' for name in ('idf', 'df') if name in meta)
+        for name in os.listdir(self.path):
+            if SEGMENT_NAME.match(name) and name not in used:
+                shutil.rmtree(os.path.join(self.path, name))
+        vocabulary_path = os.path.join(self.path, VOCABULARY_DIR)
+        for name in os.listdir(vocabulary_path):
+            if WEIGHTS_NAME.match(name) and name not in used:
+                os.remove(os.path.join(vocabulary_path, name))
+
+    @staticmethod
+    def _new_meta(vectorizer_params):
+        return {
+            'version': STORE_VERSION, 'generation': 1, 'fit': new_fit_id(), 'vectorizer': vectorizer_params,
+            'fingerprints': DEFAULT_FINGERPRINTS, 'minhash': DEFAULT_MINHASH,
+            'idf': 'idf-000001', 'segments': [], 'documents': 0
+        }
+
+    def create(self, vectorizer_params=None):
+        """Start an empty hashed store, which append() can grow without refitting anything
+
+        Terms are hashed into n_features columns instead of a fitted vocabulary,
+        and document frequencies are updated on every append, so new texts add
+        new terms and shift the IDF of the query side immediately. Rows keep the
+        IDF they were written with until merge() re-weights them.
+        """
+        if CorpusStore.is_store(self.path):
+            raise ValueError(f"{self.path} already holds a corpus store; append to it or remove it first")
+        params = dict(vectorizer_params or {**DEFAULT_VECTORIZER, 'n_features': DEFAULT_N_FEATURES})
+        if not is_hashed(params):
+            raise ValueError('An empty store needs a hashed feature space; set n_features')
+        meta = {**self._new_meta(params), 'df': 'df-000001'}
+        vocabulary_path = os.path.join(self.path, VOCABULARY_DIR)
+        os.makedirs(vocabulary_path, exist_ok=True)
+        save_array(vocabulary_path, meta['df'], np.zeros(params['n_features'], dtype=np.int32))
+        save_array(vocabulary_path, meta['idf'], np.ones(params['n_features'], dtype=np.float32))
+        self._write_meta(meta)
+        return meta
+
+    def build(self, texts, documents, vectorizer_params=None):
+        """Fit the vocabulary and IDF on texts and write them as the first segment"""
+        if CorpusStore.is_store(self.path):
+            raise ValueError(f"{self.path} already holds a corpus store; append to it or remove it first")
+        params = dict(vectorizer_params or DEFAULT_VECTORIZER)
+        if is_hashed(params):
+            self.create(params)
+            return self.append(texts, documents)
+
+        from scipy import sparse
+        vectorizer = make_vectorizer(params)
+        matrix = sparse.csr_matrix(vectorizer.fit_transform(texts), dtype=np.float32)
+        meta = self._new_meta(params)
+        meta['segments'] = [{'name': 'segment-000001', 'idf': meta['idf'], 'documents': len(texts)}]
+        meta['documents'] = len(texts)
+        Vocabulary.write(
+            os.path.join(self.path, VOCABULARY_DIR), vectorizer.get_feature_names_out().tolist(),
+            meta['idf'], vectorizer.idf_
+        )
+        Segment.write(
+            os.path.join(self.path, 'segment-000001'), matrix,
+            [{**document, 'id': row} for row, document in enumerate(documents)], texts,
+            meta['fingerprints'], MinHashIndex(**meta['minhash'])
+        )
+        self._write_meta(meta)
+        return meta
+
+    def append(self, texts, documents, digests=None, submitters=None):
+        """Add texts as a new segment and return the new meta
+
+        Document ids continue from the existing documents. In a hashed store the
+        document frequencies and IDF are updated first, so the new rows carry
+        the IDF of the whole store. A vocabulary store ignores terms it has
+        never seen, and keeps its IDF until compact().
+        """
+        snapshot = StoreSnapshot(self.path, self.read_meta())
+        meta = self.read_meta()
+        meta['generation'] += 1
+        generation = meta['generation']
+        counts = snapshot.counts(texts)
+        if snapshot.hashed:
+            document_frequency = np.asarray(snapshot.vocabulary.df) + np.bincount(
+                counts.indices, minlength=snapshot.vocabulary.n_features
+            ).astype(np.int32)
+            meta['df'], meta['idf'] = f'df-{generation:06d}', f'idf-{generation:06d}'
+            idf = idf_from_df(document_frequency, meta['documents'] + len(texts)).astype(np.float32)
+            vocabulary_path = os.path.join(self.path, VOCABULARY_DIR)
+            save_array(vocabulary_path, meta['df'], document_frequency)
+            save_array(vocabulary_path, meta['idf'], idf)
+        else:
+            idf = snapshot.vocabulary.idf
+
+        name = f'segment-{generation:06d}'
+        documents = [{**document, 'id': meta['documents'] + row} for row, document in enumerate(documents)]
+        Segment.write(
+            os.path.join(self.path, name), tfidf_rows(counts, idf), documents, texts,
+            meta['fingerprints'], snapshot.minhash, digests, submitters
+        )
+        meta['segments'].append({'name': name, 'idf': meta['idf'], 'documents': len(texts)})
+        meta['documents'] += len(texts)
+        self._write_meta(meta)
+        return meta
+
+    def merge(self, names=None):
+        """Replace consecutive segments (default: all) with one segment and return the new meta
+
+        Rows written with an older IDF are re-weighted to the current one.
+        Merging every segment also recomputes the IDF from the merged rows.
+        """
+        from scipy import sparse
+        snapshot = StoreSnapshot(self.path, self.read_meta())
+        meta = self.read_meta()
+        listed = [entry['name'] for entry in meta['segments']]
+        names = listed if names is None else list(names)
+        if not names:
+            return meta
+        first = listed.index(names[0])
+        if listed[first:first + len(names)] != names:
+            raise ValueError('Only consecutive segments can be merged')
+        entries = meta['segments'][first:first + len(names)]
+        segments = snapshot.segments[first:first + len(names)]
+        meta['generation'] += 1
+        generation = meta['generation']
+        vocabulary_path = os.path.join(self.path, VOCABULARY_DIR)
+
+        matrix = sparse.vstack([segment.matrix for segment in segments], format='csr', dtype=np.float64)
+        if len(names) == len(listed):
+            document_frequency = np.bincount(matrix.indices, minlength=matrix.shape[1])
+            meta['fit'] = new_fit_id()
+            meta['idf'] = f'idf-{generation:06d}'
+            idf = idf_from_df(document_frequency, matrix.shape[0])
+            if snapshot.hashed:
+                meta['df'] = f'df-{generation:06d}'
+                idf = idf.astype(np.float32)
+                save_array(vocabulary_path, meta['df'], document_frequency.astype(np.int32))
+            save_array(vocabulary_path, meta['idf'], idf)
+        idf = np.asarray(load_array(os.path.join(vocabulary_path, f"{meta['idf']}.npy")), dtype=np.float64)
+
+        # Rows are l2-normalized tf * idf: undo each segment's IDF, apply the current one, normalize again
+        row_bases = np.cumsum([0] + [len(segment) for segment in segments])
+        for entry, start, end in zip(entries, row_bases[:-1], row_bases[1:]):
+            if entry['idf'] == meta['idf']:
+                continue
+            old_idf = np.asarray(load_array(os.path.join(vocabulary_path, f"{entry['idf']}.npy")), dtype=np.float64)
+            span = slice(matrix.indptr[start], matrix.indptr[end])
+            matrix.data[span] *= (idf / old_idf)[matrix.indices[span]]
+        matrix = normalize_rows(matrix)
+
+        name = f'segment-{generation:06d}'
+        Segment.write_merged(os.path.join(self.path, name), segments, matrix, snapshot.minhash.bands)
+        meta['segments'][first:first + len(names)] = [
+            {'name': name, 'idf': meta['idf'], 'documents': sum(entry['documents'] for entry in entries)}
+        ]
+        self._write_meta(meta)
+        return meta
+
+    def compact(self):
+        """Merge every segment into one and recompute IDF over all documents"""
+        return self.merge()
+
+    def merge_tail(self, merge_factor=4, max_documents=100000):
+        """Merge the newest segments by size tier until merge_start() finds nothing; returns the merge count"""
+        merges = 0
+        while True:
+            meta = self.read_meta()
+            start = merge_start([entry['documents'] for entry in meta['segments']], merge_factor, max_documents)
+            if start is None:
+                return merges
+            self.merge([entry['name'] for entry in meta['segments'][start:]])
+            merges += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and maintain a memory-mapped reference corpus store')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='fit a new store on a directory of .txt/.md documents')
+    build.add_argument('source')
+    build.add_argument('store')
+    build.add_argument('--n-features', type=int,
+                       help='hash terms into this many columns instead of fitting a vocabulary, so appends add new terms')
+    init = commands.add_parser('init', help='create an empty hashed store for ingesting submissions')
+    init.add_argument('store')
+    init.add_argument('--n-features', type=int, default=DEFAULT_N_FEATURES)
+    append = commands.add_parser('append', help='add the documents of a directory as a new segment')
+    append.add_argument('source')
+    append.add_argument('store')
+    compact = commands.add_parser('compact', help='merge all segments and refresh IDF weights')
+    compact.add_argument('store')
+    info = commands.add_parser('info', help='print the store layout')
+    info.add_argument('store')
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        store = CorpusStore(args.store)
+        print(json.dumps({**store.meta, 'terms': len(store.snapshot.vocabulary), 'nnz': store.nnz}, indent=2))
+        return
+
+    with StoreWriter(args.store) as writer:
+        if args.command == 'build':
+            params = {**DEFAULT_VECTORIZER, 'n_features': args.n_features} if args.n_features else None
+            meta = writer.build(*read_documents(args.source), vectorizer_params=params)
+        elif args.command == 'init':
+            meta = writer.create({**DEFAULT_VECTORIZER, 'n_features': args.n_features})
+        elif args.command == 'append':
+            meta = writer.append(*read_documents(args.source))
+        else:
+            meta = writer.compact()
+    print(f"{args.store}: {meta['documents']} documents in {len(meta['segments'])} segments")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,27 @@
 import os
+import sys
 import nltk
+import nlp_resources
 
 def download_nltk_data():
     """Download required NLTK data for deployment"""
     try:
         print("Downloading NLTK data...")
         nltk.download('punkt', quiet=True)
+        # NLTK 3.9+ loads Punkt from the pickle-free punkt_tab package
+        nltk.download('punkt_tab', quiet=True)
         nltk.download('stopwords', quiet=True)
         print("NLTK data downloaded successfully!")
     except Exception as e:
         print(f"Error downloading NLTK data: {e}")
 
+def build_artifact(path=nlp_resources.ARTIFACT_PATH):
+    """Pickle the tokenizers and stopwords so the app never touches nltk_data at runtime"""
+    nlp_resources.save_artifact(path)
+    print(f"NLTK artifact written to {path} ({os.path.getsize(path)} bytes)")
+
 if __name__ == "__main__":
-    download_nltk_data()
+    # --no-download: build the artifact from NLTK data that is already installed
+    if '--no-download' not in sys.argv:
+        download_nltk_data()
+    build_artifact()
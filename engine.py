@@ -0,0 +1,838 @@
+import os
+import re
+import string
+from collections import Counter
+from functools import cached_property
+import numpy as np
+import nlp_resources
+from cache import make_key
+from corpus import ReferenceCorpus
+from corpus_store import CorpusStore
+from sentences import SentenceIndex
+from metrics import stage, timed
+from minhash import MinHashIndex
+from patterns import PatternFamily, PatternScanner
+from scoring import ScoringModel, feature_vector
+
+# Detector tiers, cheapest first. Both extract the same features and score them
+# with the same weights, so a text without corpus matches scores identically.
+#   fast: native tokenizer and NumPy only; no NLTK, scikit-learn or reference corpus
+#   full: configured tokenizer, reference corpus similarity, TF-IDF batch comparison
+TIERS = ('fast', 'full')
+DEFAULT_TIER = os.environ.get('DETECTOR_TIER', 'full')
+
+
+class AnalysisDocument:
+    """Per-request view of a text that tokenizes and scans it only once"""
+    
+    def __init__(self, text, scanner=None, tokenizer=None):
+        self.text = text
+        self.scanner = scanner
+        self.tokenizer = tokenizer or nlp_resources.get_tokenizer()
+        self._matches = {}
+        self._first_matches = {}
+        self.sources = {}
+        self.passages = None
+        self.paraphrases = None
+        # Whose text this is, so their own earlier submissions are not reported as sources
+        self.submitter = None
+    
+    @cached_property
+    def lower(self):
+        return self.text.lower()
+    
+    @cached_property
+    def sentences(self):
+        with stage('sentence_tokenize'):
+            return self.tokenizer.sent_tokenize(self.text)
+    
+    @cached_property
+    def words(self):
+        sentences = self.sentences
+        with stage('word_tokenize'):
+            # Same tokens as word_tokenize(text) without splitting sentences a second time
+            return [word for sent in sentences for word in self.tokenizer.word_tokenize(sent, preserve_line=True)]
+    
+    @cached_property
+    def lower_words(self):
+        return [word.lower() for word in self.words]
+    
+    @cached_property
+    def words_clean(self):
+        return [word for word in self.lower_words if word.isalpha()]
+    
+    @cached_property
+    def word_counts(self):
+        return Counter(self.lower_words)
+    
+    @cached_property
+    def sentence_lengths(self):
+        return [len(sent.split()) for sent in self.sentences]
+    
+    @property
+    def sentence_count(self):
+        return len(self.sentences)
+    
+    @property
+    def long_sentence_count(self):
+        return sum(1 for n in self.sentence_lengths if n > 40)
+    
+    @property
+    def short_sentence_count(self):
+        return sum(1 for n in self.sentence_lengths if n < 3)
+    
+    @property
+    def token_count(self):
+        return len(self.lower_words)
+    
+    @property
+    def total_words(self):
+        return len(self.words_clean)
+    
+    @cached_property
+    def vocabulary(self):
+        return set(self.words_clean)
+    
+    @property
+    def unique_words(self):
+        return len(self.vocabulary)
+    
+    @cached_property
+    def sentence_length_variance(self):
+        lengths = self.sentence_lengths
+        if not lengths:
+            return 0
+        avg_length = sum(lengths) / len(lengths)
+        return sum((x - avg_length) ** 2 for x in lengths) / len(lengths)
+    
+    @cached_property
+    def phrase_counts(self):
+        if self.scanner is None:
+            return {}
+        return self.scanner.phrases.count(self.lower)
+    
+    def phrase_count(self, phrase):
+        """Occurrences of a lowercase phrase in the text"""
+        if phrase in self.phrase_counts:
+            return self.phrase_counts[phrase]
+        return self.lower.count(phrase)
+    
+    def match_count(self, pattern, flags=re.IGNORECASE):
+        """Number of matches of a pattern in the text"""
+        return len(self.matches(pattern, flags))
+    
+    def _family(self, pattern, flags):
+        if self.scanner is None:
+            return None
+        return self.scanner.family_of(pattern, flags)
+    
+    def matches(self, pattern, flags=re.IGNORECASE):
+        """Return (and cache) every match of a pattern in the text"""
+        key = (pattern, flags)
+        if key not in self._matches:
+            family = self._family(pattern, flags)
+            if family is not None and family.mode == 'all':
+                # Scan the whole family at once; its other patterns come for free
+                for family_pattern, found in family.findall(self.text).items():
+                    self._matches[(family_pattern, flags)] = found
+            else:
+                self._matches[key] = [m.group() for m in re.finditer(pattern, self.text, flags)]
+        return self._matches[key]
+    
+    @classmethod
+    def prefetch_matches(cls, docs, scanner):
+        """Scan many documents with one pass per pattern family and fill their caches"""
+        # The separator contains no word or whitespace characters patterns could span
+        separator = '\n\x00\n'
+        joined = separator.join(doc.text for doc in docs)
+        starts = np.cumsum([0] + [len(doc.text) + len(separator) for doc in docs[:-1]])
+        
+        for family in scanner.families:
+            found = [[[] for _ in family.patterns] for _ in docs]
+            for index, start, matched in family.findall_spans(joined):
+                found[np.searchsorted(starts, start, side='right') - 1][index].append(matched)
+            for doc, doc_found in zip(docs, found):
+                for pattern, pattern_found in zip(family.patterns, doc_found):
+                    if family.mode == 'all':
+                        doc._matches[(pattern, family.flags)] = pattern_found
+                    else:
+                        doc._first_matches[(pattern, family.flags)] = pattern_found[0] if pattern_found else None
+    
+    def first_match(self, pattern, flags=re.IGNORECASE):
+        """Return the first match of a pattern, or None"""
+        key = (pattern, flags)
+        if key in self._first_matches:
+            return self._first_matches[key]
+        if key in self._matches:
+            found = self._matches[key]
+            return found[0] if found else None
+        family = self._family(pattern, flags)
+        if family is not None and family.mode == 'first':
+            for family_pattern, found in family.first(self.text).items():
+                self._first_matches[(family_pattern, flags)] = found
+            return self._first_matches[key]
+        match = re.search(pattern, self.text, flags)
+        return match.group() if match else None
+    
+    def summarize(self, list_patterns, count_patterns, first_patterns, phrases):
+        """Reduce the document to a mergeable TextSummary"""
+        summary = TextSummary()
+        for length in self.sentence_lengths:
+            summary.add_sentence_length(length)
+        summary.token_count = self.token_count
+        summary.total_words = self.total_words
+        summary.vocabulary = set(self.vocabulary)
+        summary.word_counts = Counter(self.word_counts)
+        summary._matches = {pattern: list(self.matches(pattern)) for pattern in list_patterns}
+        summary._match_counts = {pattern: self.match_count(pattern) for pattern in count_patterns}
+        summary._first_matches = {pattern: self.first_match(pattern) for pattern in first_patterns}
+        summary._phrase_counts = {phrase: self.phrase_count(phrase) for phrase in phrases}
+        return summary
+
+
+class TextSummary:
+    """Mergeable feature counts for part of a text
+
+    Exposes the same read interface as AnalysisDocument, so the detectors can
+    score text that was analyzed piecewise (in parallel, streamed or cached
+    paragraph by paragraph). Sentence length variance is kept with Welford's
+    online algorithm and merged with Chan et al.'s parallel update.
+    """
+    
+    def __init__(self):
+        self.text = None
+        self.sentence_count = 0
+        self.sentence_mean = 0.0
+        self.sentence_m2 = 0.0
+        self.long_sentence_count = 0
+        self.short_sentence_count = 0
+        self.token_count = 0
+        self.total_words = 0
+        self.vocabulary = set()
+        self.word_counts = Counter()
+        self._matches = {}
+        self._match_counts = {}
+        self._first_matches = {}
+        self._phrase_counts = {}
+        self.sources = {}
+        self.passages = None
+        self.paraphrases = None
+        # Whose text this is, so their own earlier submissions are not reported as sources
+        self.submitter = None
+    
+    @property
+    def unique_words(self):
+        return len(self.vocabulary)
+    
+    @property
+    def sentence_length_variance(self):
+        if not self.sentence_count:
+            return 0
+        return self.sentence_m2 / self.sentence_count
+    
+    def add_sentence_length(self, length):
+        """Welford update with one more sentence"""
+        self.sentence_count += 1
+        delta = length - self.sentence_mean
+        self.sentence_mean += delta / self.sentence_count
+        self.sentence_m2 += delta * (length - self.sentence_mean)
+        if length > 40:
+            self.long_sentence_count += 1
+        if length < 3:
+            self.short_sentence_count += 1
+    
+    def merge(self, other):
+        """Fold the summary of the following part of the text into this one"""
+        count = self.sentence_count + other.sentence_count
+        if count:
+            delta = other.sentence_mean - self.sentence_mean
+            self.sentence_m2 += other.sentence_m2 + delta * delta * self.sentence_count * other.sentence_count / count
+            self.sentence_mean += delta * other.sentence_count / count
+        self.sentence_count = count
+        self.long_sentence_count += other.long_sentence_count
+        self.short_sentence_count += other.short_sentence_count
+        self.token_count += other.token_count
+        self.total_words += other.total_words
+        self.vocabulary |= other.vocabulary
+        self.word_counts.update(other.word_counts)
+        for pattern, found in other._matches.items():
+            self._matches.setdefault(pattern, []).extend(found)
+        for pattern, count in other._match_counts.items():
+            self._match_counts[pattern] = self._match_counts.get(pattern, 0) + count
+        for pattern, found in other._first_matches.items():
+            if self._first_matches.get(pattern) is None:
+                self._first_matches[pattern] = found
+        for phrase, count in other._phrase_counts.items():
+            self._phrase_counts[phrase] = self._phrase_counts.get(phrase, 0) + count
+        return self
+    
+    def to_dict(self):
+        """JSON-serializable form of the counts, for caching; the text itself is left out"""
+        return {
+            'sentence_count': self.sentence_count,
+            'sentence_mean': self.sentence_mean,
+            'sentence_m2': self.sentence_m2,
+            'long_sentence_count': self.long_sentence_count,
+            'short_sentence_count': self.short_sentence_count,
+            'token_count': self.token_count,
+            'total_words': self.total_words,
+            'vocabulary': sorted(self.vocabulary),
+            'word_counts': dict(self.word_counts),
+            'matches': self._matches,
+            'match_counts': self._match_counts,
+            'first_matches': self._first_matches,
+            'phrase_counts': self._phrase_counts
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls()
+        summary.sentence_count = data['sentence_count']
+        summary.sentence_mean = data['sentence_mean']
+        summary.sentence_m2 = data['sentence_m2']
+        summary.long_sentence_count = data['long_sentence_count']
+        summary.short_sentence_count = data['short_sentence_count']
+        summary.token_count = data['token_count']
+        summary.total_words = data['total_words']
+        summary.vocabulary = set(data['vocabulary'])
+        summary.word_counts = Counter(data['word_counts'])
+        summary._matches = data['matches']
+        summary._match_counts = data['match_counts']
+        summary._first_matches = data['first_matches']
+        summary._phrase_counts = data['phrase_counts']
+        return summary
+    
+    def phrase_count(self, phrase):
+        return self._phrase_counts.get(phrase, 0)
+    
+    def match_count(self, pattern, flags=re.IGNORECASE):
+        if pattern in self._match_counts:
+            return self._match_counts[pattern]
+        return len(self._matches.get(pattern, ()))
+    
+    def matches(self, pattern, flags=re.IGNORECASE):
+        return self._matches.get(pattern, [])
+    
+    def first_match(self, pattern, flags=re.IGNORECASE):
+        if pattern in self._first_matches:
+            return self._first_matches[pattern]
+        found = self._matches.get(pattern)
+        return found[0] if found else None
+
+
+class PlagiarismDetector:
+    def __init__(self, tokenizer=None, tier=None):
+        self.tier = tier or DEFAULT_TIER
+        if self.tier not in TIERS:
+            raise ValueError(f"Unknown detector tier: {self.tier}")
+        # Sentence/word tokenizer: NLTK by default, or the native regex scanner (see nlp_resources)
+        if tokenizer is None:
+            tokenizer = nlp_resources.get_tokenizer('native' if self.tier == 'fast' else None)
+        self.tokenizer = tokenizer
+        # Reference corpus for source comparison (see load_corpus)
+        self.corpus = None
+        self.top_k_sources = 5
+        # Sentence-level paraphrase index (see load_sentence_index) and the combined similarity it reports from
+        self.sentence_index = None
+        self.paraphrase_similarity = 0.65
+        # Optional AnalysisPool for long documents and batches (see parallel.py)
+        self.pool = None
+        # Weights of the risk score (built-in, or a model fitted offline and saved at SCORING_MODEL)
+        self.scoring_model = ScoringModel.from_environ()
+        # Common phrases that might indicate plagiarism
+        self.common_academic_phrases = [
+            "in conclusion", "furthermore", "however", "moreover", "therefore",
+            "according to", "as a result", "in addition", "on the other hand",
+            "for example", "in other words", "it is important to note",
+            "studies have shown", "research indicates", "it can be concluded",
+            "first of all", "second of all", "last but not least", "to sum up",
+            "in summary", "as mentioned above", "as stated previously"
+        ]
+        self.suspicious_patterns = [
+            r'\b(?:copy|copied|paste|pasted|copypaste)\b',
+            r'\b(?:wikipedia|wiki)\b',
+            r'\b(?:source|sources)\s*:',
+            r'(?:retrieved|accessed)\s+(?:from|on)',
+            r'\b(?:doi|isbn|url|http|https|www)\b',
+            r'©|\bcopyright\b|\ball rights reserved\b',
+            r'\b(?:reference|references|bibliography)\b',
+            r'\[\d+\]|\(\d{4}\)',  # Citations like [1] or (2020)
+            r'\bet al\b|\betal\b',
+            r'\bpp\?\s*\d+',  # Page numbers
+            r'\bvol\.\s*\d+|\bvolume\s*\d+',
+        ]
+        # Encyclopedia-style phrasing
+        self.wikipedia_indicators = [
+            r'\bis a\b.*\bthat\b',  # "X is a Y that..."
+            r'\bwas born\b.*\bin\b',
+            r'\bis known for\b',
+            r'\bis located in\b',
+            r'\bis the capital of\b',
+            r'\baccording to.*sources?\b',
+            r'\bas of \d{4}\b',  # "as of 2020"
+            r'\bcitation needed\b',
+            r'\b\d{4}\b.*\b\d{4}\b',  # Multiple years like "1805... 1806"
+            r'\bBattle of\b',  # Historical battles
+            r'\bWar of\b',  # Historical wars
+            r'\bin \d{4}\b',  # "in 1805", "in 1806"
+            r'\bdefeated\b.*\bat\b',  # "defeated X at Y"
+            r'\bled to\b.*\bof\b',  # "led to the X of Y"
+            r'\bis considered\b.*\bin history\b',
+            r'\bhis legacy\b',
+            r'\bare still studied\b',
+            r'\bembodied in\b',
+            r'\bforcing\b.*\bto\b',  # "forcing X to Y"
+            r'\bexiled\b.*\bto\b',  # "exiled to X"
+            r'\bdied of\b.*\bin \d{4}\b',  # "died of X in YEAR"
+        ]
+        # Historical/biographical vocabulary
+        self.historical_patterns = [
+            r'\b\d{4}s?\b',  # Years like 1805, 1800s
+            r'\b(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},?\s+\d{4}\b',
+            r'\b(?:Emperor|King|Queen|Prince|Princess|Duke|General|Admiral)\b',
+            r'\b(?:Empire|Kingdom|Republic|Coalition|Peninsula|Treaty)\b',
+            r'\b(?:invaded|conquered|defeated|victory|battle|war|peace)\b',
+            r'\b(?:throne|crown|reign|rule|power|abdicate)\b',
+            r'\b(?:army|military|naval|forces|troops|soldiers)\b',
+        ]
+        self.formal_indicator_pattern = r'\b(?:however|furthermore|moreover|nevertheless|consequently|subsequently|thereby|wherein|whereby)\b'
+        # Precompiled families so each document is scanned once per family
+        self.scanner = PatternScanner([
+            PatternFamily('suspicious', self.suspicious_patterns),
+            PatternFamily('wikipedia', self.wikipedia_indicators, mode='first'),
+            PatternFamily('historical', self.historical_patterns),
+            PatternFamily('formal', [self.formal_indicator_pattern]),
+        ], self.common_academic_phrases)
+    
+    @cached_property
+    def stop_words(self):
+        return set(nlp_resources.stopwords())
+    
+    @cached_property
+    def vectorizer(self):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        return TfidfVectorizer(stop_words='english', ngram_range=(1, 3))
+    
+    def _document(self, text):
+        """Wrap raw text in an AnalysisDocument unless it already is one"""
+        if isinstance(text, (AnalysisDocument, TextSummary)):
+            return text
+        return AnalysisDocument(text, self.scanner, self.tokenizer)
+    
+    def load_corpus(self, path):
+        """Load a reference corpus built with corpus.py, or a memory-mapped corpus_store.py store"""
+        if self.tier == 'fast':
+            raise ValueError("The fast tier does not use a reference corpus; create the detector with tier='full'")
+        if CorpusStore.is_store(path):
+            self.corpus = CorpusStore(path)
+        else:
+            self.corpus = ReferenceCorpus.load(path)
+        self.vectorizer = self.corpus.vectorizer
+        return self.corpus
+    
+    def load_sentence_index(self, path):
+        """Load a sentence paraphrase index built with sentences.py"""
+        if self.tier == 'fast':
+            raise ValueError("The fast tier does not use a sentence index; create the detector with tier='full'")
+        index = SentenceIndex(path)
+        # Sentences are split at query time with the detector's tokenizer, so it must match the one the index was built with
+        if index.meta['tokenizer'] != self.tokenizer.name:
+            raise ValueError(
+                f"The sentence index at {path} was built with the {index.meta['tokenizer']!r} tokenizer "
+                f"but the detector uses {self.tokenizer.name!r}; rebuild it or set TOKENIZER={index.meta['tokenizer']}"
+            )
+        self.sentence_index = index
+        return self.sentence_index
+    
+    def preprocess_text(self, text):
+        """Clean and preprocess the text"""
+        text = text.lower()
+        text = text.translate(str.maketrans('', '', string.punctuation))
+        text = ' '.join(text.split())
+        return text
+    
+    @timed('statistics')
+    def analyze_text_statistics(self, text):
+        """Analyze basic text statistics"""
+        doc = self._document(text)
+        
+        return {
+            'total_words': doc.total_words,
+            'total_sentences': doc.sentence_count,
+            'unique_words': doc.unique_words,
+            'avg_words_per_sentence': round(doc.total_words / doc.sentence_count, 1) if doc.sentence_count else 0
+        }
+    
+    @timed('suspicious_patterns')
+    def detect_suspicious_patterns(self, text):
+        """Detect patterns that might indicate copied content"""
+        doc = self._document(text)
+        suspicious_found = []
+        
+        for pattern in self.suspicious_patterns:
+            suspicious_found.extend(doc.matches(pattern))
+        
+        return suspicious_found
+    
+    @timed('sentence_structure')
+    def analyze_sentence_structure(self, text):
+        """Analyze sentence structure for potential copying indicators"""
+        doc = self._document(text)
+        issues = []
+        
+        # Check for very long sentences (possible copy-paste)
+        if doc.long_sentence_count:
+            issues.append(f"Found {doc.long_sentence_count} unusually long sentences that may indicate copying")
+        
+        # Check for very short sentences
+        if doc.short_sentence_count > doc.sentence_count * 0.3:
+            issues.append("High proportion of very short sentences detected")
+        
+        return issues
+    
+    @timed('common_phrases')
+    def detect_common_phrases(self, text):
+        """Detect overuse of common academic phrases"""
+        doc = self._document(text)
+        found_phrases = []
+        
+        for phrase in self.common_academic_phrases:
+            count = doc.phrase_count(phrase)
+            if count:
+                if count > 1:
+                    found_phrases.append(f"{phrase} (used {count} times)")
+                else:
+                    found_phrases.append(phrase)
+        
+        return found_phrases[:10]  # Return top 10
+    
+    @timed('wiki_patterns')
+    def detect_wikipedia_like_content(self, text):
+        """Detect content that resembles Wikipedia or encyclopedia entries"""
+        doc = self._document(text)
+        matches = 0
+        matched_patterns = []
+        for pattern in self.wikipedia_indicators:
+            match = doc.first_match(pattern)
+            if match is not None:
+                matches += 1
+                # Keep the actual match for debugging
+                matched_patterns.append(match[:30])  # First 30 chars
+        
+        return matches
+    
+    @timed('historical_patterns')
+    def detect_historical_content(self, text):
+        """Detect historical/biographical content patterns"""
+        doc = self._document(text)
+        matches = 0
+        for pattern in self.historical_patterns:
+            matches += doc.match_count(pattern)
+        
+        return matches
+    
+    @timed('similar_sources')
+    def find_similar_sources(self, text, top_k=None):
+        """Find the reference documents most similar to the text"""
+        doc = self._document(text)
+        if self.corpus is None or doc.text is None:
+            return []
+        top_k = top_k or self.top_k_sources
+        if top_k not in doc.sources:
+            doc.sources[top_k] = self.corpus.query(doc.text, top_k=top_k, submitter=doc.submitter)
+        return doc.sources[top_k]
+    
+    @timed('matching_passages')
+    def find_matching_passages(self, text):
+        """Locate passages that match reference documents character for character"""
+        doc = self._document(text)
+        if self.corpus is None or doc.text is None:
+            return []
+        if doc.passages is None:
+            doc.passages = self.corpus.matching_passages(doc.text, submitter=doc.submitter)
+        return doc.passages
+    
+    @timed('paraphrases')
+    def find_paraphrased_sentences(self, text):
+        """Locate sentences that closely paraphrase a reference sentence"""
+        doc = self._document(text)
+        if self.sentence_index is None or doc.text is None:
+            return []
+        if doc.paraphrases is None:
+            doc.paraphrases = self.sentence_index.query(doc.text, self.tokenizer, self.paraphrase_similarity)
+        return doc.paraphrases
+    
+    def summary_key(self):
+        """Hash of everything besides the text that changes a TextSummary (config_key without the corpus)"""
+        return make_key(
+            self.suspicious_patterns, self.wikipedia_indicators, self.historical_patterns,
+            self.formal_indicator_pattern, self.common_academic_phrases, self.tokenizer.name, self.tier
+        )
+    
+    def config_key(self):
+        """Hash of everything besides the text that changes detection results"""
+        # The corpus's fit, not its size: appended submissions are checked per result (see has_new_sources)
+        corpus_state = None
+        if self.corpus is not None:
+            corpus_state = self.corpus.config_key()
+        sentence_index_state = None
+        if self.sentence_index is not None:
+            sentence_index_state = [self.sentence_index.config_key(), self.paraphrase_similarity]
+        return make_key(
+            self.suspicious_patterns, self.wikipedia_indicators, self.historical_patterns,
+            self.formal_indicator_pattern, self.common_academic_phrases, corpus_state,
+            self.tokenizer.name, self.tier, self.scoring_model.config_key(), sentence_index_state
+        )
+    
+    def corpus_documents(self):
+        """Number of reference documents, recorded with cached results for has_new_sources"""
+        return 0 if self.corpus is None else len(self.corpus)
+    
+    def has_new_sources(self, text, since, submitter=None):
+        """Whether documents added after the corpus held `since` of them are sources of the text"""
+        if self.corpus is None or since >= len(self.corpus):
+            return False
+        return self.corpus.has_sources_since(text, since, submitter)
+    
+    @timed('summarize')
+    def summarize(self, text):
+        """Reduce a text to the mergeable counts every detector reads"""
+        return self._document(text).summarize(
+            list_patterns=self.suspicious_patterns,
+            count_patterns=self.historical_patterns + [self.formal_indicator_pattern],
+            first_patterns=self.wikipedia_indicators,
+            phrases=self.common_academic_phrases
+        )
+    
+    def detect_from_summary(self, summary, top_k=None):
+        """Score and report on a text that was analyzed piecewise into a TextSummary"""
+        return self._build_result(summary, self.calculate_plagiarism_score(summary), top_k)
+    
+    @timed('formal_indicators')
+    def count_formal_indicators(self, text):
+        """Count formal/encyclopedic transition words"""
+        return self._document(text).match_count(self.formal_indicator_pattern)
+    
+    def extract_features(self, text):
+        """Feature vector of the text, with the slots of scoring.FEATURES"""
+        doc = self._document(text)
+        stats = self.analyze_text_statistics(doc)
+        most_common = doc.word_counts.most_common(1)
+        sources = self.find_similar_sources(doc)
+        
+        return feature_vector(
+            unique_ratio=stats['unique_words'] / stats['total_words'] if stats['total_words'] > 0 else 0,
+            suspicious_count=len(self.detect_suspicious_patterns(doc)),
+            structure_issues=len(self.analyze_sentence_structure(doc)),
+            common_phrases=len(self.detect_common_phrases(doc)),
+            top_word_share=most_common[0][1] / doc.token_count if most_common and doc.token_count else 0,
+            token_count=doc.token_count,
+            sentence_count=doc.sentence_count,
+            sentence_length_variance=doc.sentence_length_variance,
+            wiki_indicators=self.detect_wikipedia_like_content(doc),
+            historical_indicators=self.detect_historical_content(doc),
+            formal_indicators=self.count_formal_indicators(doc),
+            best_source_similarity=sources[0]['similarity'] if sources else 0
+        )
+    
+    @timed('scoring')
+    def score_features(self, features):
+        """Risk scores of a feature matrix (one row per text), or the score of one feature vector"""
+        return self.scoring_model.score(features)
+    
+    def calculate_plagiarism_score(self, text):
+        """Calculate an overall plagiarism risk score"""
+        return int(self.score_features(self.extract_features(text)))
+    
+    def detect_plagiarism(self, text, top_k=None, submitter=None):
+        """Main single-text plagiarism detection function"""
+        if not text.strip():
+            return {"error": "Text must be provided"}
+        
+        if self.pool is not None and isinstance(text, str) and self.pool.should_split(text):
+            summary = self.pool.summarize(text)
+            summary.submitter = submitter
+            return self.detect_from_summary(summary, top_k)
+        
+        # Tokenize and scan once; every detector below reads from this
+        doc = self._document(text)
+        if submitter is not None:
+            doc.submitter = submitter
+        return self._build_result(doc, self.calculate_plagiarism_score(doc), top_k)
+    
+    def detect_plagiarism_batch(self, texts, top_k=None, submitters=None):
+        """Analyze many texts together and compare them against each other"""
+        results = [None] * len(texts)
+        positions = []
+        for i, text in enumerate(texts):
+            if not text.strip():
+                results[i] = {"error": "Text must be provided"}
+            else:
+                positions.append(i)
+        
+        if self.pool is not None and len(positions) > 1:
+            docs = list(zip(positions, self.pool.summarize_many([texts[i] for i in positions])))
+        else:
+            docs = [(i, AnalysisDocument(texts[i], self.scanner, self.tokenizer)) for i in positions]
+            if docs:
+                # One scan per pattern family over the whole batch instead of one per document
+                AnalysisDocument.prefetch_matches([doc for _, doc in docs], self.scanner)
+        if submitters is not None:
+            for i, doc in docs:
+                doc.submitter = submitters[i]
+        
+        if docs:
+            # One row per document, scored in a single array operation
+            scores = self.score_features(np.array([self.extract_features(doc) for _, doc in docs]))
+            
+            for (i, doc), score in zip(docs, scores):
+                results[i] = self._build_result(doc, int(score), top_k)
+        
+        similarity_matrix = self.cross_similarity(texts)
+        return {
+            'results': results,
+            'similarity_matrix': np.round(similarity_matrix * 100, 1).tolist(),
+            'similar_pairs': self.similar_pairs(similarity_matrix)
+        }
+    
+    @timed('cross_similarity')
+    def cross_similarity(self, texts):
+        """Pairwise TF-IDF cosine similarity between submissions"""
+        n = len(texts)
+        if n < 2:
+            return np.ones((n, n))
+        if self.tier == 'fast':
+            return self.shingle_similarity(texts)
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.metrics.pairwise import cosine_similarity
+        vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 3))
+        try:
+            tfidf = vectorizer.fit_transform(texts)
+        except ValueError:
+            # Every text was empty or only stop words
+            return np.eye(n)
+        return cosine_similarity(tfidf)
+    
+    def shingle_similarity(self, texts):
+        """Pairwise MinHash estimate of word 3-shingle overlap, for the fast tier"""
+        minhash = MinHashIndex()
+        signatures = np.array([minhash.signature(text) for text in texts])
+        similarity = np.empty((len(texts), len(texts)))
+        for i, signature in enumerate(signatures):
+            similarity[i] = (signatures == signature).mean(axis=1)
+        # Texts too short to have shingles share the empty signature but nothing else
+        empty = (signatures == minhash.signature('')).all(axis=1)
+        similarity[empty] = 0
+        similarity[:, empty] = 0
+        np.fill_diagonal(similarity, 1)
+        return similarity
+    
+    def similar_pairs(self, similarity_matrix, threshold=0.5):
+        """Pairs of submissions whose similarity reaches the threshold, most similar first"""
+        rows, cols = np.nonzero(np.triu(similarity_matrix >= threshold, k=1))
+        pairs = [
+            {'first': int(i), 'second': int(j), 'similarity': round(float(similarity_matrix[i, j]) * 100, 1)}
+            for i, j in zip(rows, cols)
+        ]
+        pairs.sort(key=lambda pair: pair['similarity'], reverse=True)
+        return pairs
+    
+    @timed('report')
+    def _build_result(self, doc, plagiarism_score, top_k=None):
+        """Assemble the issue list and response for an already-scored document"""
+        # Analyze text statistics
+        text_analysis = self.analyze_text_statistics(doc)
+        
+        # Detect issues
+        suspicious_patterns = self.detect_suspicious_patterns(doc)
+        structure_issues = self.analyze_sentence_structure(doc)
+        common_phrases = self.detect_common_phrases(doc)
+        wiki_indicators = self.detect_wikipedia_like_content(doc)
+        historical_indicators = self.detect_historical_content(doc)
+        similar_sources = self.find_similar_sources(doc, top_k)
+        matched_passages = self.find_matching_passages(doc)
+        paraphrased_sentences = self.find_paraphrased_sentences(doc)
+        
+        # Combine all issues
+        all_issues = []
+        if suspicious_patterns:
+            pattern_list = list(set(suspicious_patterns))[:3]  # Remove duplicates, take first 3
+            all_issues.append(f"Suspicious patterns detected: {', '.join(pattern_list)}")
+        
+        all_issues.extend(structure_issues)
+        
+        if len(common_phrases) > 3:
+            all_issues.append(f"Overuse of common academic phrases detected ({len(common_phrases)} phrases)")
+            
+        if wiki_indicators > 3:
+            all_issues.append(f"Content resembles encyclopedia/Wikipedia style ({wiki_indicators} indicators)")
+        elif wiki_indicators > 1:
+            all_issues.append(f"Some encyclopedia-style patterns detected ({wiki_indicators} indicators)")
+            
+        if historical_indicators > 15:
+            all_issues.append(f"High concentration of historical/factual content ({historical_indicators} indicators)")
+        elif historical_indicators > 10:
+            all_issues.append(f"Significant historical/factual content detected ({historical_indicators} indicators)")
+        elif historical_indicators > 5:
+            all_issues.append(f"Historical/biographical content patterns found ({historical_indicators} indicators)")
+        
+        if similar_sources and similar_sources[0]['similarity'] >= 50:
+            source = similar_sources[0]
+            all_issues.append(f"Closely matches reference source '{source['title']}' ({source['similarity']}% similar)")
+        elif similar_sources and similar_sources[0]['similarity'] >= 30:
+            source = similar_sources[0]
+            all_issues.append(f"Partial overlap with reference source '{source['title']}' ({source['similarity']}% similar)")
+        
+        if matched_passages:
+            passage_count = sum(len(source['spans']) for source in matched_passages)
+            all_issues.append(f"Found {passage_count} passages copied verbatim from {len(matched_passages)} reference sources")
+        
+        if paraphrased_sentences:
+            sources = {sentence['source']['id'] for sentence in paraphrased_sentences}
+            all_issues.append(f"Found {len(paraphrased_sentences)} sentences that closely paraphrase {len(sources)} reference sources")
+        
+        # Add more specific feedback
+        stats = text_analysis
+        unique_ratio = stats['unique_words'] / stats['total_words'] if stats['total_words'] > 0 else 0
+        
+        if unique_ratio < 0.3:
+            all_issues.append("Very low vocabulary diversity - possible copied content")
+        elif unique_ratio < 0.5:
+            all_issues.append("Moderate vocabulary diversity - review for originality")
+            
+        # Check sentence length variance
+        if doc.sentence_count > 1:
+            if doc.sentence_length_variance > 100:
+                all_issues.append("Inconsistent sentence structure detected")
+                
+        # Check for overly factual/formal tone
+        formal_indicators = self.count_formal_indicators(doc)
+        if formal_indicators > 3:
+            all_issues.append("Highly formal/academic writing style detected")
+        
+        # Determine risk level - made more sensitive
+        if plagiarism_score >= 60:
+            plagiarism_level = "High"
+            risk_color = "danger"
+        elif plagiarism_score >= 35:
+            plagiarism_level = "Medium"
+            risk_color = "warning"
+        elif plagiarism_score >= 15:
+            plagiarism_level = "Low"
+            risk_color = "info"
+        else:
+            plagiarism_level = "Very Low"
+            risk_color = "success"
+        
+        return {
+            'plagiarism_score': round(plagiarism_score, 1),
+            'plagiarism_level': plagiarism_level,
+            'risk_color': risk_color,
+            'text_analysis': text_analysis,
+            'suspicious_patterns': len(suspicious_patterns),
+            'issues': all_issues,
+            'common_phrases': common_phrases,
+            'similar_sources': similar_sources,
+            'matched_passages': matched_passages,
+            'paraphrased_sentences': paraphrased_sentences
+        }
@@ -0,0 +1,135 @@
+import os
+import zipfile
+import hashlib
+from xml.etree import ElementTree
+from streaming import iter_decoded, normalize_newlines
+
+WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+# Leading bytes of each binary format, checked so a renamed file fails clearly
+SIGNATURES = {'.docx': b'PK\x03\x04', '.pdf': b'%PDF-'}
+# A .docx body is compressed XML, so its uncompressed size is checked before parsing
+MAX_DOCX_XML_BYTES = 256 * 1024 * 1024
+# pypdf reads a PDF's object table and page tree up front, so long documents are refused by page count
+MAX_PDF_PAGES = 5000
+
+
+class ExtractionError(ValueError):
+    """An uploaded document is of an unsupported type, damaged, or too long"""
+
+
+def file_digest(stream, chunk_size=65536):
+    """sha256 hex digest and size of a binary stream, read from its current position"""
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            break
+        digest.update(data)
+        size += len(data)
+    return digest.hexdigest(), size
+
+
+def document_kind(filename, head):
+    """Extension of a supported upload ('.txt', '.docx' or '.pdf'), checked against its first bytes"""
+    kind = os.path.splitext(filename or '')[1].lower()
+    if kind not in EXTRACTORS:
+        raise ExtractionError(f"Unsupported file type; upload one of {', '.join(EXTRACTORS)}")
+    signature = SIGNATURES.get(kind)
+    if signature is not None and not head.startswith(signature):
+        raise ExtractionError(f'The file is not a valid {kind[1:].upper()} document')
+    return kind
+
+
+def iter_plain_text(stream, chunk_size):
+    # utf-8-sig drops the byte order mark Windows editors put in front of UTF-8 files
+    return iter_decoded(stream, chunk_size, encoding='utf-8-sig')
+
+
+def iter_docx_text(stream, chunk_size):
+    """Paragraphs of a .docx body, parsed incrementally from the compressed XML
+
+    Paragraphs nested in an outer one (text boxes, w:txbxContent) become lines
+    of the outer paragraph, which is yielded once it ends.
+    """
+    try:
+        archive = zipfile.ZipFile(stream)
+        info = archive.getinfo('word/document.xml')
+        if info.file_size > MAX_DOCX_XML_BYTES:
+            raise ExtractionError(f'DOCX documents may expand to at most {MAX_DOCX_XML_BYTES} bytes of XML')
+        document = archive.open(info)
+    except (zipfile.BadZipFile, KeyError) as e:
+        raise ExtractionError('The file is not a valid DOCX document') from e
+
+    with archive, document:
+        pieces = []
+        # Open elements from the root down, and how many of them are paragraphs
+        open_elements = []
+        depth = 0
+        try:
+            for event, element in ElementTree.iterparse(document, events=('start', 'end')):
+                tag = element.tag
+                if event == 'start':
+                    open_elements.append(element)
+                    if tag == f'{WORD_NAMESPACE}p':
+                        depth += 1
+                    continue
+                open_elements.pop()
+                if tag == f'{WORD_NAMESPACE}t':
+                    pieces.append(element.text or '')
+                elif tag == f'{WORD_NAMESPACE}tab':
+                    pieces.append('\t')
+                elif tag in (f'{WORD_NAMESPACE}br', f'{WORD_NAMESPACE}cr'):
+                    pieces.append('\n')
+                elif tag == f'{WORD_NAMESPACE}p':
+                    depth -= 1
+                    pieces.append('\n')
+                    if depth == 0:
+                        yield ''.join(pieces)
+                        pieces = []
+                # Completed elements are dropped so memory stays bounded by the deepest open path
+                element.clear()
+                if open_elements:
+                    open_elements[-1].remove(element)
+        except ElementTree.ParseError as e:
+            raise ExtractionError('The file is not a valid DOCX document') from e
+        if pieces:
+            yield ''.join(pieces)
+
+
+def iter_pdf_text(stream, chunk_size):
+    """Text of each PDF page in order
+
+    Pages are extracted one at a time, but pypdf reads the whole object table
+    first, so memory follows the file size (bounded by the upload limit) and
+    documents over MAX_PDF_PAGES pages are refused before any page is parsed.
+    """
+    try:
+        from pypdf import PdfReader
+        from pypdf.errors import PdfReadError
+    except ImportError as e:
+        raise ExtractionError('PDF uploads need the pypdf package') from e
+
+    try:
+        reader = PdfReader(stream)
+        if reader.is_encrypted and not reader.decrypt(''):
+            raise ExtractionError('Password-protected PDF documents cannot be analyzed')
+        if len(reader.pages) > MAX_PDF_PAGES:
+            raise ExtractionError(f'PDF documents may have at most {MAX_PDF_PAGES} pages')
+        for page in reader.pages:
+            yield page.extract_text() + '\n'
+    except PdfReadError as e:
+        raise ExtractionError('The file is not a valid PDF document') from e
+
+
+EXTRACTORS = {'.txt': iter_plain_text, '.docx': iter_docx_text, '.pdf': iter_pdf_text}
+
+
+def iter_document_text(stream, kind, chunk_size=65536, max_chars=None):
+    """Text chunks of an uploaded document with unified line endings, at most max_chars in total"""
+    characters = 0
+    for chunk in normalize_newlines(EXTRACTORS[kind](stream, chunk_size)):
+        characters += len(chunk)
+        if max_chars is not None and characters > max_chars:
+            raise ExtractionError(f'Documents may contain at most {max_chars} characters of text')
+        yield chunk
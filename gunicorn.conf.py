@@ -0,0 +1,38 @@
+# Picked up automatically by `gunicorn app:app` from the working directory
+import os
+
+# Import the app once in the master so workers share its memory copy-on-write
+preload_app = True
+
+# SERVING_MODE=threaded: one gthread worker per box by default, serving many
+# connections from threads while detector work runs in the app's process pool
+# (serving.WorkExecutor); the default keeps gunicorn's sync workers
+if os.environ.get('SERVING_MODE') == 'threaded':
+    worker_class = 'gthread'
+    workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+    threads = int(os.environ.get('SERVE_THREADS', 32))
+    # Above this many open connections per worker, new ones wait in the listen backlog
+    worker_connections = int(os.environ.get('SERVE_MAX_CONNECTIONS', 1000))
+    timeout = int(os.environ.get('SERVE_TIMEOUT', 60))
+
+
+def on_starting(server):
+    # Load the NLTK artifact and scikit-learn before forking, not per worker
+    import nlp_resources
+    nlp_resources.preload()
+
+
+def when_ready(server):
+    # The preloaded app is never freed; keep the collector from touching (and so
+    # copying) its pages in every forked worker and pool process
+    import gc
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    # Fork the executor's pool processes before the worker starts its request threads
+    import app
+    if app.work_executor is not None:
+        app.work_executor.start()
+    # Pick up jobs queued before this worker existed (e.g. by one that has exited)
+    app.job_queue.start()
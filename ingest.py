@@ -0,0 +1,153 @@
+import os
+import time
+import logging
+import threading
+import numpy as np
+from corpus_store import DEFAULT_VECTORIZER, CorpusStore, StoreWriter, StoreSnapshot, text_digest
+
+logger = logging.getLogger('plagiarism')
+
+
+class CorpusIngestor:
+    """Adds analyzed submissions to a CorpusStore in the background
+
+    submit() only queues the text, so request latency does not depend on the
+    corpus size. A thread in each process writes the queue as a new segment
+    every flush_interval seconds and then merges the newest segments by size
+    tier (see corpus_store.merge_start), so inserts never refit the vectorizer
+    and never rewrite the whole corpus. Every CorpusStore reading the same
+    path sees the new documents on its next refresh. Texts still queued when
+    the process dies are lost.
+    """
+
+    def __init__(self, path, flush_interval=2.0, max_pending=10000, merge_factor=4, max_merge_documents=100000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.merge_factor = merge_factor
+        self.max_merge_documents = max_merge_documents
+        self.lock = threading.Lock()
+        # (digest, submitter digest or 0) -> (text, document metadata), in submission order
+        self._pending = {}
+        self._thread = None
+        self._pid = None
+        self.written = 0
+        self.dropped = 0
+        self.merges = 0
+        self.last_error = None
+
+    @staticmethod
+    def ensure_store(path, vectorizer_params=None):
+        """Create an empty hashed store at path unless a store is already there"""
+        if CorpusStore.is_store(path):
+            return
+        if os.path.isdir(path) and os.listdir(path):
+            raise ValueError(f"{path} holds a corpus.py index; build it with corpus_store.py to ingest submissions")
+        with StoreWriter(path) as writer:
+            if not CorpusStore.is_store(path):
+                writer.create(vectorizer_params)
+
+    def submit(self, text, document=None, submitter=None):
+        """Queue a text for the corpus; False if it is already queued or the queue is full
+
+        Only a digest of submitter is stored, so later submissions by the same
+        submitter (e.g. an edited resubmission) never report this text as a source.
+        A text is stored once per submitter: the same text from someone else is
+        a new row, so it is still reported as a source of their copies.
+        """
+        digest = text_digest(text)
+        key = (digest, text_digest(submitter) if submitter else 0)
+        with self.lock:
+            if key in self._pending:
+                return False
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending[key] = (text, {
+                'title': f'Submission {digest:016x}',
+                'source': 'submission',
+                'submitted': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                **(document or {})
+            })
+        self.start()
+        return True
+
+    def flush(self):
+        """Write every queued text as one segment and merge; returns the number of texts written"""
+        with self.lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            with StoreWriter(self.path) as writer:
+                # (text, submitter) pairs that an earlier flush (in any process) already stored are skipped
+                snapshot = StoreSnapshot(self.path, writer.read_meta())
+                queued = np.fromiter((digest for digest, _ in pending), dtype=np.uint64, count=len(pending))
+                stored = set()
+                for segment in snapshot.segments:
+                    rows = np.isin(segment.digests, queued)
+                    stored.update(zip(segment.digests[rows].tolist(), segment.submitters[rows].tolist()))
+                keys = [key for key in pending if key not in stored]
+                if keys:
+                    writer.append(
+                        [pending[key][0] for key in keys],
+                        [pending[key][1] for key in keys],
+                        [digest for digest, _ in keys],
+                        [owner for _, owner in keys]
+                    )
+                    self.merges += writer.merge_tail(self.merge_factor, self.max_merge_documents)
+        except Exception:
+            # Put the texts back so the next flush retries them
+            with self.lock:
+                self._pending = {**pending, **self._pending}
+            raise
+        self.written += len(keys)
+        return len(keys)
+
+    def _work(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.exception('Writing submissions to the corpus store failed')
+
+    def start(self):
+        """Start this process's flush thread if it is not running yet"""
+        with self.lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._work, name='corpus-ingest', daemon=True)
+            self._thread.start()
+
+    def stats(self):
+        with self.lock:
+            pending = len(self._pending)
+        return {
+            'pending': pending,
+            'written': self.written,
+            'dropped': self.dropped,
+            'merges': self.merges,
+            'last_error': self.last_error
+        }
+
+    @classmethod
+    def from_environ(cls, path, prefix='INGEST'):
+        """Build an ingestor for path when <prefix>_SUBMISSIONS is set, else return None
+
+        Reads <prefix>_FLUSH_INTERVAL, <prefix>_MAX_PENDING, <prefix>_MERGE_FACTOR
+        and <prefix>_N_FEATURES (for the store created when none exists yet).
+        """
+        if os.environ.get(f'{prefix}_SUBMISSIONS', '').lower() not in ('1', 'true', 'yes'):
+            return None
+        n_features = os.environ.get(f'{prefix}_N_FEATURES')
+        cls.ensure_store(path, {**DEFAULT_VECTORIZER, 'n_features': int(n_features)} if n_features else None)
+        return cls(
+            path,
+            flush_interval=float(os.environ.get(f'{prefix}_FLUSH_INTERVAL', 2.0)),
+            max_pending=int(os.environ.get(f'{prefix}_MAX_PENDING', 10000)),
+            merge_factor=int(os.environ.get(f'{prefix}_MERGE_FACTOR', 4))
+        )
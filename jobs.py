@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import tempfile
+import threading
+
+STATUSES = ('queued', 'running', 'done', 'failed')
+
+
+class JobQueue:
+    """Background jobs persisted in a local SQLite file, with no external broker
+
+    Handlers are registered per job type and called as handler(payload, progress),
+    where progress(fraction) records how far the job has got. Because the queue
+    lives in one SQLite file, every worker process on the host can submit,
+    claim and report on the same jobs. Each process starts its worker threads
+    with start() (the app does so when a worker boots and on its first request),
+    never inheriting them across a fork, so jobs queued by a process that has
+    since exited are picked up by the others.
+    """
+
+    def __init__(self, path=None, workers=1, stale_after=600, keep_for=86400, poll_interval=0.5):
+        self.path = path or os.path.join(tempfile.gettempdir(), 'plagiarism_jobs.sqlite3')
+        self.workers = workers
+        self.stale_after = stale_after
+        self.keep_for = keep_for
+        self.poll_interval = poll_interval
+        self.handlers = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self._local = threading.local()
+        self._threads = []
+        self._pid = None
+
+    @property
+    def connection(self):
+        # One connection per thread, reopened after a fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, '
+                'status TEXT NOT NULL, progress REAL NOT NULL DEFAULT 0, '
+                'result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, '
+                'created REAL NOT NULL, updated REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def register(self, kind, handler):
+        self.handlers[kind] = handler
+
+    def submit(self, kind, payload):
+        """Queue a job and return its id"""
+        if kind not in self.handlers:
+            raise ValueError(f'Unknown job type: {kind}')
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        db = self.connection
+        db.execute(
+            'INSERT INTO jobs (id, kind, payload, status, created, updated) VALUES (?, ?, ?, ?, ?, ?)',
+            (job_id, kind, json.dumps(payload), 'queued', now, now)
+        )
+        db.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated < ?",
+            (now - self.keep_for,)
+        )
+        self.start()
+        self.wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        """Status, progress and (when finished) result or error of a job, or None"""
+        row = self.connection.execute(
+            'SELECT id, kind, status, progress, result, error, created, updated FROM jobs WHERE id = ?',
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = {
+            'job_id': row[0],
+            'type': row[1],
+            'status': row[2],
+            'progress': round(row[3], 3),
+            'created': row[6],
+            'updated': row[7]
+        }
+        if row[2] == 'done':
+            job['result'] = json.loads(row[4])
+        elif row[2] == 'failed':
+            job['error'] = row[5]
+        return job
+
+    def claim(self):
+        """Atomically take the oldest queued (or abandoned running) job"""
+        now = time.time()
+        db = self.connection
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute(
+                "SELECT id, kind, payload FROM jobs WHERE status = 'queued' "
+                "OR (status = 'running' AND updated < ?) ORDER BY created LIMIT 1",
+                (now - self.stale_after,)
+            ).fetchone()
+            if row is not None:
+                db.execute(
+                    "UPDATE jobs SET status = 'running', progress = 0, attempts = attempts + 1, updated = ? "
+                    "WHERE id = ?",
+                    (now, row[0])
+                )
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        return row
+
+    def run_next(self):
+        """Claim and run one job; returns False when the queue is empty"""
+        row = self.claim()
+        if row is None:
+            return False
+        job_id, kind, payload = row
+        db = self.connection
+
+        def progress(fraction):
+            db.execute(
+                'UPDATE jobs SET progress = ?, updated = ? WHERE id = ?',
+                (min(max(fraction, 0.0), 1.0), time.time(), job_id)
+            )
+
+        try:
+            result = self.handlers[kind](json.loads(payload), progress)
+        except Exception as e:
+            db.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated = ? WHERE id = ?",
+                (str(e), time.time(), job_id)
+            )
+        else:
+            db.execute(
+                "UPDATE jobs SET status = 'done', progress = 1, result = ?, updated = ? WHERE id = ?",
+                (json.dumps(result), time.time(), job_id)
+            )
+        return True
+
+    def _work(self):
+        while True:
+            self.wakeup.clear()
+            if not self.run_next():
+                self.wakeup.wait(self.poll_interval)
+
+    def start(self):
+        """Start this process's worker threads if they are not running yet"""
+        if self._pid == os.getpid():
+            return
+        with self.lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._threads = [
+                threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stats(self):
+        rows = self.connection.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(rows)
+        return counts
+
+    @classmethod
+    def from_environ(cls, prefix='JOB_QUEUE'):
+        """Build a queue from <prefix>_PATH, <prefix>_WORKERS and <prefix>_STALE_AFTER"""
+        return cls(
+            path=os.environ.get(f'{prefix}_PATH'),
+            workers=int(os.environ.get(f'{prefix}_WORKERS', 1)),
+            stale_after=float(os.environ.get(f'{prefix}_STALE_AFTER', 600))
+        )
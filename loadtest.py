@@ -0,0 +1,173 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlsplit
+from benchmark import generate_text, parse_size, percentile
+from measure_startup import git_revision
+
+DEFAULT_MODES = 'sync,threaded'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode, port, startup_timeout=120):
+    """gunicorn with the repo's gunicorn.conf.py in one SERVING_MODE, once /health answers"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    env = {**os.environ, 'SERVING_MODE': mode}
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', 'app:app'],
+        cwd=root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn ({mode}) exited with status {process.returncode}')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError(f'gunicorn ({mode}) did not answer /health within {startup_timeout}s')
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def make_body(route, texts, i):
+    # A different text per request, so the result cache never answers for the server
+    text = f'{texts[i % len(texts)]} Submission {i}.'
+    if route == '/rephrase':
+        return {'text': text, 'seed': i}
+    if route == '/align':
+        return {'first': text, 'second': texts[(i + 1) % len(texts)]}
+    return {'text': text}
+
+
+def run_load(url, route, texts, concurrency, duration, warmup, timeout):
+    """Closed-loop load: concurrency clients each send their next request as soon as one returns"""
+    parts = urlsplit(url)
+    counter = iter(range(sys.maxsize))
+    lock = threading.Lock()
+    samples = []
+    statuses = {}
+    started = time.monotonic()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    def client():
+        connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+        while True:
+            with lock:
+                i = next(counter)
+            body = json.dumps(make_body(route, texts, i))
+            sent = time.monotonic()
+            if sent >= stop_at:
+                break
+            try:
+                connection.request('POST', route, body, {'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+                status = 'error'
+            finished = time.monotonic()
+            if sent >= measure_from and finished <= stop_at:
+                with lock:
+                    statuses[status] = statuses.get(status, 0) + 1
+                    if status == 200:
+                        samples.append(finished - sent)
+        connection.close()
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    samples.sort()
+    total = sum(statuses.values())
+    return {
+        'requests': total,
+        'ok': len(samples),
+        'statuses': {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        'requests_per_second': round(len(samples) / duration, 2),
+        'p50_ms': round(percentile(samples, 0.5) * 1000, 1) if samples else None,
+        'p90_ms': round(percentile(samples, 0.9) * 1000, 1) if samples else None,
+        'p99_ms': round(percentile(samples, 0.99) * 1000, 1) if samples else None,
+        'max_ms': round(samples[-1] * 1000, 1) if samples else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Load-test the app: requests/sec and tail latency per serving mode'
+    )
+    parser.add_argument('--url', help='test this running server instead of starting gunicorn per mode')
+    parser.add_argument('--modes', default=DEFAULT_MODES,
+                        help=f'SERVING_MODE values to start gunicorn with (default {DEFAULT_MODES})')
+    parser.add_argument('--route', default='/analyze', choices=['/analyze', '/rephrase', '/align'])
+    parser.add_argument('--size', default='5KB', help='size of each generated text')
+    parser.add_argument('--concurrency', type=int, default=16, help='simultaneous clients')
+    parser.add_argument('--duration', type=float, default=20.0, help='measured seconds per mode')
+    parser.add_argument('--warmup', type=float, default=3.0, help='seconds of load before measuring')
+    parser.add_argument('--timeout', type=float, default=60.0, help='client timeout per request')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the generated texts')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    size = parse_size(args.size)
+    texts = [generate_text(size, args.seed + i) for i in range(32)]
+    targets = [('external', args.url)] if args.url else [(mode, None) for mode in args.modes.split(',')]
+    results = {
+        'revision': git_revision(), 'route': args.route, 'size': args.size,
+        'concurrency': args.concurrency, 'duration': args.duration, 'runs': []
+    }
+
+    print(f"{'mode':<10} {'req/s':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}  statuses")
+    for mode, url in targets:
+        process = None
+        if url is None:
+            port = free_port()
+            process = start_server(mode, port)
+            url = f'http://127.0.0.1:{port}'
+        try:
+            run = {'mode': mode, **run_load(
+                url, args.route, texts, args.concurrency, args.duration, args.warmup, args.timeout
+            )}
+        finally:
+            if process is not None:
+                stop_server(process)
+        results['runs'].append(run)
+        print(
+            f"{mode:<10} {run['requests_per_second']:>8.2f} {run['p50_ms'] or 0:>9.1f} {run['p90_ms'] or 0:>9.1f} "
+            f"{run['p99_ms'] or 0:>9.1f} {run['max_ms'] or 0:>9.1f}  {run['statuses']}",
+            flush=True
+        )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
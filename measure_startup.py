@@ -0,0 +1,78 @@
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+# Runs in a fresh interpreter each time, so every sample is a true cold start
+PROBE = """
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+response = client.post('/analyze', json={'text': %r})
+assert response.status_code == 200, response.get_data(as_text=True)
+first_request = time.perf_counter()
+print(json.dumps({
+    'import_seconds': imported - started,
+    'app_startup_seconds': app.STARTUP_SECONDS,
+    'first_request_seconds': first_request - imported
+}))
+"""
+
+SAMPLE_TEXT = (
+    "Napoleon Bonaparte was a French military commander and political leader. "
+    "He rose to prominence during the French Revolution and led several successful campaigns. "
+    "According to historians, his legacy remains controversial to this day."
+)
+
+
+def measure(runs):
+    """Cold-start timings of `import app` and the first /analyze request"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE % SAMPLE_TEXT],
+            cwd=root, capture_output=True, text=True, check=True
+        ).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        sample['process_seconds'] = time.perf_counter() - started
+        samples.append(sample)
+    return {
+        name: {
+            'median': round(statistics.median(s[name] for s in samples), 4),
+            'max': round(max(s[name] for s in samples), 4)
+        }
+        for name in samples[0]
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure cold-start latency of the Flask app')
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters to start')
+    parser.add_argument('--output', help='append the result as one JSON line to this file')
+    args = parser.parse_args()
+
+    result = {'revision': git_revision(), 'python': sys.version.split()[0], 'runs': args.runs, **measure(args.runs)}
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(result) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+import random
+import threading
+import contextvars
+from functools import wraps
+from time import perf_counter
+
+# Latency buckets in seconds, and input-size buckets in bytes
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# StageTimings of the request being handled in this context, if any
+_current_timings = contextvars.ContextVar('stage_timings', default=None)
+
+
+class StageTimings:
+    """Exclusive wall time per named stage within one request
+
+    Stages nest: time spent in an inner stage (e.g. tokenization triggered
+    lazily inside a detector) is charged to the inner stage only.
+    """
+
+    def __init__(self):
+        self.seconds = {}
+        self._stack = []
+
+    def enter(self, name):
+        self._stack.append([name, perf_counter(), 0.0])
+
+    def exit(self):
+        name, started, children = self._stack.pop()
+        elapsed = perf_counter() - started
+        self.seconds[name] = self.seconds.get(name, 0.0) + elapsed - children
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def as_milliseconds(self):
+        return {name: round(seconds * 1000, 3) for name, seconds in self.seconds.items()}
+
+
+class collect_stages:
+    """Context manager that records every stage() run inside it into a new StageTimings"""
+
+    def __enter__(self):
+        self.timings = StageTimings()
+        self._token = _current_timings.set(self.timings)
+        return self.timings
+
+    def __exit__(self, *exc_info):
+        _current_timings.reset(self._token)
+
+
+def record_stages(seconds):
+    """Charge stage times measured elsewhere (e.g. in a worker process) to the current request"""
+    timings = _current_timings.get()
+    if timings is not None:
+        for name, elapsed in seconds.items():
+            timings.seconds[name] = timings.seconds.get(name, 0.0) + elapsed
+
+
+class stage:
+    """Time a block as a named stage of the current request; free when nothing collects"""
+
+    __slots__ = ('name', 'timings')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.timings = _current_timings.get()
+        if self.timings is not None:
+            self.timings.enter(self.name)
+
+    def __exit__(self, *exc_info):
+        if self.timings is not None:
+            self.timings.exit()
+
+
+def timed(name):
+    """Decorator form of stage()"""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """In-process counters, gauges and histograms rendered in the Prometheus text format
+
+    Every process keeps its own values, so with several gunicorn workers each
+    scrape of /metrics sees the worker that served it.
+    """
+
+    def __init__(self, namespace='plagiarism'):
+        self.namespace = namespace
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, kind, help_text, buckets=None):
+        """Declare a metric; kind is 'counter', 'gauge' or 'histogram'"""
+        self._metrics[name] = {'kind': kind, 'help': help_text, 'buckets': buckets, 'values': {}}
+
+    def inc(self, name, labels=None, value=1):
+        key = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            values = self._metrics[name]['values']
+            values[key] = values.get(key, 0) + value
+
+    def set(self, name, value, labels=None):
+        key = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            self._metrics[name]['values'][key] = value
+
+    def observe(self, name, value, labels=None):
+        key = tuple(sorted((labels or {}).items()))
+        with self._lock:
+            metric = self._metrics[name]
+            histogram = metric['values'].get(key)
+            if histogram is None:
+                histogram = metric['values'][key] = Histogram(metric['buckets'])
+            histogram.observe(value)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, metric in self._metrics.items():
+                full_name = f'{self.namespace}_{name}'
+                lines.append(f"# HELP {full_name} {metric['help']}")
+                lines.append(f"# TYPE {full_name} {metric['kind']}")
+                for labels, value in sorted(metric['values'].items()):
+                    if metric['kind'] != 'histogram':
+                        lines.append(f'{full_name}{_format_labels(labels)} {_format_value(value)}')
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(value.buckets, value.counts):
+                        cumulative += count
+                        lines.append(f"{full_name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{full_name}_bucket{_format_labels(labels, [('le', '+Inf')])} {value.count}")
+                    lines.append(f'{full_name}_sum{_format_labels(labels)} {_format_value(value.sum)}')
+                    lines.append(f'{full_name}_count{_format_labels(labels)} {value.count}')
+        return '\n'.join(lines) + '\n'
+
+
+class LogSampler:
+    """Decides which events get logged, so hot paths log a fraction of requests"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        # Separate from the generators that drive rephrasing, so sampling never changes results
+        self._random = random.Random()
+
+    def __call__(self):
+        return self.rate >= 1 or (self.rate > 0 and self._random.random() < self.rate)
@@ -0,0 +1,128 @@
+import re
+import zlib
+import pickle
+import numpy as np
+from collections import defaultdict
+
+# Mersenne prime used for the universal hash family (a * x + b) mod p
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+SHINGLE_BASE = np.uint64(1000003)
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def word_hashes(text):
+    """32-bit hash of every word in the text, lowercased"""
+    return np.fromiter(
+        (zlib.crc32(word.encode('utf-8')) for word in WORD_PATTERN.findall(text.lower())),
+        dtype=np.uint64
+    )
+
+
+def shingle_hashes(text, shingle_size=3):
+    """32-bit hashes of all overlapping word shingles, computed in one vectorized pass"""
+    words = word_hashes(text)
+    if len(words) == 0:
+        return words
+    if len(words) < shingle_size:
+        shingle_size = len(words)
+
+    count = len(words) - shingle_size + 1
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(shingle_size):
+        hashes = (hashes * SHINGLE_BASE + words[offset:offset + count]) & MAX_HASH
+    return np.unique(hashes)
+
+
+class MinHashIndex:
+    """MinHash signatures over word shingles with LSH banding for candidate lookup"""
+
+    def __init__(self, num_perm=128, bands=32, shingle_size=3, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.RandomState(seed)
+        # a, b < 2^32 so that a * h (h < 2^32) cannot overflow uint64
+        self.perm_a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.perm_b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+        self.signatures = {}
+        self.buckets = [defaultdict(set) for _ in range(bands)]
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def __contains__(self, key):
+        return key in self.signatures
+
+    def signature(self, text, chunk_size=4096):
+        """Compute the MinHash signature of a text"""
+        shingles = shingle_hashes(text, self.shingle_size)
+        signature = np.full(self.num_perm, MAX_HASH, dtype=np.uint64)
+        # Chunk the permutation matrix so very long documents stay in bounded memory
+        for start in range(0, len(shingles), chunk_size):
+            chunk = shingles[start:start + chunk_size]
+            permuted = (np.outer(self.perm_a, chunk) + self.perm_b[:, None]) % MERSENNE_PRIME & MAX_HASH
+            np.minimum(signature, permuted.min(axis=1), out=signature)
+        return signature
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def insert(self, key, text=None, signature=None):
+        """Add a document; re-inserting an existing key replaces it"""
+        if signature is None:
+            signature = self.signature(text)
+        if key in self.signatures:
+            self.remove(key)
+        self.signatures[key] = signature
+        for band, band_key in zip(self.buckets, self._band_keys(signature)):
+            band[band_key].add(key)
+        return signature
+
+    def remove(self, key):
+        """Remove a document from the index"""
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return False
+        for band, band_key in zip(self.buckets, self._band_keys(signature)):
+            bucket = band.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del band[band_key]
+        return True
+
+    def candidates(self, text=None, signature=None):
+        """Keys sharing at least one LSH band with the query"""
+        if signature is None:
+            signature = self.signature(text)
+        found = set()
+        for band, band_key in zip(self.buckets, self._band_keys(signature)):
+            found.update(band.get(band_key, ()))
+        return found
+
+    def query(self, text, threshold=0.0):
+        """Candidate keys with their estimated Jaccard similarity, best first"""
+        signature = self.signature(text)
+        results = []
+        for key in self.candidates(signature=signature):
+            estimate = float(np.mean(self.signatures[key] == signature))
+            if estimate >= threshold:
+                results.append((key, estimate))
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
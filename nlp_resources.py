@@ -0,0 +1,159 @@
+import os
+import pickle
+import importlib
+import threading
+
+# Pickled tokenizers and stopwords, built by download_nltk.py
+ARTIFACT_PATH = os.environ.get(
+    'NLTK_ARTIFACT',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nltk_artifact.pickle')
+)
+ARTIFACT_VERSION = 2
+
+# 'nltk' (Punkt + Treebank), or 'native' (tokenizer.py, no NLTK) as an opt-in
+# once compare_tokenizers.py --check passes on your own texts
+DEFAULT_TOKENIZER = os.environ.get('TOKENIZER', 'nltk')
+
+# Modules that are slow to import and only needed once a request arrives
+HEAVY_MODULES = (
+    'sklearn.feature_extraction.text',
+    'sklearn.metrics.pairwise',
+    'scipy.sparse',
+)
+
+_artifact = None
+_stopwords = None
+_tokenizers = None
+_lock = threading.RLock()
+
+
+def build_tokenizers():
+    """Punkt and Treebank tokenizers from the installed NLTK data
+
+    Raises LookupError when the data is missing; it is never downloaded at
+    runtime. Run download_nltk.py at build time instead.
+    """
+    from nltk.tokenize import NLTKWordTokenizer
+    try:
+        from nltk.tokenize.punkt import PunktTokenizer
+        sentence_tokenizer = PunktTokenizer('english')
+    except ImportError:
+        # NLTK < 3.9 ships Punkt as a pickle
+        import nltk
+        sentence_tokenizer = nltk.data.load('tokenizers/punkt/english.pickle')
+    return {'sentence_tokenizer': sentence_tokenizer, 'word_tokenizer': NLTKWordTokenizer()}
+
+
+def save_artifact(path=ARTIFACT_PATH):
+    from nltk.corpus import stopwords as nltk_stopwords
+    artifact = {
+        'version': ARTIFACT_VERSION,
+        # Plain strings, so reading the stopwords never imports NLTK
+        'stopwords': sorted(set(nltk_stopwords.words('english'))),
+        # Pickled separately and only unpickled when the NLTK tokenizer is used
+        'tokenizers': pickle.dumps(build_tokenizers(), protocol=pickle.HIGHEST_PROTOCOL)
+    }
+    with open(path, 'wb') as f:
+        pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return artifact
+
+
+def load_artifact():
+    """The artifact written by save_artifact, or None when it is missing or outdated"""
+    global _artifact
+    with _lock:
+        if _artifact is None:
+            artifact = {}
+            if os.path.exists(ARTIFACT_PATH):
+                with open(ARTIFACT_PATH, 'rb') as f:
+                    artifact = pickle.load(f)
+                if artifact.get('version') != ARTIFACT_VERSION:
+                    artifact = {}
+            _artifact = artifact
+    return _artifact or None
+
+
+def stopwords():
+    """English stopwords, from the artifact when present"""
+    global _stopwords
+    with _lock:
+        if _stopwords is None:
+            artifact = load_artifact()
+            if artifact is not None:
+                _stopwords = frozenset(artifact['stopwords'])
+            else:
+                from nltk.corpus import stopwords as nltk_stopwords
+                _stopwords = frozenset(nltk_stopwords.words('english'))
+    return _stopwords
+
+
+def tokenizers():
+    """NLTK's Punkt and Treebank tokenizers, loaded once per process"""
+    global _tokenizers
+    with _lock:
+        if _tokenizers is None:
+            artifact = load_artifact()
+            if artifact is not None:
+                _tokenizers = pickle.loads(artifact['tokenizers'])
+            else:
+                _tokenizers = build_tokenizers()
+    return _tokenizers
+
+
+def is_loaded():
+    return _stopwords is not None
+
+
+def preload():
+    """Load everything a request needs up front, e.g. in the gunicorn master before fork"""
+    stopwords()
+    if DEFAULT_TOKENIZER == 'nltk':
+        tokenizers()
+    for module in HEAVY_MODULES:
+        importlib.import_module(module)
+
+
+def sent_tokenize(text):
+    """Same sentences as nltk.sent_tokenize(text)"""
+    return tokenizers()['sentence_tokenizer'].tokenize(text)
+
+
+def word_tokenize(text, preserve_line=False):
+    """Same tokens as nltk.word_tokenize(text, preserve_line=preserve_line)"""
+    tokenizer = tokenizers()['word_tokenizer']
+    sentences = [text] if preserve_line else sent_tokenize(text)
+    return [token for sentence in sentences for token in tokenizer.tokenize(sentence)]
+
+
+class NLTKTokenizer:
+    """NLTK's Punkt and Treebank tokenizers behind the NativeTokenizer interface"""
+
+    name = 'nltk'
+
+    def sent_tokenize(self, text):
+        return sent_tokenize(text)
+
+    def word_tokenize(self, text, preserve_line=False):
+        return word_tokenize(text, preserve_line)
+
+    def sentence_spans(self, text):
+        """(start, end) of every Punkt sentence"""
+        return list(tokenizers()['sentence_tokenizer'].span_tokenize(text))
+
+    def word_spans(self, text, start=0, end=None):
+        """(start, end) of every Treebank token in text[start:end], taken as one sentence"""
+        if end is None:
+            end = len(text)
+        tokenizer = tokenizers()['word_tokenizer']
+        return [(start + token_start, start + token_end) for token_start, token_end in tokenizer.span_tokenize(text[start:end])]
+
+
+def get_tokenizer(name=None):
+    """The tokenizer called name, or DEFAULT_TOKENIZER"""
+    name = name or DEFAULT_TOKENIZER
+    if name == 'native':
+        from tokenizer import native_tokenizer
+        return native_tokenizer
+    if name == 'nltk':
+        return NLTKTokenizer()
+    raise ValueError(f"Unknown tokenizer: {name}")
@@ -0,0 +1,144 @@
+import re
+from collections import deque
+
+
+class PatternFamily:
+    """A list of detector regexes compiled once and scanned together
+
+    In 'all' mode every match of every pattern is collected; in 'first' mode
+    only the first match of each pattern is looked for. Patterns are kept as
+    separate compiled objects rather than fused into one alternation: CPython's
+    re tries every branch at every position, and the fused form measured
+    slower than scanning each pattern on its own.
+    """
+
+    def __init__(self, name, patterns, flags=re.IGNORECASE, mode='all'):
+        self.name = name
+        self.patterns = list(patterns)
+        self.flags = flags
+        self.mode = mode
+        self.compiled = [re.compile(pattern, flags) for pattern in self.patterns]
+
+    def __contains__(self, pattern):
+        return pattern in self.patterns
+
+    def findall(self, text):
+        """Every match of every pattern, as {pattern: [matched text, ...]}"""
+        return {
+            pattern: [match.group() for match in compiled.finditer(text)]
+            for pattern, compiled in zip(self.patterns, self.compiled)
+        }
+
+    def first(self, text):
+        """The first match of each pattern (or None), as {pattern: matched text}"""
+        result = {}
+        for pattern, compiled in zip(self.patterns, self.compiled):
+            match = compiled.search(text)
+            result[pattern] = match.group() if match else None
+        return result
+
+    def findall_spans(self, text):
+        """Yield (pattern index, start, matched text) for every match, pattern by pattern"""
+        for i, compiled in enumerate(self.compiled):
+            for match in compiled.finditer(text):
+                yield i, match.start(), match.group()
+
+
+class PhraseAutomaton:
+    """Aho-Corasick automaton counting many literal phrases in one pass
+
+    Counts follow str.count semantics: occurrences of the same phrase never
+    overlap, while different phrases are counted independently.
+    """
+
+    def __init__(self, phrases):
+        self.phrases = list(phrases)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        for index, phrase in enumerate(self.phrases):
+            state = 0
+            for char in phrase:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].append(index)
+
+        # Breadth-first construction of failure links
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def iter_matches(self, text):
+        """Yield (phrase index, end offset) for every occurrence, overlapping included"""
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in output[state]:
+                yield index, position + 1
+
+    def count(self, text):
+        """Occurrences of each phrase, as {phrase: count}"""
+        counts = [0] * len(self.phrases)
+        last_end = [0] * len(self.phrases)
+        for index, end in self.iter_matches(text):
+            if end - len(self.phrases[index]) >= last_end[index]:
+                counts[index] += 1
+                last_end[index] = end
+        return dict(zip(self.phrases, counts))
+
+
+class PhraseCounter:
+    """Counts literal phrases, choosing the fastest strategy for the phrase list size
+
+    str.count runs in C, so for a few dozen phrases one call per phrase beats
+    a pure-Python automaton pass. The Aho-Corasick automaton takes over once
+    the phrase list is large enough that scanning the text once wins.
+    """
+
+    AUTOMATON_MIN_PHRASES = 256
+
+    def __init__(self, phrases):
+        self.phrases = list(phrases)
+        self._phrase_set = set(self.phrases)
+        self.automaton = None
+        if len(self.phrases) >= self.AUTOMATON_MIN_PHRASES:
+            self.automaton = PhraseAutomaton(self.phrases)
+
+    def __contains__(self, phrase):
+        return phrase in self._phrase_set
+
+    def count(self, text):
+        """Occurrences of each phrase, as {phrase: count}"""
+        if self.automaton is not None:
+            return self.automaton.count(text)
+        return {phrase: text.count(phrase) for phrase in self.phrases}
+
+
+class PatternScanner:
+    """All detector pattern families plus the phrase counter"""
+
+    def __init__(self, families, phrases=()):
+        self.families = list(families)
+        self.phrases = PhraseCounter(phrases)
+        self._family_of = {}
+        for family in self.families:
+            for pattern in family.patterns:
+                self._family_of.setdefault((pattern, family.flags), family)
+
+    def family_of(self, pattern, flags=re.IGNORECASE):
+        return self._family_of.get((pattern, flags))
@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import argparse
+import numpy as np
+from cache import make_key
+
+# Slots of the feature vector, in order; extract_features fills one row per text
+FEATURES = (
+    'unique_ratio', 'suspicious_count', 'structure_issues', 'common_phrases', 'top_word_share',
+    'token_count', 'sentence_count', 'sentence_length_variance', 'wiki_indicators',
+    'historical_indicators', 'formal_indicators', 'best_source_similarity'
+)
+SLOTS = {name: slot for slot, name in enumerate(FEATURES)}
+OPERATORS = ('<', '<=', '>', '>=')
+
+# The hand-written risk rules as a model: points per unit of a feature, and
+# points added when a feature crosses a threshold. Steps on the same feature
+# add up, e.g. more than 5, 10 and 15 historical indicators give 10, 15 and 25.
+DEFAULT_MODEL = {
+    'linear': {'suspicious_count': 20, 'structure_issues': 15, 'wiki_indicators': 8},
+    'steps': [
+        # Repetitive vocabulary
+        ['unique_ratio', '<', 0.7, 5], ['unique_ratio', '<', 0.5, 10], ['unique_ratio', '<', 0.3, 10],
+        # Overuse of common academic phrases
+        ['common_phrases', '>', 3, 10], ['common_phrases', '>', 5, 5], ['common_phrases', '>', 8, 10],
+        # One word dominating the text
+        ['top_word_share', '>', 0.1, 15],
+        # Very short text
+        ['token_count', '<', 20, 10],
+        # Inconsistent sentence lengths
+        ['sentence_length_variance', '>', 100, 10],
+        # Historical/biographical content, often copied from references
+        ['historical_indicators', '>', 5, 10], ['historical_indicators', '>', 10, 5],
+        ['historical_indicators', '>', 15, 10],
+        # Formal, encyclopedic style
+        ['formal_indicators', '>', 1, 8], ['formal_indicators', '>', 3, 7],
+        # Direct overlap with a known reference source
+        ['best_source_similarity', '>=', 30, 10], ['best_source_similarity', '>=', 50, 15],
+        ['best_source_similarity', '>=', 80, 15],
+    ],
+    'max_score': 100
+}
+
+
+def feature_vector(**values):
+    """Feature vector with the named slots set and every other slot 0"""
+    vector = np.zeros(len(FEATURES))
+    for name, value in values.items():
+        vector[SLOTS[name]] = value
+    return vector
+
+
+class ScoringModel:
+    """Risk score as a linear function of the feature vector and its threshold indicators
+
+    score = min(X @ linear + steps(X) @ step_weights, max_score), where each
+    column of steps(X) is 1 when a feature crosses one threshold. A whole
+    feature matrix (one row per text) is scored at once. The weights are
+    plain data: save them with to_dict, refit them on labeled texts with
+    fit, and load them with SCORING_MODEL, without changing any code.
+    """
+
+    def __init__(self, linear=None, steps=(), max_score=100):
+        self.linear = feature_vector(**(linear or {}))
+        # Kept apart from the weights, so a weight fitted to 0 can be fitted again
+        self.linear_slots = np.array(sorted(SLOTS[name] for name in linear or {}), dtype=np.int64)
+        for name, operator, threshold, weight in steps:
+            if name not in SLOTS or operator not in OPERATORS:
+                raise ValueError(f'Invalid scoring step: {name} {operator} {threshold}')
+        self.step_slots = np.array([SLOTS[step[0]] for step in steps], dtype=np.int64)
+        self.step_operators = np.array([OPERATORS.index(step[1]) for step in steps], dtype=np.int64)
+        self.step_thresholds = np.array([step[2] for step in steps], dtype=np.float64)
+        self.step_weights = np.array([step[3] for step in steps], dtype=np.float64)
+        self.max_score = max_score
+
+    def indicators(self, features):
+        """0/1 matrix with a column per step: whether each text's feature crosses that step's threshold"""
+        values = features[:, self.step_slots]
+        thresholds = self.step_thresholds
+        crossed = np.stack([values < thresholds, values <= thresholds, values > thresholds, values >= thresholds])
+        return np.take_along_axis(crossed, self.step_operators[None, None, :], axis=0)[0].astype(np.float64)
+
+    def score(self, features):
+        """Scores of a feature matrix, or the score of a single feature vector"""
+        features = np.asarray(features, dtype=np.float64)
+        matrix = np.atleast_2d(features)
+        scores = matrix @ self.linear + self.indicators(matrix) @ self.step_weights
+        scores = np.minimum(scores, self.max_score)
+        return scores if features.ndim == 2 else scores[0]
+
+    def fit(self, features, targets):
+        """Refit the weights (non-negative, same slots and thresholds) to target scores by least squares"""
+        from scipy.optimize import nnls
+        features = np.atleast_2d(np.asarray(features, dtype=np.float64))
+        linear_slots = self.linear_slots
+        design = np.hstack([features[:, linear_slots], self.indicators(features)])
+        weights, _ = nnls(design, np.asarray(targets, dtype=np.float64))
+        self.linear = np.zeros(len(FEATURES))
+        self.linear[linear_slots] = weights[:len(linear_slots)]
+        self.step_weights = weights[len(linear_slots):]
+        return self
+
+    def to_dict(self):
+        return {
+            'linear': {FEATURES[slot]: float(self.linear[slot]) for slot in self.linear_slots},
+            'steps': [
+                [FEATURES[slot], OPERATORS[operator], float(threshold), float(weight)]
+                for slot, operator, threshold, weight in zip(
+                    self.step_slots, self.step_operators, self.step_thresholds, self.step_weights
+                )
+            ],
+            'max_score': self.max_score
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('linear'), data.get('steps', ()), data.get('max_score', 100))
+
+    def config_key(self):
+        return make_key(self.to_dict())
+
+    @classmethod
+    def from_environ(cls, variable='SCORING_MODEL'):
+        """The model saved at the path in SCORING_MODEL, or the built-in weights"""
+        path = os.environ.get(variable)
+        if not path:
+            return cls.from_dict(DEFAULT_MODEL)
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fit the risk score weights to labeled texts')
+    parser.add_argument('labeled', help='JSON lines of {"text": ..., "score": 0-100}')
+    parser.add_argument('--output', required=True, help='write the fitted model as JSON to this file')
+    parser.add_argument('--tier', help='detector tier to extract the features with (default DETECTOR_TIER)')
+    parser.add_argument('--corpus', help='reference corpus index, so source similarity is a feature as in the app')
+    args = parser.parse_args()
+
+    from engine import PlagiarismDetector
+    with open(args.labeled, encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    detector = PlagiarismDetector(tier=args.tier)
+    if args.corpus:
+        detector.load_corpus(args.corpus)
+    features = np.array([detector.extract_features(row['text']) for row in rows])
+    targets = np.array([row['score'] for row in rows], dtype=np.float64)
+
+    model = detector.scoring_model
+    before = np.abs(model.score(features) - targets).mean()
+    model.fit(features, targets)
+    after = np.abs(model.score(features) - targets).mean()
+    print(f'{len(rows)} texts, mean absolute error {before:.2f} -> {after:.2f}', file=sys.stderr)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(model.to_dict(), f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
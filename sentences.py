@@ -0,0 +1,241 @@
+import os
+import json
+import pickle
+import argparse
+import numpy as np
+import nlp_resources
+from cache import make_key
+from corpus import read_documents
+from corpus_store import encode_strings, load_array, save_array
+
+META_FILE = 'meta.json'
+VECTORIZER_FILE = 'vectorizer.pkl'
+DOCUMENTS_FILE = 'documents.json'
+INDEX_ARRAYS = (
+    'projection', 'centroids', 'list_offsets', 'vectors', 'tfidf_data', 'tfidf_indices', 'tfidf_indptr',
+    'rows', 'starts', 'ends', 'sentences', 'sentence_offsets'
+)
+
+# Sentences with fewer words say too little to be a paraphrase of anything
+MIN_WORDS = 6
+
+
+def sentence_spans(text, tokenizer, min_words=MIN_WORDS):
+    """(start, end) of every sentence of text with at least min_words whitespace-separated words"""
+    return [(start, end) for start, end in tokenizer.sentence_spans(text) if len(text[start:end].split()) >= min_words]
+
+
+def normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceIndex:
+    """LSA vectors of every reference sentence in an inverted-file (IVF) index
+
+    Sentences are embedded by TF-IDF followed by a truncated SVD, which maps
+    words that occur in the same contexts close together, so a sentence with
+    words replaced, dropped or reordered still lands near its source. Vectors
+    are L2-normalized and grouped by their nearest k-means centroid; a query
+    scans only the lists of its n_probe nearest centroids (or every vector,
+    below EXACT_SEARCH_MAX_SENTENCES) for its `candidates` nearest sentences.
+    LSA alone also rates sentences that merely share a topic as close, so
+    candidates are ranked by the mean of their LSA and TF-IDF cosines. All
+    arrays are memory-mapped, like CorpusStore. Built with the CLI below.
+    """
+
+    # Below this size one matrix product over every vector is cheaper than probing lists
+    EXACT_SEARCH_MAX_SENTENCES = 5000
+
+    def __init__(self, path, n_probe=16, candidates=10):
+        from scipy import sparse
+        self.path = path
+        self.n_probe = n_probe
+        self.candidates = candidates
+        with open(os.path.join(path, META_FILE), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        with open(os.path.join(path, VECTORIZER_FILE), 'rb') as f:
+            self.vectorizer = pickle.load(f)
+        with open(os.path.join(path, DOCUMENTS_FILE), encoding='utf-8') as f:
+            self.documents = json.load(f)
+        for name in INDEX_ARRAYS:
+            setattr(self, name, load_array(os.path.join(path, f'{name}.npy')))
+        self.tfidf = sparse.csr_matrix(
+            (self.tfidf_data, self.tfidf_indices, self.tfidf_indptr),
+            shape=(len(self.tfidf_indptr) - 1, len(self.vectorizer.vocabulary_)), copy=False
+        )
+
+    def __len__(self):
+        return len(self.rows)
+
+    def config_key(self):
+        return self.meta['id']
+
+    def embed(self, tfidf):
+        """Normalized LSA vectors of TF-IDF rows"""
+        return normalize(np.asarray(tfidf @ self.projection, dtype=np.float32))
+
+    def sentence(self, position):
+        start, end = self.sentence_offsets[position], self.sentence_offsets[position + 1]
+        return self.sentences[start:end].tobytes().decode('utf-8')
+
+    def search(self, queries, k):
+        """Positions and LSA cosines of the (approximately) k nearest indexed sentences to each query vector
+
+        Slots a query's probed lists could not fill (they hold fewer than k
+        sentences) have position -1 and similarity -1.
+        """
+        k = min(k, len(self))
+        if len(self) <= self.EXACT_SEARCH_MAX_SENTENCES:
+            scores = queries @ np.asarray(self.vectors).T
+            positions = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            return positions, np.take_along_axis(scores, positions, axis=1)
+
+        n_probe = min(self.n_probe, len(self.centroids))
+        probed = np.argpartition(-(queries @ np.asarray(self.centroids).T), n_probe - 1, axis=1)[:, :n_probe]
+        positions = np.full((len(queries), k), -1, dtype=np.int64)
+        similarities = np.full((len(queries), k), -1.0, dtype=np.float32)
+        for list_id in np.unique(probed).tolist():
+            start, end = int(self.list_offsets[list_id]), int(self.list_offsets[list_id + 1])
+            if start == end:
+                continue
+            # Each list is a contiguous block of vectors: one product scores every query probing it
+            members = np.flatnonzero((probed == list_id).any(axis=1))
+            scores = queries[members] @ np.asarray(self.vectors[start:end]).T
+            best = np.argpartition(-scores, min(k, end - start) - 1, axis=1)[:, :k]
+            merged_scores = np.hstack([similarities[members], np.take_along_axis(scores, best, axis=1)])
+            merged_positions = np.hstack([positions[members], best + start])
+            keep = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+            similarities[members] = np.take_along_axis(merged_scores, keep, axis=1)
+            positions[members] = np.take_along_axis(merged_positions, keep, axis=1)
+        return positions, similarities
+
+    def query(self, text, tokenizer, min_similarity=0.65, max_results=100):
+        """Sentences of text whose closest reference sentence is at least min_similarity alike"""
+        spans = sentence_spans(text, tokenizer, self.meta['min_words'])
+        if not spans or not len(self):
+            return []
+
+        # float32 like the stored arrays, so scipy never upcasts (copies) the mapped projection
+        tfidf = self.vectorizer.transform([text[start:end] for start, end in spans]).astype(np.float32)
+        positions, semantic = self.search(self.embed(tfidf), self.candidates)
+        # Word overlap of each query with each of its candidates, from the stored TF-IDF rows
+        queries = np.repeat(np.arange(len(spans)), positions.shape[1])
+        found = positions >= 0
+        lexical = np.asarray(
+            self.tfidf[np.where(found, positions, 0).ravel()].multiply(tfidf[queries]).sum(axis=1)
+        ).reshape(positions.shape)
+        lexical[~found] = 0
+        # Unfilled search slots must never be picked, whatever sentence row 0 holds
+        combined = np.where(found, (np.maximum(semantic, 0) + lexical) / 2, -np.inf)
+        best = combined.argmax(axis=1)
+
+        results = []
+        for i, ((start, end), column) in enumerate(zip(spans, best.tolist())):
+            similarity = float(combined[i, column])
+            if similarity < min_similarity:
+                continue
+            position = int(positions[i, column])
+            results.append({
+                'start': start,
+                'end': end,
+                'similarity': round(min(similarity, 1.0) * 100, 1),
+                'semantic_similarity': round(min(float(semantic[i, column]), 1.0) * 100, 1),
+                'lexical_similarity': round(min(float(lexical[i, column]), 1.0) * 100, 1),
+                'source': self.documents[int(self.rows[position])],
+                'source_sentence': self.sentence(position),
+                'source_start': int(self.starts[position]),
+                'source_end': int(self.ends[position])
+            })
+        return results[:max_results]
+
+    @staticmethod
+    def build(path, texts, documents, tokenizer, dimensions=300, max_features=50000, min_words=MIN_WORDS):
+        """Split texts into sentences, fit the LSA model and the IVF lists on them, and write the index"""
+        from sklearn.cluster import KMeans
+        from sklearn.decomposition import TruncatedSVD
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        rows, starts, ends, sentences = [], [], [], []
+        for row, text in enumerate(texts):
+            for start, end in sentence_spans(text, tokenizer, min_words):
+                rows.append(row)
+                starts.append(start)
+                ends.append(end)
+                sentences.append(text[start:end])
+        if len(sentences) < 2:
+            raise ValueError('The reference documents hold too few sentences to index')
+
+        # Unigrams: synonyms and reordering break most n-grams of a paraphrase
+        vectorizer = TfidfVectorizer(stop_words='english', sublinear_tf=True, max_features=max_features)
+        tfidf = vectorizer.fit_transform(sentences).astype(np.float32)
+        dimensions = max(1, min(dimensions, tfidf.shape[1] - 1, len(sentences) - 1))
+        svd = TruncatedSVD(n_components=dimensions, random_state=0)
+        vectors = normalize(svd.fit_transform(tfidf)).astype(np.float32)
+
+        lists = max(1, int(np.sqrt(len(sentences))))
+        # Centroids from a sample of up to 256 vectors per list; mini-batch k-means
+        # piles most sentences into one list here, which makes every probe a full scan
+        sample = np.random.default_rng(0).permutation(len(vectors))[:256 * lists]
+        kmeans = KMeans(n_clusters=lists, random_state=0, n_init=1).fit(vectors[sample])
+        labels = kmeans.predict(vectors)
+        order = np.argsort(labels, kind='stable')
+        list_offsets = np.zeros(lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=lists), out=list_offsets[1:])
+
+        os.makedirs(path, exist_ok=True)
+        encoded, offsets = encode_strings(sentences[i] for i in order)
+        tfidf = tfidf[order]
+        arrays = {
+            # Stored transposed (terms x dimensions), so projecting a query reads it row by row
+            'projection': np.ascontiguousarray(svd.components_.T, dtype=np.float32),
+            'centroids': normalize(kmeans.cluster_centers_).astype(np.float32),
+            'list_offsets': list_offsets,
+            'vectors': vectors[order],
+            'tfidf_data': tfidf.data,
+            'tfidf_indices': tfidf.indices,
+            'tfidf_indptr': tfidf.indptr,
+            'rows': np.asarray(rows, dtype=np.int64)[order],
+            'starts': np.asarray(starts, dtype=np.int64)[order],
+            'ends': np.asarray(ends, dtype=np.int64)[order],
+            'sentences': encoded,
+            'sentence_offsets': offsets
+        }
+        for name, array in arrays.items():
+            save_array(path, name, array)
+        with open(os.path.join(path, VECTORIZER_FILE), 'wb') as f:
+            pickle.dump(vectorizer, f)
+        with open(os.path.join(path, DOCUMENTS_FILE), 'w', encoding='utf-8') as f:
+            json.dump(documents, f)
+        meta = {
+            'id': make_key(documents, dimensions, max_features, min_words, tokenizer.name, len(sentences)),
+            'sentences': len(sentences), 'documents': len(documents), 'dimensions': dimensions,
+            'lists': lists, 'min_words': min_words, 'tokenizer': tokenizer.name,
+            'explained_variance': round(float(svd.explained_variance_ratio_.sum()), 4)
+        }
+        with open(os.path.join(path, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        return meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the sentence-level paraphrase index of the reference documents')
+    parser.add_argument('source', help='directory of reference .txt/.md documents')
+    parser.add_argument('output', help='directory to write the index to')
+    parser.add_argument('--dimensions', type=int, default=300, help='LSA dimensions of each sentence vector')
+    parser.add_argument('--max-features', type=int, default=50000, help='vocabulary size of the TF-IDF step')
+    args = parser.parse_args()
+
+    texts, documents = read_documents(args.source)
+    meta = SentenceIndex.build(
+        args.output, texts, documents, nlp_resources.get_tokenizer(),
+        dimensions=args.dimensions, max_features=args.max_features
+    )
+    print(
+        f"Indexed {meta['sentences']} sentences of {meta['documents']} documents into {args.output} "
+        f"({meta['dimensions']} dimensions, {meta['lists']} lists, {meta['explained_variance']:.0%} of variance)"
+    )
+
+
+if __name__ == '__main__':
+    main()
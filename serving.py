@@ -0,0 +1,158 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from metrics import collect_stages, record_stages
+
+
+class Overloaded(Exception):
+    """The executor could not take a task, or the task did not finish in time
+
+    status is the HTTP status to answer with: 503 when every slot stayed
+    taken for queue_timeout, 504 when the task ran past task_timeout.
+    """
+
+    def __init__(self, message, status, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def _run(function, args, kwargs):
+    """Run a task in a pool process; returns its result and the stage times it recorded"""
+    with collect_stages() as timings:
+        result = function(*args, **kwargs)
+    return result, timings.seconds
+
+
+def _ready():
+    return os.getpid()
+
+
+class WorkExecutor:
+    """Bounded process pool for the CPU-bound work of request threads
+
+    With a threaded server, request threads only parse, validate and hit the
+    caches, while detector and rephraser calls run in pool processes forked
+    from the web worker. They share its preloaded state copy-on-write and are
+    not serialized by the GIL. At most workers + max_queue tasks are admitted:
+    a request waits up to queue_timeout for a slot before Overloaded (503),
+    and one whose task runs past task_timeout gets Overloaded (504) while
+    the task finishes in the background, still holding its slot. Tasks are
+    pickled, so functions must be module-level and arguments small.
+    """
+
+    def __init__(self, workers=None, max_queue=None, queue_timeout=1.0, task_timeout=30.0):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = self.workers * 4 if max_queue is None else max_queue
+        self.queue_timeout = queue_timeout
+        self.task_timeout = task_timeout
+        self.lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self._executor = None
+        self._pid = None
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def executor(self):
+        with self.lock:
+            # A pool inherited through fork belongs to the parent; each process starts its own
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+                self._executor = None
+                self.in_flight = 0
+            if self._executor is None:
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            return self._executor
+
+    def start(self):
+        """Fork every pool process now, e.g. when a web worker boots, instead of on the first request"""
+        executor = self.executor
+        for future in [executor.submit(_ready) for _ in range(self.workers)]:
+            future.result()
+
+    def _release(self, slots):
+        with self.lock:
+            self.in_flight -= 1
+            self.completed += 1
+        slots.release()
+
+    def run(self, function, *args, **kwargs):
+        """function(*args, **kwargs) in a pool process, with its stage times charged to this request"""
+        executor = self.executor
+        slots = self._slots
+        if not slots.acquire(timeout=self.queue_timeout):
+            with self.lock:
+                self.rejected += 1
+            raise Overloaded('The server is busy, please try again shortly', 503,
+                             retry_after=max(1, round(self.task_timeout / 10)))
+        with self.lock:
+            self.in_flight += 1
+        try:
+            future = executor.submit(_run, function, args, kwargs)
+        except BaseException:
+            with self.lock:
+                self.in_flight -= 1
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: self._release(slots))
+
+        try:
+            result, seconds = future.result(timeout=self.task_timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self.lock:
+                self.timed_out += 1
+            raise Overloaded(f'The request did not finish within {self.task_timeout:g} seconds', 504)
+        except BrokenProcessPool:
+            # A pool process died (e.g. out of memory); the next task gets a fresh pool
+            with self.lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
+        record_stages(seconds)
+        return result
+
+    def stats(self):
+        with self.lock:
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'in_flight': self.in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out
+            }
+
+    def shutdown(self):
+        with self.lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    @classmethod
+    def from_environ(cls, prefix='EXECUTOR'):
+        """Build an executor from <prefix>_WORKERS etc., or return None to run work inline
+
+        <prefix>_WORKERS defaults to the CPU count with SERVING_MODE=threaded
+        and to 0 (no executor) otherwise. Also reads <prefix>_MAX_QUEUE,
+        <prefix>_QUEUE_TIMEOUT and <prefix>_TASK_TIMEOUT (seconds).
+        """
+        default_workers = (os.cpu_count() or 1) if os.environ.get('SERVING_MODE') == 'threaded' else 0
+        workers = int(os.environ.get(f'{prefix}_WORKERS', default_workers))
+        if workers <= 0:
+            return None
+        max_queue = os.environ.get(f'{prefix}_MAX_QUEUE')
+        return cls(
+            workers=workers,
+            max_queue=int(max_queue) if max_queue else None,
+            queue_timeout=float(os.environ.get(f'{prefix}_QUEUE_TIMEOUT', 1.0)),
+            task_timeout=float(os.environ.get(f'{prefix}_TASK_TIMEOUT', 30.0))
+        )
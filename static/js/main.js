@@ -48,6 +48,8 @@ function clearText() {
         updateWordCount();
         clearResults();
     }
+    // The next text is a new draft
+    paragraphHashes = new Map();
 }
 
 // Paste text function
@@ -64,23 +66,86 @@ async function pasteText() {
     }
 }
 
-// Analyze text function
-async function analyzeText() {
+// Inputs at least this long are sent through the background job queue
+// so slow analyses don't hold the request open past proxy timeouts
+const LARGE_INPUT_CHARS = 20000;
+const JOB_POLL_INTERVAL = 1000;
+
+// Submit a background job and poll it until it finishes
+async function runJob(type, body, message) {
+    const response = await fetch('/jobs', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ ...body, type: type })
+    });
+    
+    const submitted = await response.json();
+    if (!response.ok) {
+        throw new Error(submitted.error || 'Unable to start the job.');
+    }
+    
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL));
+        const statusResponse = await fetch(submitted.status_url);
+        const job = await statusResponse.json();
+        
+        if (!statusResponse.ok) {
+            throw new Error(job.error || 'Unable to check the job status.');
+        }
+        if (job.status === 'done') {
+            return job.result;
+        }
+        if (job.status === 'failed') {
+            throw new Error(job.error || 'The job failed.');
+        }
+        
+        const loadingText = document.getElementById('loadingText');
+        if (loadingText) {
+            loadingText.textContent = `${message} ${Math.round(job.progress * 100)}%`;
+        }
+    }
+}
+
+// Text of the input box, or null (after showing why) when it is too short to analyze
+function readAnalysisInput() {
     const textInput = document.getElementById('textInput');
     const text = textInput.value.trim();
     
     if (!text) {
         showError('Please enter some text to analyze.');
-        return;
+        return null;
     }
     
     if (text.length < 50) {
         showError('Please provide at least 50 characters for meaningful analysis.');
+        return null;
+    }
+    return text;
+}
+
+// Analyze text function: the final submission, which joins the reference corpus when ingestion is on
+async function analyzeText() {
+    const text = readAnalysisInput();
+    if (!text) {
         return;
     }
     
     showLoading('Analyzing content with advanced NLP algorithms...');
     
+    if (text.length >= LARGE_INPUT_CHARS) {
+        try {
+            const data = await runJob('analyze', { text: text }, 'Analyzing content with advanced NLP algorithms...');
+            displayResults(data, text);
+        } catch (error) {
+            showError(error.message || 'An error occurred during analysis.');
+        } finally {
+            hideLoading();
+        }
+        return;
+    }
+    
     try {
         const response = await fetch('/analyze', {
             method: 'POST',
@@ -93,7 +158,31 @@ async function analyzeText() {
         const data = await response.json();
         
         if (response.ok) {
-            displayResults(data);
+            displayResults(data, text);
+        } else {
+            showError(data.error || 'An error occurred during analysis.');
+        }
+    } catch (error) {
+        showError('Network error. Please check your connection and try again.');
+    } finally {
+        hideLoading();
+    }
+}
+
+// Re-check a draft while editing it; drafts are never added to the reference corpus
+async function checkDraft() {
+    const text = readAnalysisInput();
+    if (!text) {
+        return;
+    }
+    
+    showLoading('Checking draft...');
+    
+    try {
+        const { response, data } = await analyzeDraft(text);
+        
+        if (response.ok) {
+            displayResults(data, text);
         } else {
             showError(data.error || 'An error occurred during analysis.');
         }
@@ -104,6 +193,73 @@ async function analyzeText() {
     }
 }
 
+// Hash the server gave each paragraph at the last check, so re-checks of an
+// edited draft only send the paragraphs that changed
+let paragraphHashes = new Map();
+
+async function analyzeDraft(text) {
+    const paragraphs = text.split('\n\n');
+    const post = body => fetch('/analyze/incremental', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ paragraphs: body })
+    });
+    
+    let response = await post(paragraphs.map(paragraph =>
+        paragraphHashes.has(paragraph) ? { hash: paragraphHashes.get(paragraph) } : { text: paragraph }
+    ));
+    let data = await response.json();
+    
+    // The server evicted some paragraphs since the last check, so send them in full
+    if (response.status === 409) {
+        const missing = new Set(data.missing);
+        response = await post(paragraphs.map((paragraph, i) =>
+            missing.has(i) ? { text: paragraph } : { hash: paragraphHashes.get(paragraph) }
+        ));
+        data = await response.json();
+    }
+    
+    if (response.ok) {
+        paragraphHashes = new Map(paragraphs.map((paragraph, i) => [paragraph, data.incremental.paragraph_hashes[i]]));
+    }
+    return { response, data };
+}
+
+// Analyze an uploaded .txt, .docx or .pdf document; the server extracts its text
+async function analyzeFile(input) {
+    const file = input.files[0];
+    input.value = '';
+    if (!file) {
+        return;
+    }
+    
+    const formData = new FormData();
+    formData.append('file', file);
+    
+    showLoading(`Extracting and analyzing ${file.name}...`);
+    
+    try {
+        const response = await fetch('/analyze/upload', {
+            method: 'POST',
+            body: formData
+        });
+        
+        const data = await response.json();
+        
+        if (response.ok) {
+            displayResults(data);
+        } else {
+            showError(data.error || 'An error occurred during document analysis.');
+        }
+    } catch (error) {
+        showError('Network error. Please check your connection and try again.');
+    } finally {
+        hideLoading();
+    }
+}
+
 // Rephrase text function with timeout protection
 async function rephraseText() {
     const rephraseInput = document.getElementById('rephraseInput');
@@ -124,6 +280,20 @@ async function rephraseText() {
     console.log('Starting rephrase request...'); // Debug log
     showLoading('Generating rephrased content...');
     
+    if (text.length >= LARGE_INPUT_CHARS) {
+        try {
+            const data = await runJob('rephrase', { text: text, style: style, creativity: creativity }, 'Generating rephrased content...');
+            displayRephraseResult(data.rephrased_text, data.original_text, data.changes_made, data.words_changed);
+            showSuccess(`Text rephrased successfully! ${data.words_changed} words changed.`);
+        } catch (error) {
+            showError(error.message || 'An error occurred during rephrasing.');
+        } finally {
+            hideLoading();
+            setTimeout(forceHideModal, 500);
+        }
+        return;
+    }
+    
     // Safety timeout to force hide modal after 15 seconds
     const timeoutId = setTimeout(() => {
         console.log('Request timeout - forcing modal hide');
@@ -170,7 +340,7 @@ async function rephraseText() {
 }
 
 // Display results function
-function displayResults(data) {
+function displayResults(data, text = '') {
     const resultsContainer = document.getElementById('results');
     
     const resultHTML = `
@@ -221,12 +391,157 @@ function displayResults(data) {
                     </div>
                 </div>
             ` : ''}
+            
+            ${data.similar_sources && data.similar_sources.length > 0 ? `
+                <div class="mt-3">
+                    <h6><i class="fas fa-book me-2 text-danger"></i>Similar Sources:</h6>
+                    <ul class="list-unstyled">
+                        ${data.similar_sources.map(source => `<li class="mb-1"><i class="fas fa-file-alt me-2 text-muted"></i>${source.title} <span class="badge bg-secondary">${source.similarity}%</span></li>`).join('')}
+                    </ul>
+                </div>
+            ` : ''}
+            
+            ${data.matched_passages && data.matched_passages.length > 0 && text ? renderMatchedPassages(text, data.matched_passages) : ''}
+            
+            ${data.paraphrased_sentences && data.paraphrased_sentences.length > 0 && text ? renderParaphrasedSentences(text, data.paraphrased_sentences) : ''}
         </div>
     `;
     
     resultsContainer.innerHTML = resultHTML;
 }
 
+// Show the exact passages that match each reference source
+function renderMatchedPassages(text, matchedPassages) {
+    const escapeHtml = value => value.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+    
+    return `
+        <div class="mt-3">
+            <h6><i class="fas fa-highlighter me-2 text-danger"></i>Matched Passages:</h6>
+            ${matchedPassages.map(source => `
+                <div class="mb-2">
+                    <strong>${source.title}</strong>
+                    <span class="badge bg-danger">${source.coverage}% of text</span>
+                    ${source.spans.slice(0, 3).map(span => `
+                        <blockquote class="small text-muted border-start ps-2 my-1">
+                            <mark>${escapeHtml(text.slice(span.start, span.end))}</mark>
+                        </blockquote>
+                    `).join('')}
+                </div>
+            `).join('')}
+        </div>
+    `;
+}
+
+// Show each sentence that paraphrases a reference sentence next to its source
+function renderParaphrasedSentences(text, paraphrasedSentences) {
+    const escapeHtml = value => value.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+    
+    return `
+        <div class="mt-3">
+            <h6><i class="fas fa-random me-2 text-warning"></i>Paraphrased Sentences:</h6>
+            ${paraphrasedSentences.slice(0, 5).map(sentence => `
+                <div class="mb-2">
+                    <strong>${sentence.source.title}</strong>
+                    <span class="badge bg-warning text-dark">${sentence.similarity}% similar</span>
+                    <blockquote class="small border-start ps-2 my-1">
+                        <mark>${escapeHtml(text.slice(sentence.start, sentence.end))}</mark>
+                        <div class="text-muted mt-1">${escapeHtml(sentence.source_sentence)}</div>
+                    </blockquote>
+                </div>
+            `).join('')}
+        </div>
+    `;
+}
+
+// Compare two texts and highlight the passages they share
+async function compareTexts() {
+    const first = document.getElementById('compareFirst').value;
+    const second = document.getElementById('compareSecond').value;
+    
+    if (!first.trim() || !second.trim()) {
+        showError('Please enter both texts to compare.');
+        return;
+    }
+    
+    showLoading('Aligning matching passages...');
+    
+    try {
+        const response = await fetch('/align', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ first: first, second: second })
+        });
+        
+        const data = await response.json();
+        
+        if (response.ok) {
+            displayComparison(data, first, second);
+        } else {
+            showError(data.error || 'An error occurred during comparison.');
+        }
+    } catch (error) {
+        showError('Network error. Please check your connection and try again.');
+    } finally {
+        hideLoading();
+    }
+}
+
+// Show both texts side by side with their aligned passages marked
+function displayComparison(data, first, second) {
+    const compareResult = document.getElementById('compareResult');
+    
+    compareResult.innerHTML = `
+        <div class="result-card">
+            <div class="d-flex flex-wrap gap-2 mb-3">
+                <span class="badge bg-danger">${data.first_coverage}% of first text</span>
+                <span class="badge bg-danger">${data.second_coverage}% of second text</span>
+                <span class="badge bg-secondary">${data.passages.length} matching passages</span>
+            </div>
+            <div class="row">
+                <div class="col-md-6">
+                    <div class="aligned-text" id="alignedFirst">${renderAlignedText(first, data.passages, 'first')}</div>
+                </div>
+                <div class="col-md-6">
+                    <div class="aligned-text" id="alignedSecond">${renderAlignedText(second, data.passages, 'second')}</div>
+                </div>
+            </div>
+        </div>
+    `;
+    
+    // Hovering a passage lights up its counterpart; clicking scrolls to it
+    compareResult.querySelectorAll('mark[data-passage]').forEach(mark => {
+        const counterparts = () => compareResult.querySelectorAll(`mark[data-passage="${mark.dataset.passage}"]`);
+        mark.addEventListener('mouseenter', () => counterparts().forEach(other => other.classList.add('active')));
+        mark.addEventListener('mouseleave', () => counterparts().forEach(other => other.classList.remove('active')));
+        mark.addEventListener('click', () => {
+            const otherSide = mark.closest('.aligned-text').id === 'alignedFirst' ? 'alignedSecond' : 'alignedFirst';
+            const target = document.querySelector(`#${otherSide} mark[data-passage="${mark.dataset.passage}"]`);
+            if (target) {
+                target.scrollIntoView({ behavior: 'smooth', block: 'center' });
+            }
+        });
+    });
+}
+
+// Mark one side's aligned passages in its text, numbering each pair
+function renderAlignedText(text, passages, side) {
+    const escapeHtml = value => value.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+    const spans = passages
+        .map((passage, index) => ({ start: passage[`${side}_start`], end: passage[`${side}_end`], index: index }))
+        .sort((a, b) => a.start - b.start);
+    
+    let html = '';
+    let position = 0;
+    spans.forEach(span => {
+        html += escapeHtml(text.slice(position, span.start));
+        html += `<mark class="aligned-passage" data-passage="${span.index}" title="Passage ${span.index + 1}">${escapeHtml(text.slice(span.start, span.end))}</mark>`;
+        position = span.end;
+    });
+    return html + escapeHtml(text.slice(position));
+}
+
 // Display rephrase result with highlighting
 function displayRephraseResult(rephrasedText, originalText, changesMade, wordsChanged) {
     const rephraseResult = document.getElementById('rephraseResult');
@@ -0,0 +1,187 @@
+import re
+import codecs
+
+# Whitespace-separated tokens a regex match may span across a line break
+# (e.g. "January 5,\n1805" or "retrieved\nfrom")
+CARRY_TOKENS = 8
+# Hard bounds so pathological input (no line breaks, no sentence ends) stays in bounded memory
+MAX_CARRY_CHARS = 4096
+MAX_LINE_CHARS = 1 << 20
+MAX_SENTENCE_CHARS = 1 << 20
+
+TOKEN_PATTERN = re.compile(r'\S+')
+LAST_SPACE_PATTERN = re.compile(r'\s\S*\Z')
+
+
+def iter_decoded(stream, chunk_size=65536, encoding='utf-8'):
+    """Yield text chunks from a binary stream without splitting multi-byte characters"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            break
+        text = decoder.decode(data)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def normalize_newlines(chunks):
+    """Translate \\r\\n and \\r line endings to \\n across chunk boundaries"""
+    pending_cr = False
+    for chunk in chunks:
+        if pending_cr:
+            chunk = '\r' + chunk
+        pending_cr = chunk.endswith('\r')
+        if pending_cr:
+            chunk = chunk[:-1]
+        yield chunk.replace('\r\n', '\n').replace('\r', '\n')
+    if pending_cr:
+        yield '\n'
+
+
+def tail_start(text, tokens=CARRY_TOKENS, max_chars=MAX_CARRY_CHARS):
+    """Offset where the last few whitespace-separated tokens of text begin"""
+    window_start = max(0, len(text) - max_chars)
+    starts = [match.start() for match in TOKEN_PATTERN.finditer(text, window_start)]
+    if not starts:
+        return len(text)
+    return window_start + starts[-tokens] if len(starts) >= tokens else starts[0]
+
+
+class StreamingScanner:
+    """Runs the detector pattern families over a text that arrives in pieces
+
+    Text is scanned up to the last complete line. The last few tokens are
+    carried into the next scan, so matches that continue across a line
+    break are still found, and each pattern resumes after its last match,
+    so nothing is counted twice. This gives the same matches as scanning
+    the whole text at once.
+    """
+
+    def __init__(self, scanner):
+        self.families = scanner.families
+        self.carry = ''
+        self.carry_offset = 0
+        self.pending = ''
+        self.matches = {}
+        self.first_matches = {}
+        self.last_end = {}
+        for family in self.families:
+            for pattern in family.patterns:
+                if family.mode == 'all':
+                    self.matches[pattern] = []
+                else:
+                    self.first_matches[pattern] = None
+                self.last_end[pattern] = 0
+
+    def feed(self, chunk):
+        self.pending += chunk
+        cut = self.pending.rfind('\n')
+        if cut == -1:
+            if len(self.pending) < MAX_LINE_CHARS:
+                return
+            cut = len(self.pending) - 1
+        self._scan(self.pending[:cut + 1])
+        self.pending = self.pending[cut + 1:]
+
+    def close(self):
+        if self.pending:
+            self._scan(self.pending)
+            self.pending = ''
+
+    def _scan(self, segment):
+        buffer = self.carry + segment
+        base = self.carry_offset
+        for family in self.families:
+            for pattern, compiled in zip(family.patterns, family.compiled):
+                if family.mode != 'all' and self.first_matches[pattern] is not None:
+                    continue
+                position = max(0, self.last_end[pattern] - base)
+                for match in compiled.finditer(buffer, position):
+                    self.last_end[pattern] = base + match.end()
+                    if family.mode == 'all':
+                        self.matches[pattern].append(match.group())
+                    else:
+                        self.first_matches[pattern] = match.group()
+                        break
+
+        start = tail_start(buffer)
+        self.carry = buffer[start:]
+        self.carry_offset = base + start
+
+
+class StreamingAnalyzer:
+    """Builds a TextSummary from text chunks in bounded memory
+
+    Sentences are only finalized once the sentence after them has started,
+    and are then tokenized on their own exactly as the detector would,
+    so counts and Welford sentence-length statistics match analyzing the
+    whole text in memory.
+    """
+
+    def __init__(self, detector):
+        self.summary = detector.summarize('')
+        self.tokenizer = detector.tokenizer
+        self.phrase_counter = detector.scanner.phrases
+        self.patterns = StreamingScanner(detector.scanner)
+        self.buffer = ''
+        self.characters = 0
+
+    def feed(self, chunk):
+        self.characters += len(chunk)
+        self.patterns.feed(chunk)
+        self.buffer += chunk
+
+        # Sentence boundaries depend on the next word, so only
+        # tokenize up to the last whitespace where that word is complete
+        last_space = LAST_SPACE_PATTERN.search(self.buffer)
+        settled = last_space.start() if last_space else 0
+        sentences = self.tokenizer.sent_tokenize(self.buffer[:settled])
+        if len(sentences) < 2:
+            if len(self.buffer) < MAX_SENTENCE_CHARS:
+                return
+            # Punctuation-free text: flush what we have rather than grow forever
+            self._finalize(self.buffer, self.tokenizer.sent_tokenize(self.buffer))
+            self.buffer = ''
+            return
+
+        # The last sentence may still grow, so keep it buffered
+        cut = self.buffer.rfind(sentences[-1], 0, settled)
+        self._finalize(self.buffer[:cut], sentences[:-1])
+        self.buffer = self.buffer[cut:]
+
+    def close(self):
+        """Flush the remaining text and return the finished summary"""
+        if self.buffer.strip():
+            self._finalize(self.buffer, self.tokenizer.sent_tokenize(self.buffer))
+        self.buffer = ''
+        self.patterns.close()
+
+        summary = self.summary
+        summary._matches = self.patterns.matches
+        summary._first_matches = self.patterns.first_matches
+        summary._match_counts = {}
+        return summary
+
+    def _finalize(self, text, sentences):
+        summary = self.summary
+        for sentence in sentences:
+            summary.add_sentence_length(len(sentence.split()))
+            words = [word.lower() for word in self.tokenizer.word_tokenize(sentence, preserve_line=True)]
+            summary.token_count += len(words)
+            summary.word_counts.update(words)
+            words_clean = [word for word in words if word.isalpha()]
+            summary.total_words += len(words_clean)
+            summary.vocabulary.update(words_clean)
+
+        # Phrases contain no sentence punctuation, so none spans two finalized pieces
+        for phrase, count in self.phrase_counter.count(text.lower()).items():
+            summary._phrase_counts[phrase] += count
+
+    def analyze(self, chunks):
+        for chunk in chunks:
+            self.feed(chunk)
+        return self.close()
@@ -0,0 +1,34 @@
+import itertools
+import numpy as np
+
+
+class SynonymIndex:
+    """Synonym lists compiled into a word-to-row map and flat candidate arrays
+
+    The candidates of row i are candidates[offsets[i]:offsets[i + 1]], with
+    their capitalized forms precomputed alongside, so the replacements for a
+    whole document are picked with array arithmetic from one batch of random
+    draws instead of a random.choice per word.
+    """
+
+    def __init__(self, synonyms):
+        # Words without candidates get no row, so every looked-up row can be drawn from
+        self.words = [word for word, candidates in synonyms.items() if candidates]
+        self.rows = {word: row for row, word in enumerate(self.words)}
+        self.counts = np.array([len(synonyms[word]) for word in self.words], dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(self.counts)])
+        candidates = [candidate for word in self.words for candidate in synonyms[word]]
+        self.candidates = np.array(candidates, dtype=object)
+        self.capitalized = np.array([candidate.capitalize() for candidate in candidates], dtype=object)
+
+    def __len__(self):
+        return len(self.words)
+
+    def lookup(self, words):
+        """Row of each (lowercased) word, or -1 for words without synonyms"""
+        return np.fromiter(map(self.rows.get, words, itertools.repeat(-1)), dtype=np.int64, count=len(words))
+
+    def choose(self, rows, draws, capitalize):
+        """One candidate per row, picked by a uniform draw in [0, 1), capitalized where capitalize is set"""
+        picks = self.offsets[rows] + (draws * self.counts[rows]).astype(np.int64)
+        return np.where(capitalize, self.capitalized[picks], self.candidates[picks])
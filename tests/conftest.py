@@ -0,0 +1,41 @@
+import os
+import sys
+import pytest
+
+# The app's modules live flat at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Short texts that trigger the suspicious, encyclopedic, citation and phrase-overuse detectors
+SAMPLE_DOCUMENTS = [
+    'Napoleon Bonaparte was born in 1769 in Corsica. He is known for his military campaigns. '
+    'According to sources: wikipedia [1]. However, the Battle of Austerlitz in 1805 was a victory. '
+    'Furthermore, the Emperor defeated the army at Jena. Moreover it was a war.',
+    'I went to the store yesterday and bought some apples. They were good. My friend came with me '
+    'and we talked about school and life and many things.',
+    'The cat is a small animal that lives with people. It is known for its independence. Copyright 2020 '
+    'all rights reserved. See www.example.com, Smith et al (2019), pp. 12, vol. 3. In conclusion, '
+    'in conclusion, however, moreover, therefore, for example, in other words.',
+    'Dr. Smith went to Washington on January 5,\n1805. He was born in the 19th century. Retrieved\n'
+    'from the archive. ' * 20,
+    'A. ' * 30 + 'This is a really long sentence ' * 20 + '.',
+]
+
+
+@pytest.fixture(scope='session')
+def documents():
+    """The sample documents plus generated multi-paragraph essays of a few sizes"""
+    from benchmark import generate_text
+    return SAMPLE_DOCUMENTS + [generate_text(size, seed) for seed, size in enumerate((2000, 8000, 30000))]
+
+
+@pytest.fixture(scope='session', params=['native', 'nltk'])
+def tokenizer(request):
+    """Each tokenizer the detector can be configured with"""
+    import nlp_resources
+    if request.param == 'nltk':
+        pytest.importorskip('nltk')
+        try:
+            nlp_resources.tokenizers()
+        except LookupError:
+            pytest.skip('NLTK data is not installed; run download_nltk.py')
+    return nlp_resources.get_tokenizer(request.param)
@@ -0,0 +1,33 @@
+import io
+import pytest
+
+TEXT = 'The quick brown fox jumps over the lazy dog while the farmer watches from the field.'
+
+
+@pytest.fixture(scope='module')
+def client():
+    app = pytest.importorskip('app')
+    return app.app.test_client()
+
+
+def post(client, route, top_k):
+    if route == '/analyze/upload':
+        data = {'file': (io.BytesIO(TEXT.encode()), 'essay.txt'), 'top_k': str(top_k)}
+        return client.post(route, data=data, content_type='multipart/form-data')
+    body = {'/analyze': {'text': TEXT},
+            '/analyze/batch': {'texts': [TEXT, TEXT]},
+            '/analyze/incremental': {'paragraphs': [{'text': TEXT}]},
+            '/jobs': {'type': 'analyze', 'text': TEXT}}[route]
+    return client.post(route, json={**body, 'top_k': top_k})
+
+
+@pytest.mark.parametrize('route', ['/analyze', '/analyze/batch', '/analyze/incremental', '/analyze/upload', '/jobs'])
+@pytest.mark.parametrize('top_k', [0, -3, 'many'])
+def test_top_k_below_one_is_rejected(client, route, top_k):
+    response = post(client, route, top_k)
+    assert response.status_code == 400
+    assert 'top_k' in response.json['error']
+
+
+def test_top_k_is_capped(client):
+    assert client.post('/analyze', json={'text': TEXT, 'top_k': 500}).status_code == 200
@@ -0,0 +1,44 @@
+import threading
+from cache import MemoryBackend, ResultCache, SQLiteBackend, make_key
+
+
+def test_counters_are_exact_under_concurrent_lookups():
+    cache = ResultCache(MemoryBackend())
+    cache.set('hit', {'value': 1})
+
+    def look_up():
+        for _ in range(2000):
+            cache.get('hit')
+            cache.get('miss')
+
+    threads = [threading.Thread(target=look_up) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (16000, 16000, 0.5)
+
+
+def test_get_or_compute_computes_once():
+    cache = ResultCache()
+    calls = []
+    key = make_key('analyze', 'text', 5)
+    for _ in range(3):
+        assert cache.get_or_compute(key, lambda: calls.append(1) or {'score': 7}) == {'score': 7}
+    assert len(calls) == 1
+
+
+def test_memory_backend_evicts_least_recently_used():
+    cache = ResultCache(MemoryBackend(max_entries=2))
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
+
+
+def test_sqlite_backend_is_shared_between_caches(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    ResultCache(SQLiteBackend(path)).set('key', {'value': 1})
+    assert ResultCache(SQLiteBackend(path)).get('key') == {'value': 1}
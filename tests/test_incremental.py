@@ -0,0 +1,55 @@
+import pytest
+from cache import normalize_text
+from engine import PlagiarismDetector, TextSummary
+
+
+@pytest.fixture(scope='module')
+def detector(tokenizer):
+    return PlagiarismDetector(tokenizer=tokenizer)
+
+
+@pytest.fixture(scope='module')
+def client():
+    app = pytest.importorskip('app')
+    return app.app.test_client()
+
+
+def paragraphs_of(text):
+    return normalize_text(text).split('\n\n')
+
+
+def test_merged_paragraph_summaries_match_whole_text(detector, documents):
+    for i, text in enumerate(documents):
+        paragraphs = paragraphs_of(text)
+        summary = TextSummary()
+        for paragraph in paragraphs:
+            # Through the cache's JSON form, as /analyze/incremental stores them
+            summary.merge(TextSummary.from_dict(detector.summarize(paragraph).to_dict()))
+        summary.text = '\n\n'.join(paragraphs)
+        assert detector.detect_from_summary(summary) == detector.detect_plagiarism(summary.text), i
+
+
+def test_incremental_endpoint_matches_analyze(client, documents):
+    for i, text in enumerate(documents):
+        paragraphs = paragraphs_of(text)
+        incremental = client.post('/analyze/incremental', json={'paragraphs': [{'text': p} for p in paragraphs]}).json
+        incremental.pop('incremental')
+        assert incremental == client.post('/analyze', json={'text': '\n\n'.join(paragraphs)}).json, i
+
+
+def test_edited_draft_reuses_cached_paragraphs(client, documents):
+    paragraphs = paragraphs_of(documents[-1])
+    first = client.post('/analyze/incremental', json={'paragraphs': [{'text': p} for p in paragraphs]}).json
+    hashes = first['incremental']['paragraph_hashes']
+
+    paragraphs[1] += ' I added a sentence of my own here.'
+    body = [{'text': p} if i == 1 else {'hash': h} for i, (p, h) in enumerate(zip(paragraphs, hashes))]
+    edited = client.post('/analyze/incremental', json={'paragraphs': body}).json
+    assert edited.pop('incremental')['reused'] == len(paragraphs) - 1
+    assert edited == client.post('/analyze', json={'text': '\n\n'.join(paragraphs)}).json
+
+
+def test_unknown_paragraph_hash_is_reported(client):
+    response = client.post('/analyze/incremental', json={'paragraphs': [{'hash': 'unknown'}, {'text': 'x' * 60}]})
+    assert response.status_code == 409
+    assert response.json['missing'] == [0]
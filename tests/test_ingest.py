@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip('sklearn')
+from corpus_store import CorpusStore
+from ingest import CorpusIngestor
+
+
+@pytest.fixture
+def ingestor(tmp_path):
+    path = str(tmp_path / 'store')
+    CorpusIngestor.ensure_store(path)
+    return CorpusIngestor(path)
+
+
+@pytest.fixture
+def essay(documents):
+    return documents[0]
+
+
+def store_of(ingestor):
+    ingestor.flush()
+    return CorpusStore(ingestor.path)
+
+
+def test_copy_of_another_submitters_text_is_reported(ingestor, essay):
+    ingestor.submit(essay, submitter='alice')
+    store = store_of(ingestor)
+    assert store.query(essay, submitter='bob')
+    assert store.matching_passages(essay, submitter='bob')
+    assert store.query(essay) != []
+
+
+def test_own_submissions_are_not_reported(ingestor, essay):
+    ingestor.submit(essay, submitter='alice')
+    store = store_of(ingestor)
+    assert store.query(essay, submitter='alice') == []
+    assert store.query(essay + ' I added one more sentence.', submitter='alice') == []
+    assert store.matching_passages(essay, submitter='alice') == []
+
+
+def test_anonymous_resubmission_is_not_its_own_source(ingestor, essay):
+    ingestor.submit(essay)
+    store = store_of(ingestor)
+    assert store.query(essay) == []
+    assert store.query(essay, submitter='bob')
+
+
+def test_text_is_stored_once_per_submitter(ingestor, essay):
+    ingestor.submit(essay, submitter='alice')
+    assert ingestor.flush() == 1
+    ingestor.submit(essay, submitter='alice')
+    assert ingestor.flush() == 0
+    ingestor.submit(essay, submitter='bob')
+    ingestor.submit(essay)
+    assert ingestor.flush() == 2
+    assert len(CorpusStore(ingestor.path)) == 3
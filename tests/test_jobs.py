@@ -0,0 +1,39 @@
+import time
+from jobs import JobQueue
+
+
+def wait_for(queue, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.05)
+    return queue.get(job_id)
+
+
+def test_jobs_of_an_exited_process_are_picked_up(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    # A process that queued a job but never ran a worker
+    exited = JobQueue(path)
+    exited.register('echo', lambda payload, progress: payload)
+    exited.start = lambda: None
+    job_id = exited.submit('echo', {'value': 1})
+
+    queue = JobQueue(path, poll_interval=0.05)
+    queue.register('echo', lambda payload, progress: payload)
+    queue.start()
+    job = wait_for(queue, job_id)
+    assert job['status'] == 'done'
+    assert job['result'] == {'value': 1}
+
+
+def test_failed_job_reports_its_error(tmp_path):
+    def fail(payload, progress):
+        raise ValueError('bad input')
+
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), poll_interval=0.05)
+    queue.register('fail', fail)
+    job = wait_for(queue, queue.submit('fail', {}))
+    assert job['status'] == 'failed'
+    assert job['error'] == 'bad input'
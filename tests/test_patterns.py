@@ -0,0 +1,34 @@
+import random
+from engine import PlagiarismDetector
+from patterns import PhraseAutomaton, PhraseCounter
+
+# Phrases that overlap, nest and repeat themselves, where a one-pass automaton and str.count could disagree
+TRICKY_PHRASES = ['aa', 'aaa', 'abab', 'ab', 'in the', 'in the end', 'the end', 'end of', 'e', ' ', 'é']
+
+
+def large_phrase_list(documents, size=300):
+    """The detector's phrases, the tricky ones, and word pairs and triples from the documents"""
+    words = ' '.join(documents).lower().split()
+    rng = random.Random(0)
+    phrases = list(PlagiarismDetector(tier='fast').common_academic_phrases) + TRICKY_PHRASES
+    while len(phrases) < size:
+        start = rng.randrange(len(words) - 3)
+        phrase = ' '.join(words[start:start + rng.choice((2, 3))])
+        if phrase not in phrases:
+            phrases.append(phrase)
+    return phrases
+
+
+def test_large_phrase_lists_use_the_automaton(documents):
+    phrases = large_phrase_list(documents)
+    assert len(phrases) >= PhraseCounter.AUTOMATON_MIN_PHRASES
+    assert PhraseCounter(phrases).automaton is not None
+    assert PhraseCounter(phrases[:22]).automaton is None
+
+
+def test_automaton_counts_match_str_count(documents):
+    phrases = large_phrase_list(documents)
+    automaton = PhraseAutomaton(phrases)
+    texts = [text.lower() for text in documents] + ['aaaa abababab', 'in the end of the end', 'éé e  e', '']
+    for i, text in enumerate(texts):
+        assert automaton.count(text) == {phrase: text.count(phrase) for phrase in phrases}, i
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+from scoring import DEFAULT_MODEL, FEATURES, SLOTS, ScoringModel, feature_vector
+
+# Every threshold of the hand-written rules, with values just below, on and above it
+BOUNDARIES = {
+    'unique_ratio': (0.3, 0.5, 0.7),
+    'common_phrases': (3, 5, 8),
+    'top_word_share': (0.1,),
+    'token_count': (20,),
+    'sentence_length_variance': (100,),
+    'historical_indicators': (5, 10, 15),
+    'formal_indicators': (1, 3),
+    'best_source_similarity': (30, 50, 80),
+}
+
+
+def rule_score(f):
+    """The if/elif risk rules the default model replaced, one feature vector at a time"""
+    value = {name: f[SLOTS[name]] for name in FEATURES}
+    score = 0
+
+    if value['unique_ratio'] < 0.3:
+        score += 25
+    elif value['unique_ratio'] < 0.5:
+        score += 15
+    elif value['unique_ratio'] < 0.7:
+        score += 5
+
+    score += value['suspicious_count'] * 20
+    score += value['structure_issues'] * 15
+
+    if value['common_phrases'] > 8:
+        score += 25
+    elif value['common_phrases'] > 5:
+        score += 15
+    elif value['common_phrases'] > 3:
+        score += 10
+
+    if value['top_word_share'] > 0.1:
+        score += 15
+    if value['token_count'] < 20:
+        score += 10
+    if value['sentence_count'] > 1 and value['sentence_length_variance'] > 100:
+        score += 10
+
+    score += value['wiki_indicators'] * 8
+
+    if value['historical_indicators'] > 15:
+        score += 25
+    elif value['historical_indicators'] > 10:
+        score += 15
+    elif value['historical_indicators'] > 5:
+        score += 10
+
+    if value['formal_indicators'] > 3:
+        score += 15
+    elif value['formal_indicators'] > 1:
+        score += 8
+
+    if value['best_source_similarity'] >= 80:
+        score += 40
+    elif value['best_source_similarity'] >= 50:
+        score += 25
+    elif value['best_source_similarity'] >= 30:
+        score += 10
+
+    return min(score, 100)
+
+
+def random_features(rng, count):
+    features = np.zeros((count, len(FEATURES)))
+    features[:, SLOTS['unique_ratio']] = rng.uniform(0, 1, count)
+    features[:, SLOTS['top_word_share']] = rng.uniform(0, 0.3, count)
+    features[:, SLOTS['sentence_length_variance']] = rng.uniform(0, 300, count)
+    features[:, SLOTS['best_source_similarity']] = rng.uniform(0, 100, count)
+    for name, high in (('suspicious_count', 4), ('structure_issues', 4), ('common_phrases', 12),
+                       ('token_count', 60), ('sentence_count', 6), ('wiki_indicators', 5),
+                       ('historical_indicators', 20), ('formal_indicators', 6)):
+        features[:, SLOTS[name]] = rng.integers(0, high, count)
+    # Length variance is 0 with fewer than two sentences, which is why the model needs no guard for it
+    features[features[:, SLOTS['sentence_count']] < 2, SLOTS['sentence_length_variance']] = 0
+    return features
+
+
+def test_default_model_matches_rules_on_random_features():
+    features = random_features(np.random.default_rng(0), 20000)
+    scores = ScoringModel.from_dict(DEFAULT_MODEL).score(features)
+    assert scores.tolist() == [rule_score(f) for f in features]
+
+
+@pytest.mark.parametrize('name', sorted(BOUNDARIES))
+def test_default_model_matches_rules_at_thresholds(name):
+    model = ScoringModel.from_dict(DEFAULT_MODEL)
+    for threshold in BOUNDARIES[name]:
+        for value in (threshold - 1e-9, threshold, threshold + 1e-9):
+            # Enough tokens and sentences that only the feature under test crosses a threshold
+            f = feature_vector(**{'unique_ratio': 0.9, 'token_count': 100, 'sentence_count': 5, name: value})
+            assert model.score(f) == rule_score(f), (name, value)
+
+
+def test_single_vector_and_matrix_scores_agree():
+    model = ScoringModel.from_dict(DEFAULT_MODEL)
+    features = random_features(np.random.default_rng(1), 50)
+    assert [model.score(f) for f in features] == model.score(features).tolist()
+
+
+def test_saved_model_round_trips():
+    model = ScoringModel.from_dict(DEFAULT_MODEL)
+    loaded = ScoringModel.from_dict(model.to_dict())
+    features = random_features(np.random.default_rng(2), 200)
+    assert loaded.config_key() == model.config_key()
+    assert loaded.score(features).tolist() == model.score(features).tolist()
@@ -0,0 +1,40 @@
+import random
+import pytest
+from engine import PlagiarismDetector
+from streaming import StreamingAnalyzer
+
+CHUNK_SIZES = (1, 7, 64, 1000)
+
+
+@pytest.fixture(scope='module')
+def detector(tokenizer):
+    return PlagiarismDetector(tokenizer=tokenizer)
+
+
+def random_chunks(text, size, seed):
+    """text cut into pieces of 1 to size characters, as a client might send it"""
+    rng = random.Random(seed)
+    chunks, i = [], 0
+    while i < len(text):
+        step = rng.randint(1, size)
+        chunks.append(text[i:i + step])
+        i += step
+    return chunks
+
+
+@pytest.mark.parametrize('size', CHUNK_SIZES)
+def test_streamed_result_matches_in_memory(detector, documents, size):
+    for seed, text in enumerate(documents):
+        if size == 1 and len(text) > 3000:
+            continue
+        streamed = StreamingAnalyzer(detector).analyze(random_chunks(text, size, seed))
+        assert detector.detect_from_summary(streamed) == detector.detect_plagiarism(text), (seed, size)
+
+
+def test_streamed_features_match_in_memory(detector, documents):
+    for seed, text in enumerate(documents):
+        streamed = StreamingAnalyzer(detector).analyze(random_chunks(text, 64, seed))
+        whole = detector.summarize(text)
+        assert streamed.vocabulary == whole.vocabulary, seed
+        assert streamed.word_counts == whole.word_counts, seed
+        assert detector.extract_features(streamed) == pytest.approx(detector.extract_features(whole)), seed
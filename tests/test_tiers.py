@@ -0,0 +1,43 @@
+import pytest
+import nlp_resources
+from engine import PlagiarismDetector
+
+
+@pytest.fixture(scope='module')
+def fast():
+    return PlagiarismDetector(tier='fast')
+
+
+@pytest.fixture(scope='module')
+def full():
+    # The fast tier always uses the native tokenizer, so the full tier is compared with the same one
+    return PlagiarismDetector(tokenizer=nlp_resources.get_tokenizer('native'), tier='full')
+
+
+def test_fast_tier_uses_native_tokenizer(fast):
+    assert fast.tokenizer.name == 'native'
+
+
+def test_tiers_score_identically_without_corpus(fast, full, documents):
+    for i, text in enumerate(documents):
+        assert fast.detect_plagiarism(text) == full.detect_plagiarism(text), i
+
+
+def test_tiers_score_batches_identically(fast, full, documents):
+    pytest.importorskip('sklearn')
+    fast_batch = fast.detect_plagiarism_batch(documents)
+    full_batch = full.detect_plagiarism_batch(documents)
+    assert fast_batch['results'] == full_batch['results']
+    # Only the cross-submission similarity is computed differently (MinHash rather than TF-IDF)
+    assert len(fast_batch['similarity_matrix']) == len(full_batch['similarity_matrix']) == len(documents)
+
+
+def test_fast_tier_refuses_reference_data(fast, tmp_path):
+    with pytest.raises(ValueError):
+        fast.load_corpus(str(tmp_path))
+    with pytest.raises(ValueError):
+        fast.load_sentence_index(str(tmp_path))
+
+
+def test_tiers_have_distinct_cache_keys(fast, full):
+    assert fast.config_key() != full.config_key()
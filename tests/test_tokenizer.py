@@ -0,0 +1,82 @@
+import os
+import pytest
+import nlp_resources
+from compare_tokenizers import (
+    SAMPLE_TEXTS, SENTENCE_AGREEMENT_MIN, TOKEN_AGREEMENT_MIN, RecordedTokenizer, is_trained_punkt, parity
+)
+from tokenizer import NativeTokenizer
+
+# NLTK's sentences and tokens of SAMPLE_TEXTS (compare_tokenizers.py --save-reference)
+REFERENCE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'nltk_reference.json')
+
+
+def installed_punkt():
+    pytest.importorskip('nltk')
+    try:
+        trained = is_trained_punkt()
+    except LookupError:
+        pytest.skip('NLTK data is not installed; run download_nltk.py')
+    if not trained:
+        pytest.skip('The installed Punkt model is not the trained English one')
+    return nlp_resources.NLTKTokenizer()
+
+
+def test_parity_with_recorded_nltk():
+    result = parity(SAMPLE_TEXTS, RecordedTokenizer.load(REFERENCE_PATH), NativeTokenizer())
+    assert result['sentence_agreement'] >= SENTENCE_AGREEMENT_MIN, result
+    assert result['token_agreement'] >= TOKEN_AGREEMENT_MIN, result
+
+
+def test_recording_covers_the_samples():
+    recorded = RecordedTokenizer.load(REFERENCE_PATH)
+    assert set(recorded.sentences) == set(SAMPLE_TEXTS)
+
+
+def test_recording_matches_installed_nltk():
+    reference = installed_punkt()
+    recorded = RecordedTokenizer.load(REFERENCE_PATH)
+    for text in SAMPLE_TEXTS:
+        sentences = reference.sent_tokenize(text)
+        assert sentences == recorded.sent_tokenize(text), 'Regenerate it with compare_tokenizers.py --save-reference'
+        for sentence in sentences:
+            assert reference.word_tokenize(sentence, preserve_line=True) == recorded.word_tokenize(sentence)
+
+
+def test_parity_with_installed_nltk():
+    result = parity(SAMPLE_TEXTS, installed_punkt(), NativeTokenizer())
+    assert result['sentence_agreement'] >= SENTENCE_AGREEMENT_MIN, result
+    assert result['token_agreement'] >= TOKEN_AGREEMENT_MIN, result
+
+
+@pytest.mark.parametrize('text', [
+    'The U.S. economy grew quickly.',
+    'The meeting is on Jan. 5 at noon.',
+    'See pp. 12-14 for details.',
+    'The chart (see Fig. 3) shows it.',
+    'Dr. Brown et al. argue the opposite.',
+    'It was approx. three times larger.',
+])
+def test_abbreviations_do_not_end_sentences(text):
+    assert NativeTokenizer().sent_tokenize(text) == [text]
+
+
+def test_capitalized_word_after_ellipsis_starts_sentence():
+    text = 'It grew faster than expected... Analysts were surprised.'
+    assert NativeTokenizer().sent_tokenize(text) == ['It grew faster than expected...', 'Analysts were surprised.']
+
+
+def test_sentence_starter_after_abbreviation_ends_sentence():
+    text = 'He moved to the U.S. The move was hard.'
+    assert NativeTokenizer().sent_tokenize(text) == ['He moved to the U.S.', 'The move was hard.']
+
+
+def test_spans_are_slices_of_the_text():
+    tokenizer = NativeTokenizer()
+    for text in SAMPLE_TEXTS:
+        for token, start, end in tokenizer.tokenize_with_offsets(text):
+            assert text[start:end] == token
+
+
+def test_nltk_is_the_default_tokenizer():
+    # The native tokenizer is opt-in with TOKENIZER=native
+    assert nlp_resources.DEFAULT_TOKENIZER == os.environ.get('TOKENIZER', 'nltk')
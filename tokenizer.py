@@ -0,0 +1,214 @@
+import re
+
+# Abbreviations that never end a sentence on their own (titles before a name)
+TITLES = frozenset([
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'rev', 'gen', 'col', 'lt', 'capt', 'sgt', 'gov',
+    'sen', 'rep', 'pres', 'hon', 'st', 'mt', 'ft', 'jr', 'sr'
+])
+
+# Abbreviations that end a sentence only when a typical sentence opener follows
+ABBREVIATIONS = TITLES | frozenset([
+    'etc', 'vs', 'e.g', 'i.e', 'cf', 'al', 'approx', 'ca', 'no', 'nos', 'vol', 'vols',
+    'fig', 'figs', 'p', 'pp', 'ed', 'eds', 'ch', 'sec', 'dept', 'univ', 'assn',
+    'inc', 'ltd', 'co', 'corp', 'bros', 'u.s', 'u.k', 'u.n', 'a.m', 'p.m', 'b.c', 'a.d',
+    'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec',
+    'mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun', 'ave', 'blvd', 'rd', 'est', 'ph.d',
+    'ibid', 'viz', 'eq', 'eqs', 'ref', 'refs', 'repr', 'n.b'
+])
+
+# Capitalized words after which an abbreviation, initial or ellipsis is taken to end a sentence
+SENTENCE_STARTERS = frozenset([
+    'the', 'a', 'an', 'this', 'that', 'these', 'those', 'it', 'its', 'he', 'she', 'they',
+    'we', 'i', 'you', 'his', 'her', 'their', 'our', 'my', 'in', 'on', 'at', 'for', 'but',
+    'and', 'or', 'so', 'if', 'when', 'while', 'after', 'before', 'however', 'there', 'then',
+    'as', 'although', 'since', 'because', 'what', 'who', 'how', 'why', 'some', 'many', 'most'
+])
+
+CLOSING_CHARS = '"\')]}»”’'
+OPENING_CHARS = '"\'([{«“‘`'
+# Characters Treebank allows after a sentence-final period
+FINAL_CLOSERS = '])}>"\'»”’'
+
+SPECIAL_CHARS = r';@#$%&?!*\[\](){}<>"«“‘„»”’\u2012-\u2015'
+WORD_PATTERN = re.compile(r"""
+    \.{2,}                          # ellipsis
+  | --                              # double dash
+  | ``?                             # backtick quotes, in pairs
+  | ''                              # doubled single quotes
+  | [%(special)s]                   # punctuation that always stands alone
+  | [:,](?!\d)                      # comma or colon outside a number
+  | (?:[^\s%(special)s`:,.'-]       # anything else, plus the characters that
+     | [:,](?=\d)                   #   only split in some contexts
+     | \.(?!\.)
+     | '(?!')
+     | -(?!-)
+    )+
+""" % {'special': SPECIAL_CHARS}, re.VERBOSE)
+
+# A whitespace token ending in sentence punctuation, and the token after it
+SENTENCE_END = re.compile(r'(?<!\S)(\S*[.?!][%s]*)(?=\s+(\S+))' % re.escape(CLOSING_CHARS))
+NUMBER = re.compile(r'^-?[\.,]?\d[\d,\.-]*$')
+INITIAL = re.compile(r'^[^\W\d]$')
+DOTTED = re.compile(r'^(?:[^\W\d]\.)+[^\W\d]$')
+# An opening single quote, unless it starts a clitic such as 's or 're
+OPENING_QUOTE = re.compile(r"(?i)(?<!\w)'(?!(?:re|ve|ll|m|t|s|d|n)\b)(?=\w)")
+
+# Treebank contraction suffixes, split off the end of a word in this order
+SUFFIXES = (
+    ("'s", "'S", "'m", "'M", "'d", "'D", "'"),
+    ("'ll", "'LL", "'re", "'RE", "'ve", "'VE", "n't", "N'T"),
+)
+# Whole words Treebank splits in two, as {word: length of the first part}
+SPLIT_WORDS = {
+    'cannot': 3, "d'ye": 1, 'gimme': 3, 'gonna': 3, 'gotta': 3, 'lemme': 3,
+    "more'n": 4, 'wanna': 3
+}
+
+
+class NativeTokenizer:
+    """Regex sentence and word tokenizer with character offsets
+
+    Word tokens follow the NLTK Treebank rules used by nltk.word_tokenize
+    (contractions, punctuation, sentence-final periods), except that quotes
+    are returned as written instead of being rewritten to `` and ''.
+    Sentence boundaries approximate Punkt with a fixed abbreviation list in
+    place of trained parameters. Tokens are always slices of the input.
+    """
+
+    name = 'native'
+
+    def __init__(self, abbreviations=ABBREVIATIONS, titles=TITLES, sentence_starters=SENTENCE_STARTERS):
+        self.abbreviations = frozenset(abbreviations)
+        self.titles = frozenset(titles)
+        self.sentence_starters = frozenset(sentence_starters)
+
+    def sentence_spans(self, text):
+        """(start, end) of every sentence, without surrounding whitespace"""
+        spans = []
+        start = len(text) - len(text.lstrip())
+        for match in SENTENCE_END.finditer(text):
+            if self._ends_sentence(match.group(1), match.group(2)):
+                spans.append((start, match.end(1)))
+                start = match.start(2)
+        end = len(text.rstrip())
+        if start < end:
+            spans.append((start, end))
+        return spans
+
+    def _ends_sentence(self, token, next_token):
+        core = token.rstrip(CLOSING_CHARS)
+        if not core:
+            return False
+        if core[-1] in '?!':
+            return True
+        if core[-1] != '.':
+            return False
+
+        next_core = next_token.lstrip(OPENING_CHARS)
+        starts_sentence = next_core[:1].isupper() and next_core.rstrip(',;:').lower() in self.sentence_starters
+        if core.endswith('..'):
+            # Trained Punkt ends the sentence before a capitalized common word after an ellipsis
+            return next_core[:1].isupper()
+
+        word = core[:-1].lstrip(OPENING_CHARS)
+        lower = word.lower()
+        if lower in self.abbreviations or DOTTED.match(word):
+            return starts_sentence and lower not in self.titles
+        if INITIAL.match(word):
+            return starts_sentence
+        if NUMBER.match(word):
+            return not next_core[:1].islower()
+        return True
+
+    def word_spans(self, text, start=0, end=None):
+        """(start, end) of every word token in text[start:end], taken as one sentence"""
+        if end is None:
+            end = len(text)
+        spans = []
+        for match in WORD_PATTERN.finditer(text, start, end):
+            piece = match.group()
+            if self._needs_split(piece):
+                spans.extend(self._split_word(piece, match.start()))
+            else:
+                spans.append(match.span())
+        return self._split_final_period(text, spans)
+
+    @staticmethod
+    def _needs_split(piece):
+        # Only words with a quote or a Treebank contraction need splitting
+        return "'" in piece or (4 < len(piece) < 7 and piece.lower() in SPLIT_WORDS)
+
+    def _split_word(self, piece, offset):
+        """Treebank quote and contraction splits within one word"""
+        if piece == "''":
+            return [(offset, offset + 2)]
+        # An opening quote ends the segment before it, as a space would
+        bounds = [0] + [match.end() for match in OPENING_QUOTE.finditer(piece)] + [len(piece)]
+        spans = []
+        for segment_start, segment_end in zip(bounds, bounds[1:]):
+            if segment_start < segment_end:
+                spans.extend(self._split_segment(piece[segment_start:segment_end], offset + segment_start))
+        return spans
+
+    @staticmethod
+    def _split_segment(segment, offset):
+        cuts = []
+        head = len(segment)
+        # A closing quote, then the clitics before it
+        if head > 1 and segment[-1] == "'" and segment[-2] != "'":
+            head -= 1
+            cuts.append(head)
+        for suffixes in SUFFIXES:
+            for suffix in suffixes:
+                cut = head - len(suffix)
+                if cut > 0 and segment.startswith(suffix, cut) and segment[cut - 1] != "'":
+                    cuts.append(cut)
+                    head = cut
+                    break
+
+        split = SPLIT_WORDS.get(segment[:head].lower())
+        if split:
+            cuts.append(split)
+
+        spans = []
+        previous = 0
+        for cut in sorted(set(cuts)):
+            if 0 < cut < len(segment):
+                spans.append((offset + previous, offset + cut))
+                previous = cut
+        spans.append((offset + previous, offset + len(segment)))
+        return spans
+
+    def _split_final_period(self, text, spans):
+        """Split the period off the last word, as Treebank does at the end of a sentence"""
+        i = len(spans) - 1
+        while i >= 0 and spans[i][1] - spans[i][0] == 1 and text[spans[i][0]] in FINAL_CLOSERS:
+            i -= 1
+        if i < 0:
+            return spans
+        start, end = spans[i]
+        token = text[start:end]
+        if len(token) > 1 and token.endswith('.') and token[-2] != '.':
+            # Treebank splits the period before contractions, so "year's." becomes year 's .
+            head = self._split_word(token[:-1], start) if self._needs_split(token[:-1]) else [(start, end - 1)]
+            spans[i:i + 1] = head + [(end - 1, end)]
+        return spans
+
+    def tokenize_with_offsets(self, text):
+        """[(token, start, end), ...] over all sentences of text"""
+        return [
+            (text[start:end], start, end)
+            for sentence_start, sentence_end in self.sentence_spans(text)
+            for start, end in self.word_spans(text, sentence_start, sentence_end)
+        ]
+
+    def sent_tokenize(self, text):
+        return [text[start:end] for start, end in self.sentence_spans(text)]
+
+    def word_tokenize(self, text, preserve_line=False):
+        if preserve_line:
+            return [text[start:end] for start, end in self.word_spans(text)]
+        return [token for token, _, _ in self.tokenize_with_offsets(text)]
+
+
+native_tokenizer = NativeTokenizer()
@@ -0,0 +1,148 @@
+import pickle
+from collections import deque, defaultdict
+
+HASH_BASE = 257
+HASH_MOD = (1 << 61) - 1
+
+
+def iter_chunks(source, chunk_size=65536):
+    """Yield a text in chunks, whether it is a string, a file object or already an iterable"""
+    if isinstance(source, str):
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+    elif hasattr(source, 'read'):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        yield from source
+
+
+def normalized_chars(source):
+    """Stream (character, original offset) for every alphanumeric character, lowercased"""
+    offset = 0
+    for chunk in iter_chunks(source):
+        for i, char in enumerate(chunk):
+            if char.isalnum():
+                yield char.lower(), offset + i
+        offset += len(chunk)
+
+
+def kgram_hashes(source, k):
+    """Rolling Karp-Rabin hashes of every k-gram as (hash, start, end) in original offsets"""
+    drop = pow(HASH_BASE, k - 1, HASH_MOD)
+    window = deque()
+    h = 0
+    for char, offset in normalized_chars(source):
+        code = ord(char)
+        if len(window) == k:
+            old_code, _ = window.popleft()
+            h = (h - old_code * drop) % HASH_MOD
+        h = (h * HASH_BASE + code) % HASH_MOD
+        window.append((code, offset))
+        if len(window) == k:
+            yield h, window[0][1], offset + 1
+
+
+def winnow(source, k=40, w=20):
+    """Select fingerprints with the winnowing algorithm (Schleimer et al., 2003)
+
+    Yields (hash, start, end) for the rightmost minimal hash of every window
+    of w consecutive k-grams. Runs in linear time and constant memory, so any
+    match of at least k + w - 1 normalized characters is guaranteed to share
+    a fingerprint.
+    """
+    minima = deque()
+    last_selected = -1
+    for i, (h, start, end) in enumerate(kgram_hashes(source, k)):
+        # Keep the window minima in increasing order; ties prefer the rightmost
+        while minima and minima[-1][0] >= h:
+            minima.pop()
+        minima.append((h, i, start, end))
+        if minima[0][1] <= i - w:
+            minima.popleft()
+        if i >= w - 1 and minima[0][1] != last_selected:
+            last_selected = minima[0][1]
+            yield minima[0][0], minima[0][2], minima[0][3]
+
+    # Texts shorter than one window still get their minimum fingerprint
+    if minima and last_selected == -1:
+        yield minima[0][0], minima[0][2], minima[0][3]
+
+
+def merge_spans(spans, gap=0):
+    """Merge overlapping (start, end, source_start, source_end) spans"""
+    merged = []
+    for start, end, source_start, source_end in sorted(spans):
+        if merged and start <= merged[-1][1] + gap:
+            last = merged[-1]
+            merged[-1] = (last[0], max(last[1], end), min(last[2], source_start), max(last[3], source_end))
+        else:
+            merged.append((start, end, source_start, source_end))
+    return merged
+
+
+class FingerprintIndex:
+    """Inverted index from winnowing fingerprint to (document, offset) locations"""
+
+    def __init__(self, k=40, w=20):
+        self.k = k
+        self.w = w
+        self.postings = defaultdict(list)
+        self.documents = {}
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add_document(self, doc_id, source):
+        """Fingerprint a document (string, file object or chunk iterable) and index it"""
+        if doc_id in self.documents:
+            self.remove_document(doc_id)
+        hashes = []
+        for h, start, end in winnow(source, self.k, self.w):
+            self.postings[h].append((doc_id, start, end))
+            hashes.append(h)
+        self.documents[doc_id] = hashes
+        return len(hashes)
+
+    def remove_document(self, doc_id):
+        """Remove a document's fingerprints from the index"""
+        hashes = self.documents.pop(doc_id, None)
+        if hashes is None:
+            return False
+        for h in set(hashes):
+            remaining = [entry for entry in self.postings[h] if entry[0] != doc_id]
+            if remaining:
+                self.postings[h] = remaining
+            else:
+                del self.postings[h]
+        return True
+
+    def match(self, source, gap=None):
+        """Locate passages of a text that match indexed documents
+
+        Returns {doc_id: [(start, end, source_start, source_end), ...]} with
+        character offsets into the query text and the matched document.
+        """
+        if gap is None:
+            gap = self.k
+        hits = defaultdict(list)
+        for h, start, end in winnow(source, self.k, self.w):
+            for doc_id, source_start, source_end in self.postings.get(h, ()):
+                hits[doc_id].append((start, end, source_start, source_end))
+        return {doc_id: merge_spans(spans, gap) for doc_id, spans in hits.items()}
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump({'k': self.k, 'w': self.w, 'postings': dict(self.postings), 'documents': self.documents}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        index = cls(state['k'], state['w'])
+        index.postings.update(state['postings'])
+        index.documents = state['documents']
+        return index